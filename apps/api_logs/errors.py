@@ -0,0 +1,248 @@
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import traceback
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# parts of a message that differ between occurrences of the same error
+_MESSAGE_PATTERNS = (
+    (re.compile(r"\b[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.I), "<hex>"),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "<str>"),
+    (re.compile(r"\b\d+(\.\d+)?\b"), "<num>"),
+)
+
+
+def normalize_message(message: str) -> str:
+    message = str(message)
+    for pattern, placeholder in _MESSAGE_PATTERNS:
+        message = pattern.sub(placeholder, message)
+    return message[:1000]
+
+
+def app_frames(tb, limit=3):
+    """
+    The innermost `limit` frames of the traceback that belong to the
+    project (not the stdlib or site-packages), as `path:function`.
+    Line numbers are left out so a fingerprint survives unrelated edits.
+    """
+    base_dir = str(settings.BASE_DIR)
+    frames = []
+    for frame in reversed(traceback.extract_tb(tb)):
+        filename = frame.filename
+        if not filename.startswith(base_dir) or "site-packages" in filename:
+            continue
+        frames.append(f"{os.path.relpath(filename, base_dir)}:{frame.name}")
+        if len(frames) >= limit:
+            break
+    return frames
+
+
+def fingerprint(exception, frames) -> str:
+    key = "|".join(
+        [
+            type(exception).__module__,
+            type(exception).__qualname__,
+            normalize_message(exception),
+            *frames,
+        ]
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+# fingerprints this process counted while locked, with their latest
+# occurrence, until `flush_pending` writes them
+_pending = {}
+_pending_lock = threading.Lock()
+_flush_timer = None
+
+
+def _lock_key(fp):
+    return f"error-log:lock:{fp}"
+
+
+def _pending_key(fp):
+    return f"error-log:pending:{fp}"
+
+
+def _count_pending(fp, interval):
+    key = _pending_key(fp)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between add and incr
+        cache.set(key, 1, None)
+    with _pending_lock:
+        _pending[fp] = timezone.now()
+    _schedule_flush(interval)
+
+
+def _schedule_flush(interval):
+    global _flush_timer
+    with _pending_lock:
+        # not alive either in a forked worker
+        if _flush_timer is not None and _flush_timer.is_alive():
+            return
+        _flush_timer = threading.Timer(interval, flush_pending)
+        _flush_timer.name = "api-error-log-flush"
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def _take_pending(fp) -> int:
+    key = _pending_key(fp)
+    pending = cache.get(key) or 0
+    if pending:
+        try:
+            # decr, not delete: occurrences counted meanwhile are kept
+            cache.decr(key, pending)
+        except ValueError:
+            pass
+    return pending
+
+
+def capture_exception(request, exception, status_code=500):
+    """
+    Records `exception` in the `ErrorLog` row of its fingerprint.
+
+    A fingerprint is written at most once per `WRITE_INTERVAL_S`; the
+    occurrences in between are only counted in the cache and added with
+    the next write, so an error storm costs one UPDATE per interval
+    instead of one INSERT per failure. When no occurrence follows, a timer
+    thread adds them once the interval is over, see `flush_pending`.
+    """
+    conf = getattr(settings, "API_ERROR_LOG", {})
+    frames = app_frames(exception.__traceback__, conf.get("APP_FRAMES", 3))
+    fp = fingerprint(exception, frames)
+
+    interval = conf.get("WRITE_INTERVAL_S", 10)
+    if not cache.add(_lock_key(fp), 1, interval):
+        _count_pending(fp, interval)
+        return fp
+
+    try:
+        _write(request, exception, status_code, fp, frames, conf)
+    except Exception:
+        logger.exception("Failed to write the error log of %s.", fp)
+    return fp
+
+
+def flush_pending():
+    """
+    Adds the occurrences counted while their fingerprint was locked to its
+    row once the lock expired, so the tail of a burst that stops is not
+    lost. Fingerprints still locked are flushed by the next timer.
+    """
+    from .models import ErrorLog
+
+    global _flush_timer
+    conf = getattr(settings, "API_ERROR_LOG", {})
+    interval = conf.get("WRITE_INTERVAL_S", 10)
+    with _pending_lock:
+        _flush_timer = None
+        pending = list(_pending.items())
+
+    try:
+        for fp, last_seen in pending:
+            if not cache.add(_lock_key(fp), 1, interval):
+                continue
+            with _pending_lock:
+                if _pending.get(fp) == last_seen:
+                    del _pending[fp]
+            occurrences = _take_pending(fp)
+            if occurrences:
+                ErrorLog.objects.filter(fingerprint=fp).update(
+                    occurrences=F("occurrences") + occurrences,
+                    last_seen=last_seen,
+                    updated_at=timezone.now(),
+                )
+    except Exception:
+        logger.exception("Failed to flush the pending error log occurrences.")
+    finally:
+        close_old_connections()
+
+    with _pending_lock:
+        remaining = bool(_pending)
+    if remaining:
+        _schedule_flush(interval)
+
+
+def _write(request, exception, status_code, fp, frames, conf):
+    from .models import ErrorLog
+
+    now = timezone.now()
+    occurrences = 1 + _take_pending(fp)
+    sample = {
+        "at": now.isoformat(),
+        "url": request.get_full_path()[:1000],
+        "method": request.method,
+        "ip": request.META.get("REMOTE_ADDR"),
+        "user_id": getattr(getattr(request, "user", None), "id", None),
+        "status_code": status_code,
+        "message": str(exception)[:1000],
+    }
+    fields = {
+        "url": request.get_full_path()[:255],
+        "method": request.method.lower(),
+        "ip": request.META.get("REMOTE_ADDR"),
+        "user_agent": (request.headers.get("user-agent") or "")[:255],
+        "user_id": sample["user_id"],
+        "status_code": status_code,
+        "last_seen": now,
+    }
+
+    with transaction.atomic():
+        error_log = ErrorLog.objects.select_for_update().filter(fingerprint=fp).first()
+        if error_log is None:
+            try:
+                with transaction.atomic():
+                    ErrorLog.objects.create(
+                        fingerprint=fp,
+                        exception_class=type(exception).__qualname__,
+                        message=normalize_message(exception),
+                        extra_field={"frames": frames},
+                        occurrences=occurrences,
+                        first_seen=now,
+                        samples=[sample],
+                        **fields,
+                    )
+                return
+            except IntegrityError:
+                # created by another process in the meantime
+                error_log = ErrorLog.objects.select_for_update().get(fingerprint=fp)
+
+        error_log.occurrences += occurrences
+        error_log.samples = _reservoir(
+            error_log.samples or [],
+            sample,
+            error_log.occurrences,
+            conf.get("SAMPLE_SIZE", 10),
+        )
+        for name, value in fields.items():
+            setattr(error_log, name, value)
+        error_log.save(update_fields=["occurrences", "samples", *fields, "updated_at"])
+
+
+def _reservoir(samples, sample, seen, size):
+    """
+    Reservoir sampling: every occurrence written so far has the same
+    chance to be among the `size` kept samples.
+    """
+    if len(samples) < size:
+        return [*samples, sample]
+    index = random.randrange(seen)
+    if index < size:
+        samples = list(samples)
+        samples[index] = sample
+    return samples
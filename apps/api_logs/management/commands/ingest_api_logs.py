@@ -0,0 +1,172 @@
+import io
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+
+from apps.api_logs.models import APILog, APILogSegment
+from apps.api_logs.spool import OPEN_SUFFIX, SEALED_SUFFIX, seal_segment, segment_pid
+from apps.base.fields import CompressedJSONField
+
+# rows sent to COPY per write
+CHUNK_ROWS = 5000
+
+
+def _copy_text(value):
+    """
+    Escapes a value for the COPY text format.
+    """
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Load sealed API log spool segments into the api log table using "
+        "COPY FROM STDIN. Each segment is recorded in APILogSegment in the "
+        "same transaction, so it is loaded exactly once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory",
+            default=None,
+            help="Spool directory. Defaults to API_LOG_SPOOL['DIR'].",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Maximum number of segments to load. 0 loads all of them.",
+        )
+        parser.add_argument(
+            "--seal-orphans",
+            action="store_true",
+            help="Seal open segments whose writer process no longer exists.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("ingest_api_logs requires PostgreSQL.")
+
+        directory = Path(options["directory"] or settings.API_LOG_SPOOL["DIR"])
+        if not directory.exists():
+            self.stdout.write("Spool directory does not exist, nothing to do.")
+            return
+
+        if options["seal_orphans"]:
+            for path in sorted(directory.glob(f"*{OPEN_SUFFIX}")):
+                pid = segment_pid(path)
+                if pid and not _pid_alive(pid):
+                    seal_segment(path)
+
+        segments = sorted(directory.glob(f"*{SEALED_SUFFIX}"))
+        if options["limit"]:
+            segments = segments[: options["limit"]]
+
+        self.fields = [
+            field
+            for field in APILog._meta.concrete_fields
+            if not isinstance(field, models.AutoField)
+        ]
+        total = 0
+        for path in segments:
+            rows, skipped = self.ingest(path)
+            total += rows
+            self.stdout.write(f"{path.name}: {rows} rows, {skipped} skipped")
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded {len(segments)} segments, {total} rows.")
+        )
+
+    def ingest(self, path):
+        with transaction.atomic():
+            # unique name, a concurrent ingester blocks here and then skips
+            segment, created = APILogSegment.objects.get_or_create(name=path.name)
+            if not created:
+                rows, skipped = 0, 0
+            else:
+                rows, skipped = self.copy_segment(path)
+                segment.rows = rows
+                segment.skipped = skipped
+                segment.save(update_fields=["rows", "skipped"])
+
+        # only removed once the rows and the bookkeeping are committed
+        path.unlink(missing_ok=True)
+        return rows, skipped
+
+    def copy_segment(self, path):
+        columns = ", ".join(connection.ops.quote_name(f.column) for f in self.fields)
+        sql = "COPY {} ({}) FROM STDIN".format(
+            connection.ops.quote_name(APILog._meta.db_table), columns
+        )
+
+        rows = skipped = 0
+        with connection.cursor() as cursor, open(path, encoding="utf-8") as fh:
+            buffer = []
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # torn write at the end of a segment
+                    skipped += 1
+                    continue
+                buffer.append(self.copy_row(record))
+                if len(buffer) >= CHUNK_ROWS:
+                    self.copy(cursor.cursor, sql, buffer)
+                    rows += len(buffer)
+                    buffer = []
+            if buffer:
+                self.copy(cursor.cursor, sql, buffer)
+                rows += len(buffer)
+        return rows, skipped
+
+    def copy_row(self, record):
+        values = []
+        for field in self.fields:
+            if field.name in record:
+                value = record[field.name]
+            elif field.attname in record:
+                value = record[field.attname]
+            elif field.name == "updated_at":
+                value = record.get("created_at")
+            else:
+                value = field.get_default()
+
+            if isinstance(field, CompressedJSONField) and value is not None:
+                # bytea hex input
+                value = "\\x" + field.compress(value).hex()
+            elif isinstance(field, models.JSONField) and value is not None:
+                value = json.dumps(value, cls=field.encoder or DjangoJSONEncoder)
+            values.append(_copy_text(value))
+        return "\t".join(values) + "\n"
+
+    def copy(self, raw_cursor, sql, rows):
+        data = "".join(rows)
+        if hasattr(raw_cursor, "copy_expert"):
+            # psycopg2
+            raw_cursor.copy_expert(sql, io.StringIO(data))
+        else:
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(data)
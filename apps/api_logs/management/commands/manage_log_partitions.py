@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.api_logs import partitions
+from apps.api_logs.models import APILog
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the created_at range partitions of the api log table: "
+        "convert plain tables, pre-create future partitions and expire old "
+        "ones by detaching/dropping whole partitions. Run it from cron."
+    )
+
+    def add_arguments(self, parser):
+        conf = settings.API_LOG_PARTITIONS
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Convert a plain log table into a partitioned table first.",
+        )
+        parser.add_argument(
+            "--interval",
+            choices=[partitions.DAY, partitions.MONTH],
+            default=conf["INTERVAL"],
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=conf["PREMAKE"],
+            help="Number of future partitions to create.",
+        )
+        parser.add_argument(
+            "--retain",
+            type=int,
+            default=conf["RETENTION"],
+            help="Number of past partitions to keep. 0 keeps everything.",
+        )
+        parser.add_argument(
+            "--detach-only",
+            action="store_true",
+            default=conf["DETACH_ONLY"],
+            help="Detach expired partitions without dropping them.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("manage_log_partitions requires PostgreSQL.")
+
+        interval = options["interval"]
+        # ErrorLog holds one row per fingerprint and is not partitioned
+        for model in (APILog,):
+            table = model._meta.db_table
+
+            if not partitions.is_partitioned(table):
+                if not options["convert"]:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"{table} is not partitioned, run with --convert."
+                        )
+                    )
+                    continue
+                legacy = partitions.convert_to_partitioned(table, interval)
+                self.stdout.write(f"{table}: converted, old rows kept in {legacy}")
+
+            created = partitions.create_partitions(table, interval, options["ahead"])
+            for name in created:
+                self.stdout.write(f"{table}: created {name}")
+
+            if options["retain"]:
+                expired = partitions.expire_partitions(
+                    table,
+                    interval,
+                    options["retain"],
+                    drop=not options["detach_only"],
+                )
+                action = "detached" if options["detach_only"] else "dropped"
+                for name in expired:
+                    self.stdout.write(f"{table}: {action} {name}")
+
+        self.stdout.write(self.style.SUCCESS("Log partitions are up to date."))
@@ -0,0 +1,107 @@
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.api_logs.models import APILog, EndpointStatMinute
+from apps.api_logs.rollup import RollupAggregator, merge_stats, minute_of
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill EndpointStatMinute from raw APILog rows, e.g. for the time "
+        "before the middleware rollup was enabled. Sampled rows are weighted "
+        "by 1 / sample_rate. Live minutes are already counted by the "
+        "middleware, do not backfill them again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=24,
+            help="Roll up the logs of the last N hours.",
+        )
+        parser.add_argument(
+            "--until-hours",
+            type=float,
+            default=0,
+            help="Stop N hours before now.",
+        )
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Delete the stored stats of the window before the backfill.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("rollup_api_logs requires PostgreSQL.")
+
+        now = timezone.now()
+        start = minute_of(now - timedelta(hours=options["hours"]))
+        end = minute_of(now - timedelta(hours=options["until_hours"]))
+        if start >= end:
+            raise CommandError("Empty window, --hours must exceed --until-hours.")
+
+        aggregator = RollupAggregator(background=False)
+        rows = (
+            APILog.objects.filter(created_at__gte=start, created_at__lt=end)
+            .order_by()
+            .values_list(
+                "created_at",
+                "url",
+                "route",
+                "method",
+                "status_code",
+                "latency_ms",
+                "request_size",
+                "response_size",
+                "extra_field",
+            )
+        )
+        total = 0
+        for (
+            created_at,
+            url,
+            route,
+            method,
+            status_code,
+            latency_ms,
+            request_size,
+            response_size,
+            extra,
+        ) in rows.iterator(chunk_size=options["chunk_size"]):
+            extra = extra or {}
+            if latency_ms is None:
+                # rows logged before the latency column existed
+                latency_ms = extra.get("elapsed_ms") or 0
+            sample_rate = extra.get("sample_rate") or 1
+            aggregator.record(
+                route or urlsplit(url).path,
+                method,
+                status_code or 0,
+                latency_ms,
+                bytes_in=request_size,
+                bytes_out=response_size,
+                at=created_at,
+                weight=max(round(1 / sample_rate), 1),
+            )
+            total += 1
+
+        with transaction.atomic():
+            if options["replace"]:
+                EndpointStatMinute.objects.filter(
+                    minute__gte=start, minute__lt=end
+                ).delete()
+            stats = aggregator.drain()
+            merge_stats(stats)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rolled up {total} log rows into {len(stats)} endpoint minutes."
+            )
+        )
@@ -1,52 +1,160 @@
 import json
+import time
+from io import BytesIO
 
+from django.core.files import File
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.http import QueryDict
 from django.http.multipartparser import MultiPartParser, MultiPartParserError
+from django.http.request import RawPostDataException
+from djangorestframework_camel_case.settings import api_settings
+from rest_framework.parsers import DataAndFiles
 
-from apps.base.utils import is_valid_json, log_request_response
+from apps.base.libs.camel_case import underscoreize
+from apps.base.utils import log_request_response
+from apps.core_app.middleware import get_elapsed_ms
+
+from .policy import FULL, get_logging_policy
+from .rollup import get_rollup_aggregator, route_of
 
 
 class ApiLog:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.policy = get_logging_policy()
+        self.rollup = get_rollup_aggregator()
 
     def __call__(self, request):
-
-        body = self._get_request_body(request)
+        start_time = time.perf_counter()
+        decision = self.policy.decide(request)
         response = self.get_response(request)
-        log_request_response(request, response, body)
+        if decision is None and not (
+            self.rollup and request.path.startswith(self.policy.path_prefixes)
+        ):
+            return response
+
+        elapsed_ms = get_elapsed_ms(request, default_start=start_time)
+        metrics = {
+            "route": route_of(request),
+            "latency_ms": round(elapsed_ms, 2),
+            "request_size": self._request_size(request),
+            "response_size": self._response_size(response),
+        }
+        if self.rollup:
+            # every request, before sampling, see `EndpointStatMinute`
+            self.rollup.record(
+                metrics["route"],
+                request.method,
+                response.status_code,
+                elapsed_ms,
+                bytes_in=metrics["request_size"],
+                bytes_out=metrics["response_size"],
+            )
+        if decision is None:
+            return response
+
+        keep, sample_rate = self.policy.keep(
+            decision, response.status_code, elapsed_ms
+        )
+        if not keep:
+            return response
+
+        capture_payload = decision.tier == FULL
+        log_request_response(
+            request,
+            response,
+            self._get_request_body(request) if capture_payload else {},
+            capture_payload=capture_payload,
+            metrics=metrics,
+            extra={
+                "elapsed_ms": round(elapsed_ms, 2),
+                "log_tier": decision.tier,
+                "sample_rate": sample_rate,
+            },
+        )
         return response
 
+    def _request_size(self, request):
+        try:
+            return int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return 0
+
+    def _response_size(self, response):
+        if getattr(response, "streaming", False):
+            return int(response.get("Content-Length") or 0)
+        return len(response.content)
+
     def _get_request_body(self, request):
+        """
+        The request payload with snake_case keys, as the view got it, like
+        the logged response (`clean_response`).
+        """
+        # parsed once by the DRF parsers, see `apps.base.parser.parser`
+        payload = getattr(request, "parsed_payload", None)
+        if payload is not None:
+            return self._payload_to_dict(payload)
+        return underscoreize(
+            self._parse_body(request), **api_settings.JSON_UNDERSCOREIZE
+        )
+
+    def _parse_body(self, request):
+        # the view never parsed the body, e.g. the request was rejected first
+        try:
+            body_data = request.body
+        except RawPostDataException:
+            # the stream was consumed by a parser that failed
+            return {}
 
-        body_data = request.body
         if request.content_type == "application/json":
-            return (
-                json.loads(body_data.decode("utf-8"))
-                if body_data and is_valid_json(body_data.decode, "utf-8")
-                else {}
-            )
+            if not body_data:
+                return {}
+            try:
+                return json.loads(body_data.decode("utf-8"))
+            except ValueError:
+                return {}
         elif request.content_type == "application/x-www-form-urlencoded":
             return QueryDict(body_data).dict()
         elif request.content_type.startswith("multipart/form-data"):
             try:
-                parser = MultiPartParser(request.META, request, request.upload_handlers)
-                data, files = parser.parse()
-                body = data.dict()
-                body.update(
-                    {
-                        key: (
-                            file.name
-                            if isinstance(file, InMemoryUploadedFile)
-                            else str(file)
-                        )
-                        for key, file in files.items()
-                    }
+                parser = MultiPartParser(
+                    request.META, BytesIO(body_data), request.upload_handlers
                 )
-
-                return body
+                return self._payload_to_dict(DataAndFiles(*parser.parse()))
             except MultiPartParserError:
                 return {}
         else:
             return {}
+
+    def _payload_to_dict(self, payload):
+        """
+        Copies the parsed payload, the logger pops passwords from it.
+        """
+        if isinstance(payload, DataAndFiles):
+            body = self._payload_to_dict(payload.data)
+            body.update(
+                {
+                    key: (
+                        file.name
+                        if isinstance(file, InMemoryUploadedFile)
+                        else str(file)
+                    )
+                    for key, file in payload.files.items()
+                }
+            )
+            return body
+        if isinstance(payload, QueryDict):
+            payload = payload.dict()
+        if isinstance(payload, dict):
+            return {key: self._file_names(value) for key, value in payload.items()}
+        return self._file_names(payload)
+
+    def _file_names(self, value):
+        # nested multipart payloads can hold uploaded files at any depth
+        if isinstance(value, File):
+            return value.name
+        if isinstance(value, dict):
+            return {key: self._file_names(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._file_names(item) for item in value]
+        return value
@@ -1,20 +1,51 @@
+from django.contrib.postgres.fields import ArrayField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
+from apps.base.fields import CompressedJSONField
 from apps.base.models import AbstractBaseModel
 
+# shared compression dictionary of the api log payloads
+API_LOG_DICTIONARY = "api_logs.apilog"
+
 
 class APILog(AbstractBaseModel):
     url = models.CharField(max_length=255)
     method = models.CharField(max_length=255)
     ip = models.CharField(max_length=255, blank=True, null=True)
     user_agent = models.CharField(max_length=255, blank=True, null=True)
-    body = models.JSONField(blank=True, null=True, default=dict)
-    header = models.JSONField(blank=True, null=True)
-    response = models.JSONField(blank=True, null=True)
-    system_details = models.JSONField(blank=True, null=True, default=dict)
+    # compressed payloads, decompressed only when read (retrieve view)
+    body = CompressedJSONField(
+        blank=True, null=True, default=dict, dictionary_label=API_LOG_DICTIONARY
+    )
+    header = CompressedJSONField(
+        blank=True, null=True, dictionary_label=API_LOG_DICTIONARY
+    )
+    # DRF `response.data` as captured (snake_case keys, like `body`), may
+    # hold dates and decimals
+    response = CompressedJSONField(
+        blank=True,
+        null=True,
+        encoder=DjangoJSONEncoder,
+        dictionary_label=API_LOG_DICTIONARY,
+    )
+    system_details = CompressedJSONField(
+        blank=True, null=True, default=dict, dictionary_label=API_LOG_DICTIONARY
+    )
     user_id = models.IntegerField(blank=True, null=True)
     extra_field = models.JSONField(blank=True, null=True)
     status_code = models.CharField(max_length=255, blank=True, null=True)
+    # url pattern the request resolved to, see `apps.api_logs.rollup.route_of`
+    route = models.CharField(max_length=255, blank=True, null=True)
+    latency_ms = models.FloatField(blank=True, null=True)
+    request_size = models.PositiveIntegerField(blank=True, null=True)
+    response_size = models.PositiveIntegerField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the log list, see CustomKeysetPagination
+            models.Index(fields=["created_at", "id"], name="api_log_created_id_idx"),
+        ]
 
     # def __str__(self) -> str:
 
@@ -23,6 +54,22 @@ class APILog(AbstractBaseModel):
 
 
 class ErrorLog(AbstractBaseModel):
+    """
+    One row per error fingerprint (class, normalized message and top
+    project frames), written by `apps.api_logs.errors.capture_exception`.
+    The request fields hold the latest occurrence.
+    """
+
+    fingerprint = models.CharField(max_length=40, unique=True, null=True)
+    exception_class = models.CharField(max_length=255, blank=True, null=True)
+    # normalized, ids and quoted values replaced by placeholders
+    message = models.TextField(blank=True, null=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    first_seen = models.DateTimeField(blank=True, null=True)
+    last_seen = models.DateTimeField(blank=True, null=True, db_index=True)
+    # reservoir of at most `API_ERROR_LOG["SAMPLE_SIZE"]` occurrences
+    samples = models.JSONField(blank=True, default=list)
+
     url = models.CharField(max_length=255)
 
     METHOD_CHOICES = (
@@ -47,3 +94,46 @@ class ErrorLog(AbstractBaseModel):
     user_id = models.IntegerField(blank=True, null=True)
     extra_field = models.JSONField(blank=True, null=True)
     status_code = models.CharField(max_length=255, blank=True, null=True)
+
+
+class APILogSegment(models.Model):
+    """
+    Bookkeeping for spool segments loaded by `manage.py ingest_api_logs`.
+    A row is written in the same transaction as the COPY of the segment,
+    so a segment is never loaded twice.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    rows = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    ingested_at = models.DateTimeField(auto_now_add=True)
+
+
+class EndpointStatMinute(models.Model):
+    """
+    Per route, method and minute request statistics, merged incrementally
+    by `apps.api_logs.rollup.RollupAggregator`. Counts every request,
+    including the ones the log policy samples out of `APILog`.
+    """
+
+    route = models.CharField(max_length=255)
+    method = models.CharField(max_length=8)
+    minute = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    # 5xx responses
+    error_count = models.PositiveIntegerField(default=0)
+    latency_sum = models.FloatField(default=0)
+    # one count per bound of `rollup.LATENCY_BUCKETS_MS`, plus overflow
+    latency_buckets = ArrayField(models.PositiveIntegerField(), default=list)
+    bytes_in = models.BigIntegerField(default=0)
+    bytes_out = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["route", "method", "minute"], name="endpoint_stat_minute_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["minute"], name="endpoint_stat_minute_idx"),
+        ]
@@ -0,0 +1,297 @@
+"""
+Range partitioning of the log tables on `created_at`.
+
+Postgres requires the partition key to be part of the primary key, so a
+partitioned log table has `PRIMARY KEY (id, created_at)`. Django still
+treats `id` as the primary key, which stays unique through the identity
+sequence.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+DAY = "day"
+MONTH = "month"
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def period_start(value: date, interval: str) -> date:
+    if interval == DAY:
+        return value
+    return value.replace(day=1)
+
+
+def next_period(value: date, interval: str) -> date:
+    if interval == DAY:
+        return value + timedelta(days=1)
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1, day=1)
+    return value.replace(month=value.month + 1, day=1)
+
+
+def partition_name(table: str, start: date, interval: str) -> str:
+    suffix = start.strftime("%Y%m%d" if interval == DAY else "%Y%m")
+    return f"{table}_p{suffix}"
+
+
+def _bound(value: date):
+    return timezone.make_aware(datetime.combine(value, datetime.min.time()))
+
+
+def is_partitioned(table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relkind FROM pg_class c "
+            "WHERE c.oid = to_regclass(%s)",
+            [table],
+        )
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def list_partitions(table: str) -> list:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY child.relname",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def legacy_name(table: str) -> str:
+    return f"{table}_legacy"
+
+
+def default_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def _secondary_indexes(table: str) -> list:
+    """
+    `(name, definition)` of the indexes of `table` but the primary key.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = to_regclass(%s) AND NOT i.indisprimary "
+            "ORDER BY c.relname",
+            [table],
+        )
+        return cursor.fetchall()
+
+
+def _index_on(definition: str, name: str, table: str) -> str:
+    # `CREATE [UNIQUE] INDEX <name> ON [ONLY] <table> USING ...` rewritten
+    # for another index name and table
+    match = re.match(
+        r"^(CREATE (?:UNIQUE )?INDEX) .+? ON (?:ONLY )?.+? (USING .*)$", definition
+    )
+    if not match:
+        raise ValueError(f"Unexpected index definition: {definition}")
+    create, using = match.groups()
+    return f"{create} {_quote(name)} ON {_quote(table)} {using}"
+
+
+def partition_upper_bound(name: str):
+    """
+    Upper bound (`FOR VALUES ... TO (...)`) of an attached range
+    partition, None when it is not one.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_class c "
+            "WHERE c.oid = to_regclass(%s) AND c.relispartition",
+            [name],
+        )
+        row = cursor.fetchone()
+    match = row and re.search(r"TO \('([^']+)'\)", row[0] or "")
+    if not match:
+        return None
+    return datetime.fromisoformat(match.group(1))
+
+
+@transaction.atomic
+def convert_to_partitioned(table: str, interval: str) -> str:
+    """
+    Swaps a plain log table for a partitioned one. The existing rows are
+    kept in `<table>_legacy`, attached as the partition for everything up
+    to the end of the current period (or of the period of the latest row,
+    when later), so no data is copied. `create_partitions` starts after
+    it.
+
+    The secondary indexes are recreated on the new table, so every future
+    partition gets them; the legacy indexes are renamed and attached to
+    them instead of being rebuilt. A unique index without `created_at`
+    can not exist on a partitioned table, the conversion fails on it.
+    """
+    legacy = legacy_name(table)
+    qt, ql = _quote(table), _quote(legacy)
+    indexes = _secondary_indexes(table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qt} RENAME TO {ql}")
+        for name, _ in indexes:
+            cursor.execute(
+                f"ALTER INDEX {_quote(name)} "
+                f"RENAME TO {_quote(legacy_name(name)[:63])}"
+            )
+        # the partition key can not be NULL, and a partition must have the
+        # NOT NULL constraints of its parent
+        cursor.execute(
+            f"UPDATE {ql} SET created_at = COALESCE(updated_at, now()) "
+            "WHERE created_at IS NULL"
+        )
+        cursor.execute(f"ALTER TABLE {ql} ALTER COLUMN created_at SET NOT NULL")
+        cursor.execute(f"SELECT MAX(created_at) FROM {ql}")
+        (latest,) = cursor.fetchone()
+
+        last = timezone.now().date()
+        if latest is not None:
+            last = max(last, timezone.localdate(latest))
+        end = next_period(period_start(last, interval), interval)
+
+        cursor.execute(
+            f"CREATE TABLE {qt} (LIKE {ql} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+            "PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(f"ALTER TABLE {qt} ALTER COLUMN created_at SET NOT NULL")
+        cursor.execute(f"ALTER TABLE {qt} ADD PRIMARY KEY (id, created_at)")
+        # continue the id sequence after the legacy rows
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {ql}), 0) + 1, false)",
+            [table],
+        )
+        cursor.execute(
+            f"ALTER TABLE {ql} ALTER COLUMN id DROP IDENTITY IF EXISTS"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qt} ATTACH PARTITION {ql} "
+            "FOR VALUES FROM (MINVALUE) TO (%s)",
+            [_bound(end)],
+        )
+        # matching legacy indexes are attached, not built again
+        for name, definition in indexes:
+            cursor.execute(_index_on(definition, name, table))
+    create_default_partition(table)
+    return legacy
+
+
+def create_default_partition(table: str):
+    """
+    Creates the DEFAULT partition, which takes the rows no range partition
+    covers (when the cron job stopped pre-creating them), instead of
+    failing every insert. `create_partitions` moves them into the
+    partition of their period; rows of periods it never creates again
+    stay in it and are not expired.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {_quote(default_name(table))} "
+            f"PARTITION OF {_quote(table)} DEFAULT"
+        )
+
+
+@transaction.atomic
+def _create_partition(table: str, name: str, start: date, end: date):
+    # A range partition can not be created while the default partition
+    # holds rows of its range: those are moved out of it first.
+    qt, qd = _quote(table), _quote(default_name(table))
+    bounds = [_bound(start), _bound(end)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {qd} "
+            "WHERE created_at >= %s AND created_at < %s)",
+            bounds,
+        )
+        (stray,) = cursor.fetchone()
+        if stray:
+            cursor.execute(f"ALTER TABLE {qt} DETACH PARTITION {qd}")
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {_quote(name)} PARTITION OF {qt} "
+            "FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+        if stray:
+            cursor.execute(
+                f"INSERT INTO {qt} SELECT * FROM {qd} "
+                "WHERE created_at >= %s AND created_at < %s",
+                bounds,
+            )
+            cursor.execute(
+                f"DELETE FROM {qd} WHERE created_at >= %s AND created_at < %s",
+                bounds,
+            )
+            cursor.execute(f"ALTER TABLE {qt} ATTACH PARTITION {qd} DEFAULT")
+
+
+def create_partitions(table: str, interval: str, ahead: int) -> list:
+    """
+    Creates the partition for the current period and `ahead` future ones,
+    skipping the periods still covered by the legacy partition, and the
+    DEFAULT partition when missing.
+    """
+    existing = set(list_partitions(table))
+    if default_name(table) not in existing:
+        create_default_partition(table)
+    start = period_start(timezone.now().date(), interval)
+    legacy_end = None
+    if legacy_name(table) in existing:
+        legacy_end = partition_upper_bound(legacy_name(table))
+    created = []
+    for _ in range(ahead + 1):
+        end = next_period(start, interval)
+        name = partition_name(table, start, interval)
+        covered = legacy_end is not None and _bound(start) < legacy_end
+        if name not in existing and not covered:
+            _create_partition(table, name, start, end)
+            created.append(name)
+        start = end
+    return created
+
+
+def expire_partitions(table: str, interval: str, retain: int, drop=True) -> list:
+    """
+    Detaches (and drops) partitions older than `retain` periods.
+    Retention never runs a DELETE: the legacy partition goes as a whole,
+    once its newest period is past the cutoff.
+    """
+    cutoff = period_start(timezone.now().date(), interval)
+    for _ in range(retain):
+        cutoff = period_start(cutoff - timedelta(days=1), interval)
+
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{8}}|\d{{6}})$")
+    fmt = "%Y%m%d" if interval == DAY else "%Y%m"
+    expired = []
+    with connection.cursor() as cursor:
+        for name in list_partitions(table):
+            if name == legacy_name(table):
+                end = partition_upper_bound(name)
+                if end is None or end > _bound(cutoff):
+                    continue
+            else:
+                match = pattern.match(name)
+                if not match:
+                    continue
+                try:
+                    start = datetime.strptime(match.group(1), fmt).date()
+                except ValueError:
+                    continue
+                if next_period(start, interval) > cutoff:
+                    continue
+            cursor.execute(
+                f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}"
+            )
+            if drop:
+                cursor.execute(f"DROP TABLE {_quote(name)}")
+            expired.append(name)
+    return expired
@@ -0,0 +1,115 @@
+import random
+import re
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+
+FULL = "full"  # headers, body and response
+HEADERS = "headers"  # headers only, body and response are never read
+OFF = "off"
+
+TIERS = (FULL, HEADERS, OFF)
+
+
+class LogDecision(NamedTuple):
+    tier: str
+    # per route sample rate, overrides the status based rates
+    sample_rate: Optional[float]
+    # drawn once per request, compared against the sample rate at the end
+    roll: float
+
+
+class LoggingPolicy:
+    """
+    Decides which requests are written to `APILog` and how much of them.
+
+    `decide()` runs before the view: it matches the route against the rules
+    and fixes the tier, so nothing is read from the body of requests that
+    are not logged or logged headers only. `keep()` runs after the view:
+    5xx and slow requests are always kept, the rest are sampled by route
+    or by status class.
+    """
+
+    def __init__(
+        self,
+        methods=("PATCH", "PUT", "POST", "DELETE"),
+        path_prefixes=("/api/",),
+        rules=(),
+        default_tier=FULL,
+        status_sample_rates=None,
+        default_sample_rate=1.0,
+        slow_request_ms=None,
+    ):
+        self.methods = {method.upper() for method in methods}
+        self.path_prefixes = tuple(path_prefixes)
+        self.default_tier = default_tier
+        self.status_sample_rates = status_sample_rates or {}
+        self.default_sample_rate = default_sample_rate
+        self.slow_request_ms = slow_request_ms
+
+        self.rules = []
+        for rule in rules:
+            tier = rule.get("tier", default_tier)
+            if tier not in TIERS:
+                raise ValueError(f"Invalid log tier: {tier}")
+            methods_ = rule.get("methods")
+            self.rules.append(
+                (
+                    re.compile(rule["path"]),
+                    {m.upper() for m in methods_} if methods_ else None,
+                    tier,
+                    rule.get("sample_rate"),
+                )
+            )
+
+    def decide(self, request) -> Optional[LogDecision]:
+        method = request.method.upper()
+        if method not in self.methods:
+            return None
+        path = request.path
+        if not path.startswith(self.path_prefixes):
+            return None
+
+        tier, sample_rate = self.default_tier, None
+        for pattern, methods, rule_tier, rule_rate in self.rules:
+            if methods and method not in methods:
+                continue
+            if pattern.search(path):
+                tier, sample_rate = rule_tier, rule_rate
+                break
+
+        if tier == OFF or sample_rate == 0:
+            return None
+        return LogDecision(tier, sample_rate, random.random())
+
+    def sample_rate(self, decision: LogDecision, status_code: int) -> float:
+        if decision.sample_rate is not None:
+            return decision.sample_rate
+        return self.status_sample_rates.get(
+            f"{status_code // 100}xx", self.default_sample_rate
+        )
+
+    def keep(self, decision: LogDecision, status_code: int, elapsed_ms: float):
+        """
+        Returns `(keep, sample_rate)`, the rate is stored with the log so
+        counts can be re-weighted.
+        """
+        if status_code >= 500:
+            return True, 1.0
+        if self.slow_request_ms is not None and elapsed_ms >= self.slow_request_ms:
+            return True, 1.0
+        rate = self.sample_rate(decision, status_code)
+        return decision.roll < rate, rate
+
+
+def get_logging_policy() -> LoggingPolicy:
+    conf = getattr(settings, "API_LOG_POLICY", {})
+    return LoggingPolicy(
+        methods=conf.get("METHODS", ("PATCH", "PUT", "POST", "DELETE")),
+        path_prefixes=conf.get("PATH_PREFIXES", ("/api/",)),
+        rules=conf.get("RULES", ()),
+        default_tier=conf.get("DEFAULT_TIER", FULL),
+        status_sample_rates=conf.get("STATUS_SAMPLE_RATES"),
+        default_sample_rate=conf.get("DEFAULT_SAMPLE_RATE", 1.0),
+        slow_request_ms=conf.get("SLOW_REQUEST_MS"),
+    )
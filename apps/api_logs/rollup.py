@@ -0,0 +1,222 @@
+import atexit
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets, the last bucket of
+# `EndpointStatMinute.latency_buckets` counts everything slower.
+# Stored rows depend on these bounds, append new ones only at the end.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def bucket_index(latency_ms: float) -> int:
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+def percentile_from_buckets(buckets, quantile: float):
+    """
+    Upper bound of the bucket holding the `quantile` request, None for the
+    overflow bucket (slower than the last bound) or an empty histogram.
+    """
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if seen >= rank:
+            if index < len(LATENCY_BUCKETS_MS):
+                return LATENCY_BUCKETS_MS[index]
+            return None
+    return None
+
+
+def route_of(request) -> str:
+    """
+    The url pattern the request resolved to (`/api/v1/items/<int:pk>`),
+    so all ids of a detail endpoint are counted together.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.route:
+        return UNMATCHED_ROUTE
+    return "/" + match.route.lstrip("^").rstrip("$")
+
+
+def minute_of(value):
+    return value.replace(second=0, microsecond=0)
+
+
+class RollupAggregator:
+    """
+    Accumulates per (route, method, minute) request statistics in memory
+    and merges them into `EndpointStatMinute` every `flush_interval_ms`
+    from a background thread, one upsert per touched row.
+    """
+
+    def __init__(self, flush_interval_ms=10000, background=True):
+        self.flush_interval = flush_interval_ms / 1000
+        # without the thread, the caller drains and merges the stats itself
+        self.background = background
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="api-log-rollup", daemon=True
+            )
+            self._thread.start()
+
+    def record(
+        self,
+        route,
+        method,
+        status_code,
+        latency_ms,
+        bytes_in=0,
+        bytes_out=0,
+        at=None,
+        weight=1,
+    ):
+        """
+        Count one request. `weight` lets a backfill from sampled logs
+        count a row for the requests that were not kept.
+        """
+        if self.background and not (self._thread and self._thread.is_alive()):
+            self.start()
+        key = (route, method.upper(), minute_of(at or timezone.now()))
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = {
+                    "count": 0,
+                    "error_count": 0,
+                    "latency_sum": 0.0,
+                    "latency_buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                }
+            stat["count"] += weight
+            if int(status_code) >= 500:
+                stat["error_count"] += weight
+            stat["latency_sum"] += latency_ms * weight
+            stat["latency_buckets"][bucket_index(latency_ms)] += weight
+            stat["bytes_in"] += (bytes_in or 0) * weight
+            stat["bytes_out"] += (bytes_out or 0) * weight
+
+    def drain(self):
+        """
+        Returns the accumulated stats and starts over.
+        """
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+    def flush(self):
+        stats = self.drain()
+        if not stats:
+            return
+        try:
+            merge_stats(stats)
+        except Exception:
+            logger.exception("Failed to merge %s endpoint stat rows.", len(stats))
+        finally:
+            close_old_connections()
+
+    def close(self, timeout=5):
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+def merge_stats(stats):
+    """
+    Adds `{(route, method, minute): stat}` to the stored rows with
+    `INSERT ... ON CONFLICT DO UPDATE`, histograms are summed per bucket.
+    """
+    from .models import EndpointStatMinute
+
+    table = connection.ops.quote_name(EndpointStatMinute._meta.db_table)
+    sql = f"""
+        INSERT INTO {table} AS stat (
+            route, method, minute, count, error_count,
+            latency_sum, latency_buckets, bytes_in, bytes_out
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (route, method, minute) DO UPDATE SET
+            count = stat.count + EXCLUDED.count,
+            error_count = stat.error_count + EXCLUDED.error_count,
+            latency_sum = stat.latency_sum + EXCLUDED.latency_sum,
+            latency_buckets = ARRAY(
+                SELECT COALESCE(old, 0) + COALESCE(new, 0)
+                FROM unnest(stat.latency_buckets, EXCLUDED.latency_buckets)
+                    AS bucket(old, new)
+            ),
+            bytes_in = stat.bytes_in + EXCLUDED.bytes_in,
+            bytes_out = stat.bytes_out + EXCLUDED.bytes_out
+    """
+    rows = [
+        (
+            route,
+            method,
+            minute,
+            stat["count"],
+            stat["error_count"],
+            stat["latency_sum"],
+            stat["latency_buckets"],
+            stat["bytes_in"],
+            stat["bytes_out"],
+        )
+        for (route, method, minute), stat in stats.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def window_start(hours: float):
+    return minute_of(timezone.now() - timedelta(hours=hours))
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_rollup_aggregator():
+    """
+    Process wide aggregator, None when `API_LOG_ROLLUP["ENABLED"]` is off.
+    """
+    global _aggregator
+    conf = getattr(settings, "API_LOG_ROLLUP", {})
+    if not conf.get("ENABLED", True):
+        return None
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = RollupAggregator(
+                    flush_interval_ms=conf.get("FLUSH_INTERVAL_MS", 10000)
+                )
+                atexit.register(_aggregator.close)
+    return _aggregator
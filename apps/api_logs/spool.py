@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = ".ndjson.open"
+SEALED_SUFFIX = ".ndjson"
+
+
+def segment_pid(path: Path):
+    """
+    Segment names are `<timestamp>-<pid>-<token>.ndjson[.open]`.
+    """
+    try:
+        return int(path.name.split("-")[1])
+    except (IndexError, ValueError):
+        return None
+
+
+class SegmentSpool:
+    """
+    Appends log records as NDJSON lines to a local segment file.
+
+    The request thread only writes to the file. A background thread of
+    each process fsyncs in batches (every `fsync_every` records or
+    `fsync_interval_ms`) and seals a segment (renames it from
+    `.ndjson.open` to `.ndjson`) once it is `max_segment_age_s` old, so
+    the tail of a burst does not wait for the next request. A segment is
+    also sealed when it reaches `max_segment_bytes` or the process exits.
+    Only sealed segments are picked up by `manage.py ingest_api_logs`.
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_segment_bytes=64 * 1024 * 1024,
+        max_segment_age_s=60,
+        fsync_every=100,
+        fsync_interval_ms=1000,
+    ):
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age_s
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval_ms / 1000
+
+        self.dropped = 0
+        self.written = 0
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._pid = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._unsynced = 0
+        self._synced_at = 0.0
+
+        self._stop = threading.Event()
+        # set by the request thread when `fsync_every` records are pending
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            # not alive either in a forked worker
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="api-log-spool", daemon=True
+            )
+            self._thread.start()
+
+    def enqueue(self, record: dict) -> bool:
+        if not self._thread or not self._thread.is_alive():
+            self.start()
+        # COPY bypasses `auto_now_add`, stamp the record when it happens
+        record.setdefault("created_at", timezone.now())
+        line = json.dumps(record, cls=DjangoJSONEncoder, separators=(",", ":"))
+        data = (line + "\n").encode("utf-8")
+
+        with self._lock:
+            try:
+                if self._pid != os.getpid():
+                    # forked worker, never write into the parent's segment
+                    self._file = None
+                if self._file is None or self._should_rotate():
+                    self._rotate()
+                self._file.write(data)
+            except OSError:
+                self.dropped += 1
+                return False
+
+            self._size += len(data)
+            self._unsynced += 1
+            self.written += 1
+            if self._unsynced >= self.fsync_every:
+                self._wake.set()
+        return True
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+
+    def close(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+        with self._lock:
+            self._seal()
+
+    def tick(self):
+        """
+        Syncs the open segment once `fsync_every` records are pending or
+        `fsync_interval_ms` has passed since the last sync, seals it once it
+        is `max_segment_age_s` old.
+        """
+        with self._lock:
+            if self._file is None or self._pid != os.getpid():
+                return
+            now = time.monotonic()
+            try:
+                if now - self._opened_at >= self.max_segment_age:
+                    self._seal()
+                elif self._unsynced >= self.fsync_every or (
+                    self._unsynced and now - self._synced_at >= self.fsync_interval
+                ):
+                    self._sync()
+            except OSError:
+                logger.exception("Failed to sync the api log segment %s.", self._path)
+
+    def _run(self):
+        period = max(min(self.fsync_interval, self.max_segment_age), 0.05)
+        while True:
+            self._wake.wait(period)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.tick()
+
+    def _should_rotate(self):
+        return (
+            self._size >= self.max_segment_bytes
+            or time.monotonic() - self._opened_at >= self.max_segment_age
+        )
+
+    def _rotate(self):
+        self._seal()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = "{}-{}-{}{}".format(
+            timezone.now().strftime("%Y%m%dT%H%M%S%f"),
+            os.getpid(),
+            uuid.uuid4().hex[:8],
+            OPEN_SUFFIX,
+        )
+        self._path = self.directory / name
+        self._file = open(self._path, "ab")
+        self._pid = os.getpid()
+        self._opened_at = self._synced_at = time.monotonic()
+        self._size = 0
+        self._unsynced = 0
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _seal(self):
+        if self._file is None or self._pid != os.getpid():
+            return
+        self._sync()
+        self._file.close()
+        seal_segment(self._path)
+        self._file = None
+        self._path = None
+
+
+def seal_segment(path: Path) -> Path:
+    sealed = path.with_name(path.name[: -len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+    os.rename(path, sealed)
+    return sealed
@@ -1,3 +1,518 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.api_logs import errors, partitions, policy, spool, writer
+from apps.api_logs.middleware import ApiLog
+from apps.api_logs.models import APILog, ErrorLog
+from apps.api_logs.views import (
+    APILogsExportView,
+    APILogsListView,
+    APILogsRetrieveView,
+    EndpointStatsSummaryView,
+)
+from apps.base.parser.parser import CustomCamelCaseJSONParser
+from apps.base.utils import clean_response
+from auction_backend.paginations import CustomKeysetPagination
+
+
+@skipUnless(connection.vendor == "postgresql", "partitioning requires PostgreSQL")
+class ConvertToPartitionedTests(TestCase):
+    table = "partition_test_log"
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {self.table} ("
+                "id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, "
+                "url varchar(255) NOT NULL, "
+                "created_at timestamptz NULL, "
+                "updated_at timestamptz NULL)"
+            )
+            cursor.execute(
+                f"INSERT INTO {self.table} (url, created_at, updated_at) VALUES "
+                "('/today', now(), now()), "
+                "('/old', now() - interval '40 days', NULL), "
+                "('/null', NULL, now())"
+            )
+            cursor.execute(
+                f"CREATE INDEX {self.table}_created_idx ON {self.table} "
+                "(created_at, id)"
+            )
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            return cursor.fetchone()[0]
+
+    def indexes(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = %s", [table]
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def insert(self, created_at):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table} (url, created_at) VALUES ('/new', %s)",
+                [created_at],
+            )
+
+    def test_converts_a_table_holding_current_rows(self):
+        legacy = partitions.convert_to_partitioned(self.table, partitions.MONTH)
+
+        self.assertTrue(partitions.is_partitioned(self.table))
+        self.assertEqual(
+            partitions.list_partitions(self.table),
+            [partitions.default_name(self.table), legacy],
+        )
+        self.assertEqual(self.count(self.table), 3)
+
+        legacy_end = partitions.partition_upper_bound(legacy)
+        current = partitions.period_start(timezone.now().date(), partitions.MONTH)
+        self.assertEqual(
+            legacy_end,
+            partitions._bound(partitions.next_period(current, partitions.MONTH)),
+        )
+
+        # the current period is covered by the legacy partition
+        created = partitions.create_partitions(self.table, partitions.MONTH, 2)
+        self.assertEqual(len(created), 2)
+        self.assertNotIn(
+            partitions.partition_name(self.table, current, partitions.MONTH), created
+        )
+
+        self.insert(timezone.now())
+        self.insert(legacy_end + timedelta(hours=1))
+        self.assertEqual(self.count(legacy), 4)
+        self.assertEqual(self.count(created[0]), 1)
+
+    def test_keeps_the_secondary_indexes(self):
+        legacy = partitions.convert_to_partitioned(self.table, partitions.MONTH)
+        created = partitions.create_partitions(self.table, partitions.MONTH, 1)
+
+        self.assertIn(f"{self.table}_created_idx", self.indexes(self.table))
+        self.assertIn(f"{self.table}_created_idx_legacy", self.indexes(legacy))
+        # primary key and (created_at, id), under generated names
+        self.assertEqual(len(self.indexes(created[0])), 2)
+
+    def test_default_partition_takes_uncovered_rows(self):
+        partitions.convert_to_partitioned(self.table, partitions.MONTH)
+        default = partitions.default_name(self.table)
+        later = timezone.now() + timedelta(days=100)
+        self.insert(later)
+        self.assertEqual(self.count(default), 1)
+
+        with mock.patch.object(partitions.timezone, "now", return_value=later):
+            created = partitions.create_partitions(self.table, partitions.MONTH, 0)
+        self.assertEqual(self.count(default), 0)
+        self.assertEqual(self.count(created[0]), 1)
+        self.assertIn(default, partitions.list_partitions(self.table))
+
+    def test_expires_the_legacy_partition(self):
+        legacy = partitions.convert_to_partitioned(self.table, partitions.MONTH)
+        partitions.create_partitions(self.table, partitions.MONTH, 0)
+
+        self.assertEqual(
+            partitions.expire_partitions(self.table, partitions.MONTH, 1), []
+        )
+        later = timezone.now() + timedelta(days=120)
+        with mock.patch.object(partitions.timezone, "now", return_value=later):
+            expired = partitions.expire_partitions(self.table, partitions.MONTH, 1)
+        self.assertIn(legacy, expired)
+        self.assertNotIn(legacy, partitions.list_partitions(self.table))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        logs = APILog.objects.bulk_create(
+            [APILog(url=f"/{index}", method="GET") for index in range(7)]
+        )
+        for index, log in enumerate(logs):
+            created_at = None if index % 3 == 0 else now - timedelta(minutes=index)
+            APILog.objects.filter(pk=log.pk).update(created_at=created_at)
+        self.ids = set(APILog.objects.values_list("id", flat=True))
+
+    def paginate(self, url):
+        paginator = CustomKeysetPagination()
+        request = Request(APIRequestFactory().get(url))
+        rows = paginator.paginate_queryset(APILog.objects.all(), request)
+        return paginator, [row.pk for row in rows]
+
+    def test_walks_rows_with_null_keys_both_ways(self):
+        pages = []
+        url = "/?limit=2"
+        while url:
+            paginator, ids = self.paginate(url)
+            pages.append(ids)
+            url = paginator.get_next_link()
+        seen = [pk for ids in pages for pk in ids]
+        self.assertEqual(len(seen), len(self.ids))
+        self.assertEqual(set(seen), self.ids)
+
+        # back from the last page
+        url = paginator.get_previous_link()
+        for ids in reversed(pages[:-1]):
+            paginator, previous = self.paginate(url)
+            self.assertEqual(previous, ids)
+            url = paginator.get_previous_link()
+
+    def test_rejects_unparsable_cursor_values(self):
+        paginator = CustomKeysetPagination()
+        token = signing.dumps(
+            {"d": "n", "v": ["", "1"], "o": ["-created_at", "-id"]},
+            salt=paginator.cursor_salt,
+        )
+        with self.assertRaises(NotFound):
+            self.paginate(f"/?limit=2&cursor={token}")
+
+
+class APILogViewPermissionTests(TestCase):
+    def setUp(self):
+        self.log = APILog.objects.create(url="/", method="GET")
+        users = get_user_model().objects
+        self.user = users.create(email="user@example.com", username="user")
+        self.staff = users.create(
+            email="staff@example.com", username="staff", is_staff=True
+        )
+
+    def get(self, view, user, **kwargs):
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=user)
+        return view.as_view()(request, **kwargs)
+
+    def test_only_admins_read_the_logs(self):
+        views = [
+            (APILogsListView, {}),
+            (APILogsRetrieveView, {"pk": self.log.pk}),
+            (APILogsExportView, {}),
+            (EndpointStatsSummaryView, {}),
+        ]
+        for view, kwargs in views:
+            with self.subTest(view.__name__):
+                self.assertEqual(self.get(view, self.user, **kwargs).status_code, 403)
+                self.assertEqual(self.get(view, self.staff, **kwargs).status_code, 200)
+
+
+class APILogsExportViewTests(TestCase):
+    def setUp(self):
+        APILog.objects.bulk_create(
+            [
+                APILog(url=f"/{index}", method="GET", extra_field={"n": index})
+                for index in range(5)
+            ]
+        )
+        self.staff = get_user_model().objects.create(
+            email="staff@example.com", username="staff", is_staff=True
+        )
+
+    def export(self, url, **attrs):
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.staff)
+        view = type("ExportView", (APILogsExportView,), {"chunk_size": 2, **attrs})
+        response = view.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        lines = self.export("/").splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row["url"] for row in rows], [f"/{i}" for i in range(5)])
+        self.assertEqual(rows[0]["extra_field"], {"n": 0})
+
+    def test_csv(self):
+        rows = list(csv.reader(self.export("/?file_format=csv").splitlines()))
+        self.assertEqual(rows[0], APILogsExportView.export_fields)
+        self.assertEqual(len(rows), 6)
+        extra = rows[1][APILogsExportView.export_fields.index("extra_field")]
+        self.assertEqual(json.loads(extra), {"n": 0})
+
+    def test_keyset_chunks_without_server_side_cursors(self):
+        settings_dict = dict(connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True)
+        with mock.patch.dict(connection.settings_dict, settings_dict):
+            lines = self.export("/").splitlines()
+        self.assertEqual(len(lines), 5)
+
+    def test_rejects_unknown_formats(self):
+        request = APIRequestFactory().get("/?file_format=xml")
+        force_authenticate(request, user=self.staff)
+        self.assertEqual(APILogsExportView.as_view()(request).status_code, 400)
+
+
+class LoggingPolicyTests(SimpleTestCase):
+    def setUp(self):
+        self.policy = policy.LoggingPolicy(
+            rules=[
+                {"path": r"^/api/v1/auth/", "tier": policy.HEADERS},
+                {"path": r"^/api/v1/health", "tier": policy.OFF},
+                {"path": r"^/api/v1/bids/", "methods": ["POST"], "sample_rate": 0.1},
+            ],
+            status_sample_rates={"2xx": 0.5},
+            slow_request_ms=500,
+        )
+
+    def decide(self, method, path):
+        return self.policy.decide(getattr(APIRequestFactory(), method)(path))
+
+    def test_tiers_by_route(self):
+        self.assertIsNone(self.decide("get", "/api/v1/users/"))
+        self.assertIsNone(self.decide("post", "/admin/login/"))
+        self.assertIsNone(self.decide("post", "/api/v1/health"))
+        self.assertEqual(self.decide("post", "/api/v1/auth/login").tier, policy.HEADERS)
+        self.assertEqual(self.decide("post", "/api/v1/users/").tier, policy.FULL)
+
+    def test_samples_by_route_then_status(self):
+        decision = self.decide("post", "/api/v1/bids/")._replace(roll=0.3)
+        self.assertEqual(self.policy.keep(decision, 201, 10), (False, 0.1))
+        # errors and slow requests are always kept
+        self.assertEqual(self.policy.keep(decision, 503, 10), (True, 1.0))
+        self.assertEqual(self.policy.keep(decision, 201, 800), (True, 1.0))
+
+        decision = self.decide("post", "/api/v1/users/")._replace(roll=0.3)
+        self.assertEqual(self.policy.keep(decision, 201, 10), (True, 0.5))
+        self.assertEqual(self.policy.keep(decision, 400, 10), (True, 1.0))
+
+    def test_rejects_unknown_tiers(self):
+        with self.assertRaises(ValueError):
+            policy.LoggingPolicy(rules=[{"path": "/", "tier": "body"}])
+
+
+class BufferedLogWriterTests(TestCase):
+    def make_writer(self, **options):
+        instance = writer.BufferedLogWriter(**options)
+        # the tests flush from the test thread
+        patcher = mock.patch.object(instance, "start")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return instance
+
+    def test_flush_writes_in_batches(self):
+        instance = self.make_writer(batch_size=2)
+        for index in range(5):
+            self.assertTrue(instance.enqueue({"url": f"/{index}", "method": "GET"}))
+        with CaptureQueriesContext(connection) as queries:
+            instance.flush()
+        inserts = [query for query in queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(instance.written, 5)
+        self.assertEqual(APILog.objects.count(), 5)
+
+    def test_drops_when_the_queue_is_full(self):
+        for policy in (writer.DROP, writer.BLOCK):
+            with self.subTest(policy):
+                instance = self.make_writer(
+                    max_queue_size=2, overflow_policy=policy, block_timeout_ms=10
+                )
+                results = [instance.enqueue({"url": "/"}) for _ in range(3)]
+                self.assertEqual(results, [True, True, False])
+                self.assertEqual(instance.dropped, 1)
+
+    def test_rejects_unknown_overflow_policies(self):
+        with self.assertRaises(ValueError):
+            writer.BufferedLogWriter(overflow_policy="wait")
+
+    def test_logs_failed_batches(self):
+        instance = self.make_writer()
+        instance.enqueue({"no_such_field": 1})
+        with self.assertLogs(writer.logger, "ERROR"):
+            instance.flush()
+        self.assertEqual(instance.written, 0)
+
+
+class SegmentSpoolTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def make_spool(self, background=False, **options):
+        options = {"fsync_every": 1000, "fsync_interval_ms": 60_000, **options}
+        instance = spool.SegmentSpool(self.directory, **options)
+        if not background:
+            # the tests call `tick()` themselves
+            patcher = mock.patch.object(instance, "start")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(instance.close)
+        return instance
+
+    def segments(self, suffix=spool.SEALED_SUFFIX):
+        return sorted(self.directory.glob(f"*{suffix}"))
+
+    def urls(self):
+        return [
+            json.loads(line)["url"]
+            for path in self.segments()
+            for line in path.read_text().splitlines()
+        ]
+
+    def test_rotates_by_size_and_seals_on_close(self):
+        instance = self.make_spool(max_segment_bytes=100)
+        for index in range(5):
+            self.assertTrue(instance.enqueue({"url": f"/{index}", "body": "x" * 80}))
+        self.assertEqual(len(self.segments()), 4)
+        instance.close()
+        self.assertEqual(self.segments(spool.OPEN_SUFFIX), [])
+        self.assertEqual(self.urls(), ["/0", "/1", "/2", "/3", "/4"])
+
+    def test_request_thread_does_not_fsync(self):
+        instance = self.make_spool(fsync_every=2)
+        with mock.patch.object(spool.os, "fsync") as fsync:
+            instance.enqueue({"url": "/"})
+            instance.tick()
+            fsync.assert_not_called()
+            instance.enqueue({"url": "/"})
+            fsync.assert_not_called()
+            instance.tick()
+            fsync.assert_called_once()
+
+    def test_background_thread_seals_idle_segments(self):
+        instance = self.make_spool(background=True, max_segment_age_s=0.1)
+        instance.enqueue({"url": "/"})
+        deadline = time.monotonic() + 5
+        while not self.segments() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.urls(), ["/"])
+        self.assertEqual(self.segments(spool.OPEN_SUFFIX), [])
+
+    def test_disk_errors_count_as_drops(self):
+        instance = self.make_spool(fsync_every=1)
+        with mock.patch.object(spool.os, "fsync", side_effect=OSError):
+            self.assertTrue(instance.enqueue({"url": "/"}))
+            with self.assertLogs(spool.logger):
+                instance.tick()
+
+        instance = self.make_spool(max_segment_bytes=1)
+        instance.enqueue({"url": "/"})
+        # rotating seals, and syncs, the full segment
+        with mock.patch.object(spool.os, "fsync", side_effect=OSError):
+            self.assertFalse(instance.enqueue({"url": "/"}))
+        self.assertEqual(instance.dropped, 1)
+
+    def test_forked_worker_opens_its_own_segment(self):
+        instance = self.make_spool()
+        instance.enqueue({"url": "/parent"})
+        (parent,) = self.segments(spool.OPEN_SUFFIX)
+
+        child_pid = spool.os.getpid() + 1
+        with mock.patch.object(spool.os, "getpid", return_value=child_pid):
+            instance.enqueue({"url": "/child"})
+            instance.close()
+        # the child never writes into nor seals the parent's segment
+        self.assertTrue(parent.exists())
+        (child,) = self.segments()
+        self.assertEqual(spool.segment_pid(child), child_pid)
+        self.assertEqual(self.urls(), ["/child"])
+
+
+def raise_lookup(message, exception_class=LookupError):
+    try:
+        raise exception_class(message)
+    except exception_class as exc:
+        return exc
+
+
+class ErrorCaptureTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.request = APIRequestFactory().get("/api/v1/items/12")
+        # the tests flush themselves
+        patcher = mock.patch.object(errors, "_schedule_flush")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(errors._pending.clear)
+
+    def fingerprint(self, exception):
+        frames = errors.app_frames(exception.__traceback__)
+        return errors.fingerprint(exception, frames)
+
+    def test_fingerprint_ignores_ids_and_values(self):
+        self.assertEqual(
+            self.fingerprint(raise_lookup("Item 12 of 'abc' not found")),
+            self.fingerprint(raise_lookup("Item 99 of 'xyz' not found")),
+        )
+        self.assertNotEqual(
+            self.fingerprint(raise_lookup("Item 12 not found")),
+            self.fingerprint(raise_lookup("Item 12 not found", KeyError)),
+        )
+        self.assertNotEqual(
+            self.fingerprint(raise_lookup("Item 12 not found")),
+            self.fingerprint(raise_lookup("Item 12 is gone")),
+        )
+
+    def test_reservoir_keeps_at_most_size_samples(self):
+        samples = []
+        for seen in range(1, 101):
+            samples = errors._reservoir(samples, seen, seen, 3)
+            self.assertEqual(len(samples), min(seen, 3))
+        self.assertTrue(all(1 <= sample <= 100 for sample in samples))
+
+    def test_counts_the_tail_of_a_burst(self):
+        for index in range(3):
+            errors.capture_exception(self.request, raise_lookup(f"Item {index}"))
+        error_log = ErrorLog.objects.get()
+        self.assertEqual(error_log.occurrences, 1)
+        self.assertEqual(len(error_log.samples), 1)
+
+        # still locked, nothing to write yet
+        with mock.patch.object(errors, "close_old_connections"):
+            errors.flush_pending()
+            error_log.refresh_from_db()
+            self.assertEqual(error_log.occurrences, 1)
+
+            cache.delete(errors._lock_key(error_log.fingerprint))
+            errors.flush_pending()
+        error_log.refresh_from_db()
+        self.assertEqual(error_log.occurrences, 3)
+        self.assertEqual(errors._pending, {})
+
+
+class ApiLogPayloadTests(SimpleTestCase):
+    def test_logs_body_and_response_with_the_same_keys(self):
+        request = APIRequestFactory().post(
+            "/api/v1/users",
+            {"userName": "a", "newPassword": "x", "roleIds": [{"roleId": 1}]},
+            format="json",
+        )
+        # the view never parsed the body
+        body = ApiLog(lambda request: None)._get_request_body(request)
+        self.assertEqual(
+            body,
+            {"user_name": "a", "new_password": "x", "role_ids": [{"role_id": 1}]},
+        )
+
+        response = Response({"user_name": "a", "role_ids": [{"role_id": 1}]})
+        self.assertEqual(clean_response(response), response.data)
+
+    def test_reuses_the_payload_parsed_by_the_view(self):
+        request = APIRequestFactory().post(
+            "/api/v1/users", {"userName": "a"}, format="json"
+        )
+        drf_request = Request(request, parsers=[CustomCamelCaseJSONParser()])
+        self.assertEqual(drf_request.data, {"user_name": "a"})
+        self.assertEqual(request.parsed_payload, {"user_name": "a"})
+
+        middleware = ApiLog(lambda request: None)
+        with mock.patch.object(middleware, "_parse_body") as parse_body:
+            body = middleware._get_request_body(request)
+        parse_body.assert_not_called()
+        self.assertEqual(body, {"user_name": "a"})
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from apps.api_logs.views import (
+    APILogsExportView,
+    APILogsListView,
+    APILogsRetrieveView,
+    EndpointStatsSummaryView,
+)
+
+urlpatterns = [
+    path("logs", APILogsListView.as_view(), name="api-log-list"),
+    path("logs/export", APILogsExportView.as_view(), name="api-log-export"),
+    path("logs/<int:pk>", APILogsRetrieveView.as_view(), name="api-log-retrieve"),
+    path(
+        "logs/endpoint-stats",
+        EndpointStatsSummaryView.as_view(),
+        name="api-log-endpoint-stats",
+    ),
+]
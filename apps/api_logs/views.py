@@ -1,14 +1,41 @@
 # from rest_framework import filters
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import IsAdminUser
 
-from apps.base.views import CustomGenericListView, CustomGenericRetrieveView
+from apps.base.libs.search import PostgresSearchFilter
+from apps.base.views import (
+    BaseAPIView,
+    CustomAPIResponse,
+    CustomGenericListView,
+    CustomGenericRetrieveView,
+)
+from auction_backend.paginations import CustomKeysetPagination
 
-from .models import APILog
+from .models import APILog, EndpointStatMinute
+from .rollup import LATENCY_BUCKETS_MS, percentile_from_buckets, window_start
 from .serializers import ApiLogsListSerializer, ApiLogsRetrieveSerializer
 
 
+def _day_start(value):
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
 class APILogsFilter(filters.FilterSet):
-    created_at = filters.DateFilter(field_name="created_at", lookup_expr="date")
+    # `created_at` is the partition key of the log tables. The date filters
+    # compare the column against a range instead of `created_at::date`,
+    # so Postgres only scans the matching partitions.
+    created_at = filters.DateFilter(method="filter_created_at")
+    created_at_after = filters.DateFilter(method="filter_created_at_after")
+    created_at_before = filters.DateFilter(method="filter_created_at_before")
 
     class Meta:
         model = APILog
@@ -20,18 +47,244 @@ class APILogsFilter(filters.FilterSet):
             "created_at_bs",
         ]
 
+    def filter_created_at(self, queryset, name, value):
+        start = _day_start(value)
+        return queryset.filter(
+            created_at__gte=start, created_at__lt=start + timedelta(days=1)
+        )
+
+    def filter_created_at_after(self, queryset, name, value):
+        return queryset.filter(created_at__gte=_day_start(value))
+
+    def filter_created_at_before(self, queryset, name, value):
+        # inclusive of the given day
+        return queryset.filter(created_at__lt=_day_start(value) + timedelta(days=1))
+
 
 class APILogsListView(CustomGenericListView):
+    # the logs hold every user's payloads, headers and cookies
+    permission_classes = [IsAdminUser]
     serializer_class = ApiLogsListSerializer
-    queryset = APILog.objects.all()
+    # the list never shows the payloads, do not even transfer them
+    queryset = APILog.objects.defer("body", "header", "response")
     # filterset_fields = ["created_at", "created_at_bs"]
     filterset_class = APILogsFilter
+    # `?search=` served by pg_trgm indexes, see `make_search_migration`
+    filter_backends = [
+        filters.DjangoFilterBackend,
+        PostgresSearchFilter,
+        OrderingFilter,
+    ]
+    # constant cost per page, no COUNT(*) over the log table
+    pagination_class = CustomKeysetPagination
     search_fields = [
         "url",
         "status_code",
     ]
 
 
+class _Echo:
+    # csv.writer target, `writerow` returns the line instead of buffering it
+    def write(self, value):
+        return value
+
+
+class APILogsExportView(APILogsListView):
+    """
+    Streams the logs matching the list filters/search as NDJSON
+    (`?file_format=ndjson`, default) or CSV (`?file_format=csv`).
+    Rows are read in chunks as plain tuples, never through serializers,
+    so memory stays flat whatever the size of the export.
+    """
+
+    # the whole log table, whatever the list view allows
+    permission_classes = [IsAdminUser]
+    filter_backends = [filters.DjangoFilterBackend, PostgresSearchFilter]
+    pagination_class = None
+    # the columns are `export_fields`, no `?fields=` / `?omit=`
+    fields_query_param = None
+    omit_query_param = None
+    chunk_size = 2000
+    export_fields = [
+        "id",
+        "created_at",
+        "url",
+        "route",
+        "method",
+        "status_code",
+        "latency_ms",
+        "request_size",
+        "response_size",
+        "ip",
+        "user_agent",
+        "user_id",
+        "extra_field",
+    ]
+    # JSON columns written as JSON text in CSV cells
+    json_fields = {"extra_field"}
+
+    def list(self, request, *args, **kwargs):
+        file_format = request.query_params.get("file_format", "ndjson").lower()
+        if file_format not in ("ndjson", "csv"):
+            return CustomAPIResponse.custom_error_response(
+                message="file_format must be ndjson or csv."
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.iter_rows(queryset)
+        if file_format == "csv":
+            content, content_type = self.iter_csv(rows), "text/csv"
+        else:
+            content, content_type = self.iter_ndjson(rows), "application/x-ndjson"
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"api_logs_{timezone.now():%Y%m%d%H%M%S}.{file_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def iter_rows(self, queryset):
+        """
+        Yields lists of row tuples. Uses a server-side cursor when the
+        database allows it, otherwise walks the primary key in chunks
+        (`DISABLE_SERVER_SIDE_CURSORS` is set for transaction poolers, and a
+        client-side cursor would fetch the whole result at once).
+        """
+        queryset = queryset.values_list(*self.export_fields)
+        settings_dict = connections[queryset.db].settings_dict
+        if not settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+            chunk = []
+            for row in queryset.order_by("pk").iterator(chunk_size=self.chunk_size):
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+            return
+
+        pk_index = self.export_fields.index("id")
+        last_pk = None
+        while True:
+            page = queryset.order_by("pk")
+            if last_pk is not None:
+                page = page.filter(pk__gt=last_pk)
+            chunk = list(page[: self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1][pk_index]
+
+    def iter_ndjson(self, rows):
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for chunk in rows:
+            yield "".join(
+                encoder.encode(dict(zip(self.export_fields, row))) + "\n"
+                for row in chunk
+            )
+
+    def iter_csv(self, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.export_fields)
+        json_indexes = [
+            index
+            for index, field in enumerate(self.export_fields)
+            if field in self.json_fields
+        ]
+        for chunk in rows:
+            lines = []
+            for row in chunk:
+                if json_indexes:
+                    row = list(row)
+                    for index in json_indexes:
+                        if row[index] is not None:
+                            row[index] = json.dumps(row[index], cls=DjangoJSONEncoder)
+                lines.append(writer.writerow(row))
+            yield "".join(lines)
+
+
 class APILogsRetrieveView(CustomGenericRetrieveView):
+    permission_classes = [IsAdminUser]
     serializer_class = ApiLogsRetrieveSerializer
     queryset = APILog.objects.all()
+    # validated by the row's `updated_at`, no extra query
+    conditional_get = True
+
+
+class EndpointStatsSummaryView(BaseAPIView):
+    """
+    Per endpoint request count, error rate, latency percentiles and bytes
+    over the last `hours` (default 24), read from the per-minute rollup
+    instead of the raw log rows. Optional `route` and `method` filters.
+    """
+
+    permission_classes = [IsAdminUser]
+    max_hours = 24 * 31
+
+    def get(self, request, *args, **kwargs):
+        try:
+            hours = float(request.query_params.get("hours", 24))
+        except ValueError:
+            return self.custom_error_response(message="Invalid hours.")
+        hours = min(max(hours, 1 / 60), self.max_hours)
+
+        queryset = EndpointStatMinute.objects.filter(minute__gte=window_start(hours))
+        if request.query_params.get("route"):
+            queryset = queryset.filter(route=request.query_params["route"])
+        if request.query_params.get("method"):
+            queryset = queryset.filter(method=request.query_params["method"].upper())
+
+        endpoints = {}
+        for row in queryset.values(
+            "route",
+            "method",
+            "count",
+            "error_count",
+            "latency_sum",
+            "latency_buckets",
+            "bytes_in",
+            "bytes_out",
+        ).iterator():
+            stat = endpoints.setdefault(
+                (row["route"], row["method"]),
+                {
+                    "count": 0,
+                    "errors": 0,
+                    "latency_sum": 0.0,
+                    "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                },
+            )
+            stat["count"] += row["count"]
+            stat["errors"] += row["error_count"]
+            stat["latency_sum"] += row["latency_sum"]
+            for index, bucket in enumerate(row["latency_buckets"]):
+                stat["buckets"][index] += bucket
+            stat["bytes_in"] += row["bytes_in"]
+            stat["bytes_out"] += row["bytes_out"]
+
+        data = [
+            {
+                "route": route,
+                "method": method,
+                "count": stat["count"],
+                "error_count": stat["errors"],
+                "error_rate": round(stat["errors"] / stat["count"], 4),
+                "avg_latency_ms": round(stat["latency_sum"] / stat["count"], 2),
+                # bucket upper bounds, None when slower than the last bound
+                "p50_latency_ms": percentile_from_buckets(stat["buckets"], 0.5),
+                "p95_latency_ms": percentile_from_buckets(stat["buckets"], 0.95),
+                "p99_latency_ms": percentile_from_buckets(stat["buckets"], 0.99),
+                "bytes_in": stat["bytes_in"],
+                "bytes_out": stat["bytes_out"],
+            }
+            for (route, method), stat in sorted(
+                endpoints.items(), key=lambda item: -item[1]["count"]
+            )
+            if stat["count"]
+        ]
+        return self.custom_success_response(
+            data=data,
+            message="Endpoint statistics retrieved successfully.",
+            detail={"hours": hours, "latency_buckets_ms": LATENCY_BUCKETS_MS},
+        )
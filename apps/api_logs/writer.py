@@ -0,0 +1,186 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+DROP = "drop"
+BLOCK = "block"
+
+
+class BufferedLogWriter:
+    """
+    Queues log records in memory and writes them with `bulk_create`
+    from a background thread, so the request thread never waits on
+    an INSERT.
+
+    A batch is flushed when `batch_size` records are queued or when
+    `flush_interval_ms` has passed since the first record of the batch.
+    The queue is bounded by `max_queue_size`; when it is full, records are
+    dropped (`drop`) or the caller waits up to `block_timeout_ms` (`block`).
+    """
+
+    def __init__(
+        self,
+        model_label="api_logs.APILog",
+        batch_size=200,
+        flush_interval_ms=1000,
+        max_queue_size=10000,
+        overflow_policy=DROP,
+        block_timeout_ms=50,
+    ):
+        if overflow_policy not in (DROP, BLOCK):
+            raise ValueError(f"Invalid overflow policy: {overflow_policy}")
+
+        self.model_label = model_label
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout_ms / 1000
+
+        self.dropped = 0
+        self.written = 0
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="api-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def enqueue(self, record: dict) -> bool:
+        """
+        Queue a record (the kwargs of a model instance).
+        Returns False when the record was dropped.
+        """
+        if not self._thread or not self._thread.is_alive():
+            self.start()
+        try:
+            if self.overflow_policy == BLOCK:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self):
+        """
+        Write everything currently queued, from the calling thread.
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def close(self, timeout=5):
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        model = self.model
+        with self._write_lock:
+            try:
+                model.objects.bulk_create(
+                    [model(**record) for record in batch], batch_size=self.batch_size
+                )
+                self.written += len(batch)
+            except Exception:
+                logger.exception("Failed to write %s api log records.", len(batch))
+            finally:
+                # the writer thread owns its connection, respect CONN_MAX_AGE
+                close_old_connections()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """
+    Returns the process wide log sink selected by `API_LOG_SINK`:
+    `writer` (batched `bulk_create`) or `spool` (NDJSON segment files
+    loaded later by `manage.py ingest_api_logs`).
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = _build_sink()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def _build_sink():
+    if getattr(settings, "API_LOG_SINK", "writer") == "spool":
+        from .spool import SegmentSpool
+
+        conf = settings.API_LOG_SPOOL
+        return SegmentSpool(
+            directory=conf["DIR"],
+            max_segment_bytes=conf.get("MAX_SEGMENT_BYTES", 64 * 1024 * 1024),
+            max_segment_age_s=conf.get("MAX_SEGMENT_AGE_S", 60),
+            fsync_every=conf.get("FSYNC_EVERY", 100),
+            fsync_interval_ms=conf.get("FSYNC_INTERVAL_MS", 1000),
+        )
+
+    conf = getattr(settings, "API_LOG_WRITER", {})
+    return BufferedLogWriter(
+        batch_size=conf.get("BATCH_SIZE", 200),
+        flush_interval_ms=conf.get("FLUSH_INTERVAL_MS", 1000),
+        max_queue_size=conf.get("MAX_QUEUE_SIZE", 10000),
+        overflow_policy=conf.get("OVERFLOW_POLICY", DROP),
+        block_timeout_ms=conf.get("BLOCK_TIMEOUT_MS", 50),
+    )
@@ -2,4 +2,5 @@ from django.urls import include, path
 
 urlpatterns = [
     path("auth/", include("apps.authentication.urls")),
+    path("api-logs/", include("apps.api_logs.urls")),
 ]
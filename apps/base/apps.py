@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class BaseConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.base"
+
+    def ready(self):
+        from .libs import response_cache
+
+        response_cache.connect_signals()
@@ -0,0 +1,245 @@
+import json
+import struct
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is used without it
+    zstandard = None
+
+# First byte of a stored value. Plain JSON text (e.g. a jsonb column
+# converted with `convert_to`) starts with a printable character and is
+# read as is.
+ZLIB = 0x01
+ZSTD = 0x02
+CODECS = {"zlib": ZLIB, "zstd": ZSTD}
+
+# codec byte + id of the `CompressionDictionary` (0 = no dictionary)
+_HEADER = struct.Struct(">BI")
+
+# dictionaries never change once trained, cached for the process lifetime
+_dictionaries = {}
+# active dictionary id per label, re-read every ACTIVE_DICTIONARY_TTL
+_active = {}
+_lock = threading.Lock()
+ACTIVE_DICTIONARY_TTL = 300
+
+
+def get_compression_settings():
+    conf = getattr(settings, "PAYLOAD_COMPRESSION", {})
+    codec = conf.get("CODEC", "zstd" if zstandard else "zlib")
+    if codec == "zstd" and zstandard is None:
+        codec = "zlib"
+    return codec, conf.get("LEVEL", 3), conf.get("USE_DICTIONARY", True)
+
+
+def get_dictionary(dictionary_id):
+    data = _dictionaries.get(dictionary_id)
+    if data is None:
+        from apps.base.models import CompressionDictionary
+
+        data = bytes(
+            CompressionDictionary.objects.values_list("data", flat=True).get(
+                pk=dictionary_id
+            )
+        )
+        _dictionaries[dictionary_id] = data
+    return data
+
+
+def get_active_dictionary(label, codec):
+    """
+    `(id, data)` of the active dictionary trained for `label` and `codec`,
+    `(0, None)` when there is none.
+    """
+    now = time.monotonic()
+    cached = _active.get((label, codec))
+    if cached and cached[0] > now:
+        return cached[1]
+
+    from apps.base.models import CompressionDictionary
+
+    dictionary_id = (
+        CompressionDictionary.objects.filter(label=label, codec=codec, active=True)
+        .order_by("-id")
+        .values_list("id", flat=True)
+        .first()
+    )
+    result = (0, None)
+    if dictionary_id:
+        result = (dictionary_id, get_dictionary(dictionary_id))
+    with _lock:
+        _active[(label, codec)] = (now + ACTIVE_DICTIONARY_TTL, result)
+    return result
+
+
+def reset_dictionary_cache():
+    with _lock:
+        _active.clear()
+
+
+def compress(raw: bytes, codec, level=3, dictionary_id=0, dictionary=None) -> bytes:
+    if codec == "zstd":
+        params = {"level": level}
+        if dictionary:
+            params["dict_data"] = zstandard.ZstdCompressionDict(dictionary)
+        payload = zstandard.ZstdCompressor(**params).compress(raw)
+    else:
+        compressor = (
+            zlib.compressobj(level, zdict=dictionary)
+            if dictionary
+            else zlib.compressobj(level)
+        )
+        payload = compressor.compress(raw) + compressor.flush()
+    return _HEADER.pack(CODECS[codec], dictionary_id) + payload
+
+
+def decompress(value: bytes) -> bytes:
+    if not value or value[0] not in (ZLIB, ZSTD):
+        # stored uncompressed
+        return value
+
+    codec, dictionary_id = _HEADER.unpack_from(value)
+    payload = value[_HEADER.size :]
+    dictionary = get_dictionary(dictionary_id) if dictionary_id else None
+    if codec == ZSTD:
+        if zstandard is None:
+            raise ImproperlyConfigured(
+                "The zstandard package is required to read zstd payloads."
+            )
+        params = {}
+        if dictionary:
+            params["dict_data"] = zstandard.ZstdCompressionDict(dictionary)
+        return zstandard.ZstdDecompressor(**params).decompress(payload)
+    decompressor = (
+        zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    )
+    return decompressor.decompress(payload) + decompressor.flush()
+
+
+def header_of(value: bytes):
+    """
+    `(codec byte, dictionary id)` of a stored value, `(None, 0)` for plain JSON.
+    """
+    if not value or value[0] not in (ZLIB, ZSTD):
+        return None, 0
+    return _HEADER.unpack_from(value)
+
+
+class LazyJSON:
+    """
+    A compressed JSON payload as loaded from the database. Decompressed
+    and parsed on first access of `value`, so rows whose payload is never
+    looked at cost nothing but the transfer.
+    """
+
+    __slots__ = ("raw", "_value")
+    _missing = object()
+
+    def __init__(self, raw):
+        self.raw = bytes(raw)
+        self._value = self._missing
+
+    @property
+    def value(self):
+        if self._value is self._missing:
+            self._value = json.loads(decompress(self.raw))
+        return self._value
+
+    def __eq__(self, other):
+        if isinstance(other, LazyJSON):
+            return self.raw == other.raw or self.value == other.value
+        return self.value == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self._value is self._missing:
+            return f"<LazyJSON: {len(self.raw)} bytes>"
+        return f"<LazyJSON: {self._value!r}>"
+
+
+class CompressedJSONField(models.BinaryField):
+    """
+    JSON stored as compressed canonical JSON in a `bytea` column.
+
+    Values are compressed with `PAYLOAD_COMPRESSION["CODEC"]` (zstd when
+    the `zstandard` package is installed, zlib otherwise) and, when one has
+    been trained for `dictionary_label`, a shared dictionary; see
+    `manage.py train_compression_dictionary`. Each value records its codec
+    and dictionary, so older rows stay readable after retraining.
+
+    Loaded values are `LazyJSON` wrappers, use `.value` (or
+    `CompressedJSONSerializerField`) to get the data.
+    """
+
+    def __init__(
+        self, *args, dictionary_label=None, encoder=DjangoJSONEncoder, **kwargs
+    ):
+        self.dictionary_label = dictionary_label
+        self.encoder = encoder
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dictionary_label is not None:
+            kwargs["dictionary_label"] = self.dictionary_label
+        if self.encoder is not DjangoJSONEncoder:
+            kwargs["encoder"] = self.encoder
+        return name, path, args, kwargs
+
+    def canonical_json(self, value) -> bytes:
+        return json.dumps(
+            value,
+            cls=self.encoder,
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+    def compress(self, value) -> bytes:
+        if isinstance(value, LazyJSON):
+            value = value.value
+        codec, level, use_dictionary = get_compression_settings()
+        dictionary_id, dictionary = (
+            get_active_dictionary(self.dictionary_label, codec)
+            if use_dictionary and self.dictionary_label
+            else (0, None)
+        )
+        return compress(
+            self.canonical_json(value),
+            codec,
+            level=level,
+            dictionary_id=dictionary_id,
+            dictionary=dictionary,
+        )
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+        return super().get_db_prep_value(self.compress(value), connection, prepared)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return LazyJSON(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, LazyJSON):
+            return value
+        if isinstance(value, (bytes, memoryview)):
+            return LazyJSON(value)
+        return value
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        if isinstance(value, LazyJSON):
+            value = value.value
+        return json.dumps(value, cls=self.encoder)
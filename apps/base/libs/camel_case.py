@@ -0,0 +1,154 @@
+from functools import lru_cache
+from math import isfinite
+
+from django.core.files import File
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from djangorestframework_camel_case.util import (
+    camel_to_underscore,
+    camelize_re,
+    is_iterable,
+    underscore_to_camel,
+)
+
+# distinct keys kept per direction; field names are a small fixed set,
+# the bound only matters for payloads keyed by data (ids, user input)
+KEY_CACHE_SIZE = 4096
+
+SCALARS = (str, int, float, bool, type(None))
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def camelize_key(key: str) -> str:
+    if "_" not in key:
+        return key
+    return camelize_re.sub(underscore_to_camel, key)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def underscore_key(key: str, no_underscore_before_number: bool = False) -> str:
+    return camel_to_underscore(
+        key, no_underscore_before_number=no_underscore_before_number
+    )
+
+
+def key_cache_stats():
+    """
+    Hits, misses, size and hit rate of the key caches of this process,
+    per direction.
+    """
+    stats = {}
+    for name, cached in (("camelize", camelize_key), ("underscoreize", underscore_key)):
+        info = cached.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+            "hit_rate": info.hits / lookups if lookups else None,
+        }
+    return stats
+
+
+def camelize(data, ignore_fields=None, ignore_keys=None, allow_nan=True, **options):
+    """
+    `djangorestframework_camel_case.util.camelize` with memoized keys,
+    producing plain dicts and lists (ready for any JSON encoder) instead of
+    `OrderedDict` / `ReturnDict` copies. Like upstream, every iterable but
+    strings and bytes (querysets, generators, sets, ...) becomes a list;
+    other values are left to the encoder.
+
+    `allow_nan=False` raises `ValueError` on NaN and infinities, as the
+    stdlib encoder does, for encoders that would write them as null.
+    """
+    ignore_fields = ignore_fields or ()
+    ignore_keys = ignore_keys or ()
+
+    def walk(data):
+        if isinstance(data, SCALARS):
+            if not allow_nan and isinstance(data, float) and not isfinite(data):
+                raise ValueError("Out of range float values are not JSON compliant")
+            return data
+        if isinstance(data, dict):
+            new_dict = {}
+            for key, value in data.items():
+                if isinstance(key, Promise):
+                    key = force_str(key)
+                new_key = camelize_key(key) if isinstance(key, str) else key
+                if ignore_fields and (key in ignore_fields or new_key in ignore_fields):
+                    result = value
+                else:
+                    result = walk(value)
+                if ignore_keys and (key in ignore_keys or new_key in ignore_keys):
+                    new_dict[key] = result
+                else:
+                    new_dict[new_key] = result
+            return new_dict
+        if isinstance(data, (list, tuple)):
+            return [walk(item) for item in data]
+        if isinstance(data, Promise):
+            return force_str(data)
+        if not isinstance(data, (bytes, bytearray)) and is_iterable(data):
+            return [walk(item) for item in data]
+        return data
+
+    return walk(data)
+
+
+def underscoreize(
+    data,
+    ignore_fields=None,
+    ignore_keys=None,
+    no_underscore_before_number=False,
+    **options,
+):
+    """
+    `djangorestframework_camel_case.util.underscoreize` with memoized keys:
+    a key repeated across the items of a payload (nested multipart forms,
+    lists of objects) is converted once per process instead of once per
+    occurrence. Same output types (`QueryDict`, `MultiValueDict`, dict,
+    list).
+    """
+    ignore_fields = ignore_fields or ()
+    ignore_keys = ignore_keys or ()
+
+    def convert(key):
+        if not isinstance(key, str):
+            return key
+        return underscore_key(key, no_underscore_before_number)
+
+    def walk(data):
+        if isinstance(data, SCALARS):
+            return data
+        if isinstance(data, dict):
+            if type(data) is MultiValueDict:
+                new_data = MultiValueDict()
+                for key in data:
+                    new_data.setlist(convert(key), data.getlist(key))
+                return new_data
+            items = data.lists() if isinstance(data, QueryDict) else data.items()
+            new_dict = {}
+            for key, value in items:
+                new_key = convert(key)
+                if ignore_fields and (key in ignore_fields or new_key in ignore_fields):
+                    result = value
+                else:
+                    result = walk(value)
+                if ignore_keys and (key in ignore_keys or new_key in ignore_keys):
+                    new_dict[key] = result
+                else:
+                    new_dict[new_key] = result
+            if isinstance(data, QueryDict):
+                new_query = QueryDict(mutable=True)
+                for key, value in new_dict.items():
+                    new_query.setlist(key, value)
+                return new_query
+            return new_dict
+        if is_iterable(data) and not isinstance(data, File):
+            return [walk(item) for item in data]
+        return data
+
+    return walk(data)
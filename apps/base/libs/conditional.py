@@ -0,0 +1,72 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# the column every `AbstractBaseModel` bumps on save
+UPDATED_AT = "updated_at"
+
+
+def has_updated_at(model) -> bool:
+    return any(field.name == UPDATED_AT for field in model._meta.concrete_fields)
+
+
+def make_etag(request, *parts) -> str:
+    """
+    Weak ETag over `parts` and what else shapes the response body: the
+    query string (page, filters, `?fields=`), the negotiated media type
+    and the user.
+    """
+    key = "|".join(
+        str(part)
+        for part in (
+            *parts,
+            request.get_full_path(),
+            getattr(request, "accepted_media_type", ""),
+            getattr(getattr(request, "user", None), "pk", None),
+        )
+    )
+    return f'W/"{hashlib.sha1(key.encode("utf-8")).hexdigest()}"'
+
+
+def list_fingerprint(queryset):
+    """
+    `(MAX(updated_at), COUNT(*))` of the filtered queryset in one query.
+    The count catches deletions, which leave the maximum as it was.
+    """
+    result = queryset.order_by().aggregate(
+        last_modified=Max(UPDATED_AT), count=Count("pk")
+    )
+    return result["last_modified"], result["count"]
+
+
+async def alist_fingerprint(queryset):
+    result = await queryset.order_by().aaggregate(
+        last_modified=Max(UPDATED_AT), count=Count("pk")
+    )
+    return result["last_modified"], result["count"]
+
+
+def not_modified_response(request, etag, last_modified=None):
+    """
+    A 304 response when `If-None-Match` / `If-Modified-Since` show the
+    client's copy is current, None otherwise.
+    """
+    response = get_conditional_response(
+        getattr(request, "_request", request),
+        etag=etag,
+        last_modified=last_modified and int(last_modified.timestamp()),
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    if response.status_code not in (200, 304):
+        return response
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,136 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# How `CustomPagination` counts the rows of a list:
+EXACT = "exact"  # COUNT(*) on every request
+ESTIMATE = "estimate"  # planner estimate when unfiltered, cached exact otherwise
+CACHED = "cached"  # exact COUNT(*) cached per filter signature
+HAS_MORE = "has_more"  # no count, fetch limit + 1 rows
+
+STRATEGIES = (EXACT, ESTIMATE, CACHED, HAS_MORE)
+
+
+def is_filtered(queryset, base_queryset) -> bool:
+    """
+    True when filters/search narrowed `queryset` compared with the view's
+    own queryset (soft delete and other manager filters do not count).
+    """
+    return queryset.query.where != base_queryset.query.where
+
+
+def estimated_count(queryset):
+    """
+    Planner row estimate: `pg_class.reltuples` for a plain table scan,
+    the `EXPLAIN` estimate otherwise. None when not available.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed/analyzed
+            if row and row[0] >= 0:
+                return int(row[0])
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def cached_count(queryset, timeout):
+    """
+    Exact count cached for `timeout` seconds per SQL signature,
+    i.e. per combination of filters.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    signature = hashlib.sha1(f"{sql}|{params!r}".encode("utf-8")).hexdigest()
+    key = f"list-count:{queryset.model._meta.label_lower}:{signature}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class CountingPaginator(DjangoPaginator):
+    """
+    Django paginator that counts with one of the strategies above.
+    `count_is_exact` tells whether `count` is a real row count.
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        strategy=EXACT,
+        filtered=True,
+        cache_timeout=60,
+        **kwargs,
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.strategy = strategy
+        self.filtered = filtered
+        self.cache_timeout = cache_timeout
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        if self.strategy == ESTIMATE and not self.filtered:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None:
+                self.count_is_exact = False
+                return estimate
+        if self.strategy in (ESTIMATE, CACHED):
+            return cached_count(self.object_list, self.cache_timeout)
+        return super().count
+
+    def validate_number(self, number):
+        self.count  # decides whether the count is exact
+        if self.count_is_exact:
+            return super().validate_number(number)
+        # an estimate may be too low, only reject pages below 1
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+
+class HasMorePage(Page):
+    """
+    Page of the `has_more` strategy: `limit + 1` rows were fetched and
+    there is no total count.
+    """
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+    def has_previous(self):
+        return self.number > 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
@@ -0,0 +1,69 @@
+from django.core.exceptions import FieldDoesNotExist
+from djangorestframework_camel_case.settings import api_settings
+from djangorestframework_camel_case.util import camel_to_underscore
+
+
+def parse_field_names(value) -> tuple:
+    """
+    `?fields=id,statusCode,url` as `("id", "status_code", "url")`, in the
+    given order without duplicates. Names are accepted in camelCase, as
+    rendered, or snake_case.
+    """
+    names = []
+    for name in (value or "").split(","):
+        name = camel_to_underscore(name.strip(), **api_settings.JSON_UNDERSCOREIZE)
+        if name and name not in names:
+            names.append(name)
+    return tuple(names)
+
+
+def field_columns(model, field):
+    """
+    Names of the `model` fields whose columns the serializer `field` reads,
+    None when that cannot be told (`source="*"`, method fields, properties).
+    """
+    if field.source == "*":
+        return None
+    name = field.source_attrs[0]
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete or model_field.many_to_many:
+        # reverse relations and m2m are read through the primary key
+        return set()
+    return {model_field.name}
+
+
+def restrict_queryset(queryset, selected, omitted, only=True, keep=()):
+    """
+    Loads only the columns the `selected` serializer fields read: with
+    `only()` when `only` (explicit `?fields=`), otherwise by deferring the
+    columns of the `omitted` fields. Left as is when a selected field reads
+    something that cannot be traced to a column, a deferred column would
+    then be fetched once per row. The model fields named in `keep` are
+    always loaded.
+    """
+    select_related = queryset.query.select_related
+    if select_related is True:
+        return queryset
+
+    model = queryset.model
+    needed = set(select_related or ())
+    needed |= {
+        field.name for field in model._meta.concrete_fields if field.name in keep
+    }
+    for field in selected.values():
+        columns = field_columns(model, field)
+        if columns is None:
+            return queryset
+        needed |= columns
+
+    if only:
+        return queryset.only(*needed) if needed else queryset
+
+    deferred = set()
+    for field in omitted.values():
+        deferred |= field_columns(model, field) or set()
+    deferred -= needed | {model._meta.pk.name}
+    return queryset.defer(*deferred) if deferred else queryset
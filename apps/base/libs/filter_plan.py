@@ -0,0 +1,138 @@
+import warnings
+from datetime import date
+from functools import partial
+
+from rest_framework.filters import OrderingFilter
+
+
+def parse_date(value):
+    # `YYYY-MM-DD` only, as `strptime(value, "%Y-%m-%d")` accepted
+    if len(value) != 10:
+        raise ValueError(value)
+    return date.fromisoformat(value)
+
+
+def parse_boolean(value):
+    return value.lower() in ("true", "1")
+
+
+# filter type: (lookup template, parser raising ValueError on bad input);
+# the lookup may also be a callable `(field, value) -> filter kwargs`
+FILTER_TYPES = {
+    "date": ("{field}__date", parse_date),
+    "boolean": ("{field}", parse_boolean),
+    "text": ("{field}", str),
+    "id": ("{field}", int),
+}
+
+# values the removed `filter_logic` callables received: parsed dates and
+# ids, the raw string otherwise
+LEGACY_PARSERS = {"date": parse_date, "id": int}
+
+
+def legacy_filter_types(filter_logic, filter_types):
+    """
+    `filter_types` with the `filter_logic` callables of a view written
+    before `FilterPlan`.
+    """
+    filter_types = dict(filter_types)
+    for field_type, logic in filter_logic.items():
+        filter_types[field_type] = (logic, LEGACY_PARSERS.get(field_type, str))
+    return filter_types
+
+
+class FilterError(ValueError):
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+
+
+class FilterPlan:
+    """
+    The filter declaration of a view resolved once per class: each query
+    parameter with its lookup and parser, the ordering whitelist and the
+    filter backends to run. `apply()` then costs one dict lookup per
+    parameter present in the request, whatever the number declared.
+    """
+
+    def __init__(
+        self, filter_fields, filter_types, ordering_fields, ordering, backends
+    ):
+        self.filters = {}
+        for field, field_type in filter_fields:
+            if field_type not in filter_types:
+                raise ValueError(f"Unknown filter type {field_type!r} of {field!r}.")
+            lookup, parser = filter_types[field_type]
+            if callable(lookup):
+                lookup = partial(lookup, field)
+            else:
+                lookup = lookup.format(field=field)
+            self.filters[field] = (lookup, parser, field_type)
+        self.ordering_fields = frozenset(ordering_fields)
+        if isinstance(ordering, str):
+            ordering = ordering.split(",")
+        self.default_ordering = tuple(ordering or ())
+        # the plan does the ordering, the ordering backends are not run
+        self.backends = tuple(
+            backend for backend in backends if not issubclass(backend, OrderingFilter)
+        )
+
+    @classmethod
+    def for_view(cls, view_class):
+        plan = view_class.__dict__.get("_filter_plan")
+        if plan is None:
+            filter_types = view_class.filter_types
+            filter_logic = getattr(view_class, "filter_logic", None)
+            if filter_logic:
+                warnings.warn(
+                    f"{view_class.__name__}.filter_logic is deprecated, "
+                    "declare the field types in filter_types instead.",
+                    DeprecationWarning,
+                    stacklevel=3,
+                )
+                filter_types = legacy_filter_types(filter_logic, filter_types)
+            plan = cls(
+                filter_fields=getattr(view_class, "filter_fields", ()),
+                filter_types=filter_types,
+                ordering_fields=view_class.ordering_fields,
+                ordering=view_class.ordering,
+                backends=view_class.filter_backends,
+            )
+            view_class._filter_plan = plan
+        return plan
+
+    def get_filter_kwargs(self, params):
+        filter_kwargs = {}
+        for param in params.keys() & self.filters.keys():
+            lookup, parser, field_type = self.filters[param]
+            value = params.get(param)
+            try:
+                if callable(lookup):
+                    filter_kwargs.update(lookup(parser(value)))
+                else:
+                    filter_kwargs[lookup] = parser(value)
+            except ValueError:
+                if field_type == "id":
+                    raise FilterError(param, f"Invalid ID format for field: {param}")
+                raise FilterError(param, f"Invalid format for field: {param}")
+        return filter_kwargs
+
+    def get_ordering(self, params):
+        ordering = params.get("ordering")
+        if ordering:
+            terms = tuple(term.strip() for term in ordering.split(","))
+            if all(term in self.ordering_fields for term in terms):
+                return terms
+        return self.default_ordering
+
+    def apply(self, queryset, request, view):
+        filter_kwargs = self.get_filter_kwargs(request.query_params)
+        if filter_kwargs:
+            queryset = queryset.filter(**filter_kwargs)
+        for backend in self.backends:
+            queryset = backend().filter_queryset(request, queryset, view)
+        ordering = self.get_ordering(request.query_params)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+# response headers stored with the body (set by the view / finalize_response)
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Vary", "Allow")
+
+
+_warned_aliases = set()
+
+
+def get_response_cache_settings():
+    """
+    `(enabled, cache, timeout)`. A local memory cache is per process: the
+    invalidations of one worker would never reach the entries of another,
+    so it is refused unless `ALLOW_LOCAL_MEMORY` says there is only one.
+    """
+    conf = getattr(settings, "RESPONSE_CACHE", {})
+    alias = conf.get("ALIAS", "default")
+    cache = caches[alias]
+    enabled = conf.get("ENABLED", True)
+    if (
+        enabled
+        and isinstance(cache, LocMemCache)
+        and not conf.get("ALLOW_LOCAL_MEMORY", False)
+    ):
+        if alias not in _warned_aliases:
+            _warned_aliases.add(alias)
+            logger.warning(
+                "The response cache is disabled: the %r cache is a per "
+                "process LocMemCache. Use a shared cache, or set "
+                "RESPONSE_CACHE['ALLOW_LOCAL_MEMORY'] for a single process.",
+                alias,
+            )
+        enabled = False
+    return enabled, cache, conf.get("TIMEOUT", 60)
+
+
+def tag_of(model) -> str:
+    return model._meta.label_lower
+
+
+def _version_key(tag):
+    return f"response-cache:tag:{tag}"
+
+
+def get_versions(cache, tags):
+    """
+    Current version of each tag. A missing version (never set, or evicted
+    from a local memory cache) starts at the current time in ns, above
+    any version it may have had, so old entries never become reachable
+    again.
+    """
+    keys = {tag: _version_key(tag) for tag in tags}
+    found = cache.get_many(keys.values())
+    versions = []
+    for tag, key in sorted(keys.items()):
+        version = found.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        versions.append(f"{tag}:{version}")
+    return versions
+
+
+def bump(*tags):
+    enabled, cache, _ = get_response_cache_settings()
+    if not enabled:
+        return
+    for tag in set(tags):
+        key = _version_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # not set yet, the next read starts a new version
+            pass
+
+
+def invalidate(*models):
+    """
+    Makes the cached responses tagged with `models` unreachable once the
+    current transaction commits (right away outside a transaction).
+    """
+    tags = [tag_of(model) for model in models]
+    transaction.on_commit(lambda: bump(*tags))
+
+
+def response_cache_key(request, tags, scope, cache):
+    """
+    Key of the cached response: normalized path and query parameters, the
+    negotiated media type, the user scope and the versions of `tags`.
+    """
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    user = getattr(request, "user", None)
+    if scope == "public":
+        user_scope = "public"
+    elif user is not None and user.is_authenticated:
+        user_scope = f"user:{user.pk}"
+    else:
+        user_scope = "anonymous"
+    key = "|".join(
+        [
+            request.path.rstrip("/"),
+            repr(params),
+            getattr(request, "accepted_media_type", ""),
+            user_scope,
+            *get_versions(cache, tags),
+        ]
+    )
+    return f"response-cache:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+
+def store_response(cache, key, timeout, response):
+    headers = {
+        header: response[header] for header in STORED_HEADERS if header in response
+    }
+    try:
+        cache.set(key, (response.status_code, headers, response.content), timeout)
+    except Exception:
+        logger.exception("Failed to store the response of %s.", key)
+
+
+def cached_response(request, entry):
+    """
+    The stored response, or a 304 when it satisfies the request's
+    `If-None-Match` / `If-Modified-Since`.
+    """
+    status_code, headers, content = entry
+    not_modified = get_conditional_response(
+        getattr(request, "_request", request),
+        etag=headers.get("ETag"),
+        last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+    )
+    if not_modified is not None:
+        for header in ("ETag", "Last-Modified"):
+            if header in headers:
+                not_modified[header] = headers[header]
+        return not_modified
+    response = HttpResponse(content, status=status_code)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _on_change(sender, **kwargs):
+    invalidate(sender)
+
+
+def _on_m2m_change(sender, instance, model, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate(type(instance), model)
+
+
+def connect_signals():
+    """
+    Saves and deletes of any model invalidate its tag. Bulk updates do not
+    send signals, `SoftDeleteQuerySet.delete/restore` invalidate
+    themselves.
+    """
+    post_save.connect(_on_change, dispatch_uid="response-cache-save")
+    post_delete.connect(_on_change, dispatch_uid="response-cache-delete")
+    m2m_changed.connect(_on_m2m_change, dispatch_uid="response-cache-m2m")
@@ -0,0 +1,155 @@
+from django.contrib.postgres.search import SearchVector
+from django.db import connections, models
+from django.db.backends.utils import truncate_name
+from rest_framework import filters
+
+# alias of the tsvector of a `@field` search field
+TOKEN_ALIAS_PREFIX = "_search_vector_"
+
+TRIGRAM = "trgm"
+TRIGRAM_REGEX = "trgm_re"
+TSVECTOR = "tsv"
+
+
+class PostgresSearchFilter(filters.SearchFilter):
+    """
+    Drop-in `SearchFilter` whose lookups can be served by indexes on
+    PostgreSQL. The `search_fields` prefixes keep their DRF meaning:
+
+    - `field`, `^field`, `=field`: `UPPER(field) LIKE ...`, served by a
+      `pg_trgm` GIN index on `UPPER(field)`
+    - `$field`: regex, served by a `pg_trgm` GIN index on `field`
+    - `@field`: token search, `to_tsvector(config, field) @@
+      plainto_tsquery(config, term)`, served by a GIN index on the vector
+
+    The indexes are generated from the view with
+    `manage.py make_search_migration <dotted.path.to.View>`.
+    On other databases `@field` falls back to a substring search.
+    """
+
+    # text search configuration, "simple" does no stemming (urls, codes)
+    search_config = "simple"
+
+    def get_search_fields(self, view, request):
+        # as resolved by `filter_queryset`, `@field` replaced by its alias
+        if hasattr(self, "_search_fields"):
+            return self._search_fields
+        return super().get_search_fields(view, request)
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = super().get_search_fields(view, request)
+        if not search_fields:
+            return queryset
+
+        postgres = connections[queryset.db].vendor == "postgresql"
+        resolved, vectors = [], {}
+        for search_field in search_fields:
+            if not search_field.startswith("@"):
+                resolved.append(search_field)
+            elif postgres:
+                alias = TOKEN_ALIAS_PREFIX + search_field[1:]
+                vectors[alias] = SearchVector(
+                    search_field[1:], config=self.search_config
+                )
+                resolved.append(alias)
+            else:
+                resolved.append(search_field[1:])
+
+        if vectors:
+            queryset = queryset.alias(**vectors)
+        self._search_fields = resolved
+        return super().filter_queryset(request, queryset, view)
+
+    def construct_search(self, field_name, queryset):
+        if field_name.startswith(TOKEN_ALIAS_PREFIX):
+            # the string term becomes a plainto_tsquery with the vector config
+            return field_name
+        return super().construct_search(field_name, queryset)
+
+
+def search_index_definitions(model, search_fields, config="simple"):
+    """
+    `(index name, kind, CREATE INDEX tail)` for each plain field of
+    `search_fields`. Related fields (`a__b`) are skipped, the index would
+    belong to another table.
+
+    The expressions match the SQL of the lookups above, e.g. icontains on
+    a varchar column compiles to `UPPER(col::text) LIKE UPPER(%s)` and
+    `UPPER(col)` is stored by Postgres as `upper((col)::text)`.
+    """
+    connection = connections["default"]
+    quote = connection.ops.quote_name
+    definitions = []
+    for search_field in search_fields:
+        prefix = search_field[0] if search_field[0] in "^=$@" else ""
+        name = search_field[len(prefix) :]
+        if "__" in name:
+            continue
+        field = model._meta.get_field(name)
+        column = quote(field.column)
+
+        if prefix == "@":
+            if not isinstance(field, (models.CharField, models.TextField)):
+                continue
+            kind = TSVECTOR
+            tail = (
+                f"USING gin (to_tsvector('{config}'::regconfig, "
+                f"COALESCE({column}, '')))"
+            )
+        elif prefix == "$":
+            kind = TRIGRAM_REGEX
+            tail = f"USING gin (({column}::text) gin_trgm_ops)"
+        else:
+            kind = TRIGRAM
+            tail = f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+
+        index_name = truncate_name(f"{model._meta.db_table}_{name}_{kind}", 63)
+        definitions.append((index_name, kind, tail))
+    return definitions
+
+
+def _index_attached(cursor, name):
+    cursor.execute("SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s)", [name])
+    return cursor.fetchone() is not None
+
+
+def create_search_index(schema_editor, table, name, tail):
+    """
+    Builds the index without blocking writes. A partitioned table cannot be
+    indexed CONCURRENTLY: the parent index is created `ON ONLY` (invalid),
+    each partition is indexed concurrently and attached, which validates
+    the parent. Partitions created later inherit the index.
+    Run from a non-atomic migration.
+    """
+    from apps.api_logs.partitions import is_partitioned, list_partitions
+
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        if not is_partitioned(table):
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} "
+                f"ON {quote(table)} {tail}"
+            )
+            return
+
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(name)} ON ONLY {quote(table)} {tail}"
+        )
+        for partition in list_partitions(table):
+            child = truncate_name(f"{partition}_{name[len(table) + 1 :]}", 63)
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(child)} "
+                f"ON {quote(partition)} {tail}"
+            )
+            if not _index_attached(cursor, child):
+                cursor.execute(
+                    f"ALTER INDEX {quote(name)} ATTACH PARTITION {quote(child)}"
+                )
+
+
+def drop_search_index(schema_editor, table, name):
+    from apps.api_logs.partitions import is_partitioned
+
+    quote = schema_editor.quote_name
+    concurrently = "" if is_partitioned(table) else "CONCURRENTLY "
+    schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {quote(name)}")
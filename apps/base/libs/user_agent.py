@@ -0,0 +1,52 @@
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.conf import settings
+from user_agents import parse
+
+# distinct raw UA strings kept, a handful of clients send most requests
+CACHE_SIZE = getattr(settings, "USER_AGENT_CACHE_SIZE", 4096)
+
+OS_TYPES = ("windows", "ios", "android", "mac", "linux")
+
+
+class ClientInfo(NamedTuple):
+    device_type: str  # mobile, pc, tablet or other
+    os_type: str  # one of OS_TYPES or other
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def classify_user_agent(user_agent: str) -> ClientInfo:
+    agent = parse(user_agent)
+    if agent.is_mobile:
+        device_type = "mobile"
+    elif agent.is_pc:
+        device_type = "pc"
+    elif agent.is_tablet:
+        device_type = "tablet"
+    else:
+        device_type = "other"
+
+    os_family = agent.os.family.lower().split()
+    os_type = os_family[0] if os_family and os_family[0] in OS_TYPES else "other"
+    return ClientInfo(device_type, os_type)
+
+
+def get_client_info(request) -> ClientInfo:
+    """
+    Device and OS type of the request, classified once per request and
+    kept on the Django request (shared by DRF, serializers and logging).
+    """
+    request = getattr(request, "_request", request)
+    client_info = getattr(request, "client_info", None)
+    if client_info is None:
+        client_info = classify_user_agent(request.headers.get("user-agent", ""))
+        request.client_info = client_info
+    return client_info
+
+
+def user_agent_cache_stats() -> dict:
+    """
+    Hits, misses and size of the classification cache of this process.
+    """
+    return classify_user_agent.cache_info()._asdict()
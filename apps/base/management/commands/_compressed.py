@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import CommandError
+
+from apps.base.fields import CompressedJSONField
+
+
+def compressed_fields(label):
+    """
+    The model of `app_label.Model` and its `CompressedJSONField`s.
+    """
+    try:
+        model = apps.get_model(label)
+    except (LookupError, ValueError):
+        raise CommandError(f"Unknown model: {label}")
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if isinstance(field, CompressedJSONField)
+    ]
+    if not fields:
+        raise CommandError(f"{label} has no CompressedJSONField.")
+    return model, fields
@@ -0,0 +1,95 @@
+import json
+import timeit
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+
+from apps.api_logs.models import APILog
+from apps.api_logs.serializers import ApiLogsListSerializer
+from apps.base.libs.camel_case import key_cache_stats
+from apps.base.renderer import renderer
+
+
+def build_payload(size):
+    """
+    A paginated `APILog` list response of `size` unsaved rows, as
+    `CustomPagination.get_paginated_response` shapes it.
+    """
+    now = timezone.now()
+    logs = [
+        APILog(
+            id=index,
+            url=f"/api/v1/auctions/{index}/bids/",
+            method="GET",
+            os_type="Linux",
+            device_type="desktop",
+            ip="10.0.0.1",
+            user_agent="Mozilla/5.0 (X11; Linux x86_64) Firefox/128.0",
+            system_details={"browser_family": "Firefox", "is_mobile": False},
+            user_id=index % 50,
+            extra_field={"request_id": f"req_{index}", "trace_ids": [1, 2, 3]},
+            status_code="200",
+            created_at=now - timedelta(seconds=index),
+        )
+        for index in range(size)
+    ]
+    data = ApiLogsListSerializer(logs, many=True).data
+    return {
+        "success": True,
+        "message": "Data retrieved successfully.",
+        "total_count": size,
+        "count_is_exact": True,
+        "current_count": size,
+        "total_pages": 1,
+        "current_page": 1,
+        "has_more": False,
+        "next": None,
+        "previous": None,
+        "data": data,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering `APILog` list payloads with the camelCase JSON "
+        "renderer of djangorestframework_camel_case and with "
+        "FastCamelCaseJSONRenderer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+        parser.add_argument("--number", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        encoder = "orjson" if renderer.orjson else "json"
+        self.stdout.write(f"FastCamelCaseJSONRenderer encoder: {encoder}")
+        current, fast = CamelCaseJSONRenderer(), renderer.FastCamelCaseJSONRenderer()
+        for size in options["sizes"]:
+            payload = build_payload(size)
+            # equivalent JSON, floats may be written differently
+            if json.loads(current.render(payload)) != json.loads(fast.render(payload)):
+                self.stderr.write(f"{size:>6} rows: the outputs differ")
+
+            timings = {}
+            for name, instance in (("current", current), ("fast", fast)):
+                best = min(
+                    timeit.repeat(
+                        lambda: instance.render(payload),
+                        number=options["number"],
+                        repeat=options["repeat"],
+                    )
+                )
+                timings[name] = best / options["number"] * 1e3
+            self.stdout.write(
+                f"{size:>6} rows  current {timings['current']:8.2f} ms  "
+                f"fast {timings['fast']:8.2f} ms  "
+                f"x{timings['current'] / timings['fast']:.1f}"
+            )
+
+        stats = key_cache_stats()["camelize"]
+        self.stdout.write(
+            f"key cache: {stats['size']} keys, hit rate {stats['hit_rate']:.4f}"
+        )
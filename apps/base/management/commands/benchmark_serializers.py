@@ -0,0 +1,60 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from apps.api_logs.serializers import ApiLogsListSerializer, ApiLogsRetrieveSerializer
+from apps.base.serializers import BaseModelSerializer
+
+
+class NestedApiLogSerializer(ApiLogsRetrieveSerializer):
+    summary = ApiLogsListSerializer(
+        source="*", read_only=True, exclude_fields=["system_details", "extra_field"]
+    )
+
+    class Meta(ApiLogsRetrieveSerializer.Meta):
+        pass
+
+
+def instantiate_list():
+    serializer = ApiLogsListSerializer([], many=True, exclude_fields=["extra_field"])
+    return serializer.child.fields
+
+
+def instantiate_nested():
+    serializer = NestedApiLogSerializer([], many=True)
+    return serializer.child.fields["summary"].fields
+
+
+CASES = {"list": instantiate_list, "nested": instantiate_nested}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time serializer instantiation (building `fields`) for a list and a "
+        "nested endpoint with and without the class-level field cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for name, case in CASES.items():
+            timings = {}
+            for cached in (False, True):
+                BaseModelSerializer.cache_fields = cached
+                BaseModelSerializer._field_prototypes.clear()
+                case()  # warm up (and fill the cache)
+                best = min(
+                    timeit.repeat(
+                        case, number=options["number"], repeat=options["repeat"]
+                    )
+                )
+                timings[cached] = best / options["number"] * 1e6
+            BaseModelSerializer.cache_fields = True
+
+            self.stdout.write(
+                f"{name:<8} uncached {timings[False]:8.1f} us  "
+                f"cached {timings[True]:8.1f} us  "
+                f"x{timings[False] / timings[True]:.1f}"
+            )
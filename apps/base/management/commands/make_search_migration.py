@@ -0,0 +1,120 @@
+import os
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.migrations.loader import MigrationLoader
+from django.utils.module_loading import import_string
+
+from apps.base.libs.search import PostgresSearchFilter, search_index_definitions
+
+TEMPLATE = '''from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from apps.base.libs.search import create_search_index, drop_search_index
+
+# generated by `manage.py make_search_migration {view}`
+TABLE = "{table}"
+INDEXES = [
+{indexes}]
+
+
+def create_indexes(apps, schema_editor):
+    for name, tail in INDEXES:
+        create_search_index(schema_editor, TABLE, name, tail)
+
+
+def drop_indexes(apps, schema_editor):
+    for name, _ in INDEXES:
+        drop_search_index(schema_editor, TABLE, name)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ("{app_label}", "{dependency}"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a migration creating the pg_trgm / tsvector GIN indexes that "
+        "serve the search_fields of a view using PostgresSearchFilter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "view", help="Dotted path, e.g. apps.api_logs.views.APILogsListView"
+        )
+        parser.add_argument("--name", default=None, help="Migration name.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the migration instead of writing it.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            view = import_string(options["view"])
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        search_fields = getattr(view, "search_fields", None)
+        if not search_fields:
+            raise CommandError(f"{options['view']} has no search_fields.")
+        backends = [
+            backend
+            for backend in getattr(view, "filter_backends", [])
+            if issubclass(backend, PostgresSearchFilter)
+        ]
+        if not backends:
+            raise CommandError(
+                f"{options['view']} does not use PostgresSearchFilter, "
+                "the indexes would not match its lookups."
+            )
+
+        model = view.queryset.model
+        definitions = search_index_definitions(
+            model, search_fields, config=backends[0].search_config
+        )
+        if not definitions:
+            raise CommandError("No indexable search field.")
+
+        app_label = model._meta.app_label
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        leaves = loader.graph.leaf_nodes(app_label)
+        if not leaves:
+            raise CommandError(
+                f"{app_label} has no migrations yet, run makemigrations first."
+            )
+        dependency = leaves[-1][1]
+        number = int(dependency.split("_")[0]) + 1
+        name = options["name"] or f"search_indexes_{model._meta.model_name}"
+
+        content = TEMPLATE.format(
+            view=options["view"],
+            table=model._meta.db_table,
+            indexes="".join(
+                f"    ({index_name!r}, {tail!r}),\n"
+                for index_name, _, tail in definitions
+            ),
+            app_label=app_label,
+            dependency=dependency,
+        )
+        if options["dry_run"]:
+            self.stdout.write(content)
+            return
+
+        module, _ = loader.migrations_module(app_label)
+        directory = os.path.dirname(import_module(module).__file__)
+        path = os.path.join(directory, f"{number:04d}_{name}.py")
+        with open(path, "w") as fh:
+            fh.write(content)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
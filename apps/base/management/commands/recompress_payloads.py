@@ -0,0 +1,109 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.base.fields import (
+    CODECS,
+    get_active_dictionary,
+    get_compression_settings,
+    header_of,
+)
+
+from ._compressed import compressed_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompress the CompressedJSONFields of a model in primary key "
+        "batches with the current codec and active dictionary. With "
+        "--convert, json/jsonb columns are first turned into bytea holding "
+        "the plain JSON text, which the field reads as is."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="app_label.Model, e.g. api_logs.APILog")
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="ALTER json/jsonb columns to bytea first (rewrites the table).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to pause between batches.",
+        )
+
+    def handle(self, *args, **options):
+        model, fields = compressed_fields(options["model"])
+        if options["convert"]:
+            self.convert(model, fields)
+
+        codec, _, use_dictionary = get_compression_settings()
+        targets = {}
+        for field in fields:
+            dictionary_id = 0
+            if use_dictionary and field.dictionary_label:
+                dictionary_id, _ = get_active_dictionary(field.dictionary_label, codec)
+            targets[field.attname] = (CODECS[codec], dictionary_id)
+
+        attnames = list(targets)
+        queryset = model._default_manager.order_by("pk").only("pk", *attnames)
+        last_pk = None
+        scanned = updated = 0
+        while True:
+            batch = queryset
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            batch = list(batch[: options["batch_size"]])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            stale = [obj for obj in batch if self.is_stale(obj, targets)]
+            if stale:
+                with transaction.atomic():
+                    model._default_manager.bulk_update(stale, attnames)
+                updated += len(stale)
+
+            self.stdout.write(f"{scanned} rows scanned, {updated} recompressed")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Recompressed {updated} of {scanned} rows.")
+        )
+
+    def is_stale(self, obj, targets):
+        for attname, target in targets.items():
+            value = getattr(obj, attname)
+            if value is not None and header_of(value.raw) != target:
+                return True
+        return False
+
+    def convert(self, model, fields):
+        if connection.vendor != "postgresql":
+            raise CommandError("--convert requires PostgreSQL.")
+
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            for field in fields:
+                cursor.execute(
+                    "SELECT data_type FROM information_schema.columns "
+                    "WHERE table_name = %s AND column_name = %s",
+                    [table, field.column],
+                )
+                row = cursor.fetchone()
+                if not row or row[0] not in ("json", "jsonb"):
+                    continue
+                column = connection.ops.quote_name(field.column)
+                self.stdout.write(f"Converting {table}.{field.column} to bytea")
+                cursor.execute(
+                    f"ALTER TABLE {connection.ops.quote_name(table)} "
+                    f"ALTER COLUMN {column} DROP DEFAULT, "
+                    f"ALTER COLUMN {column} TYPE bytea "
+                    f"USING convert_to({column}::text, 'UTF8')"
+                )
@@ -0,0 +1,106 @@
+import re
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.base.fields import (
+    LazyJSON,
+    get_compression_settings,
+    reset_dictionary_cache,
+    zstandard,
+)
+from apps.base.models import CompressionDictionary
+
+from ._compressed import compressed_fields
+
+# zlib only looks at the last 32 KB of a preset dictionary
+ZLIB_MAX_DICTIONARY = 32 * 1024
+
+# JSON keys and short string values, the repeated parts of log payloads
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.){1,64}"[:,]?')
+
+
+def build_zlib_dictionary(samples, size):
+    """
+    zlib has no trainer: the dictionary is the most frequent tokens of the
+    samples, the most frequent last (closest to the data, cheapest to
+    reference).
+    """
+    counts = Counter()
+    for sample in samples:
+        counts.update(_TOKEN.findall(sample))
+    tokens = []
+    total = 0
+    for token, count in counts.most_common():
+        if count < 2 or total + len(token) > size:
+            continue
+        tokens.append(token)
+        total += len(token)
+    return b"".join(reversed(tokens))
+
+
+class Command(BaseCommand):
+    help = (
+        "Train a shared compression dictionary for the CompressedJSONFields "
+        "of a model from its most recent rows and make it the active one. "
+        "Rows written before keep their own dictionary until recompressed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="app_label.Model, e.g. api_logs.APILog")
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=5000,
+            help="Number of recent rows to sample.",
+        )
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=64 * 1024,
+            help="Dictionary size in bytes (capped at 32 KB for zlib).",
+        )
+
+    def handle(self, *args, **options):
+        model, fields = compressed_fields(options["model"])
+        labels = {field.dictionary_label for field in fields} - {None}
+        if len(labels) != 1:
+            raise CommandError(
+                "The compressed fields must share a single dictionary_label."
+            )
+        label = labels.pop()
+        codec, _, _ = get_compression_settings()
+
+        samples = []
+        attnames = [field.attname for field in fields]
+        rows = model._default_manager.order_by("-pk").values_list(*attnames)
+        for row in rows[: options["samples"]]:
+            for field, value in zip(fields, row):
+                if isinstance(value, LazyJSON):
+                    samples.append(field.canonical_json(value.value))
+        if len(samples) < 10:
+            raise CommandError("Not enough rows to train a dictionary.")
+
+        if codec == "zstd":
+            data = zstandard.train_dictionary(options["size"], samples).as_bytes()
+        else:
+            data = build_zlib_dictionary(
+                samples, min(options["size"], ZLIB_MAX_DICTIONARY)
+            )
+
+        with transaction.atomic():
+            CompressionDictionary.objects.filter(label=label, codec=codec).update(
+                active=False
+            )
+            dictionary = CompressionDictionary.objects.create(
+                label=label, codec=codec, data=data, samples=len(samples)
+            )
+        reset_dictionary_cache()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Trained {codec} dictionary {dictionary.pk} for {label}: "
+                f"{len(data)} bytes from {len(samples)} samples."
+            )
+        )
@@ -2,16 +2,22 @@ from django.db import models
 from django.db import transaction
 from django.utils import timezone
 from .exceptions import ModelValidationError
+from .libs import response_cache
 
 
 class SoftDeleteQuerySet(models.QuerySet):
     def delete(self, hard=False):
         if hard:
             return super().delete()
-        return self.update(deleted_at=timezone.now())
+        updated = self.update(deleted_at=timezone.now())
+        # a bulk update sends no signal, invalidate the cached responses here
+        response_cache.invalidate(self.model)
+        return updated
 
     def restore(self):
-        return self.update(deleted_at=None)
+        updated = self.update(deleted_at=None)
+        response_cache.invalidate(self.model)
+        return updated
     
 class SoftDeleteManager(models.Manager):
     def get_queryset(self):
@@ -149,4 +155,18 @@ class AbstractBaseModel(
     def save(self, *args, **kwargs):
         return super().save(*args, **kwargs)
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+class CompressionDictionary(models.Model):
+    """
+    Shared dictionary of a `CompressedJSONField`, trained from sample rows
+    by `manage.py train_compression_dictionary`. Never edited once stored:
+    compressed values reference their dictionary by id.
+    """
+
+    label = models.CharField(max_length=100)
+    codec = models.CharField(max_length=10)
+    data = models.BinaryField()
+    samples = models.PositiveIntegerField(default=0)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -1,7 +1,21 @@
+from djangorestframework_camel_case.parser import CamelCaseFormParser, CamelCaseJSONParser
 from djangorestframework_camel_case.settings import api_settings
-from djangorestframework_camel_case.util import underscoreize
 from drf_nested_forms import NestedMultiPartParser
-from rest_framework.parsers import DataAndFiles
+from rest_framework.parsers import DataAndFiles, FormParser
+
+from apps.base.libs.camel_case import underscoreize
+
+
+def remember_payload(parser_context, data):
+    """
+    Keeps the parsed (underscoreized) payload on the Django request as
+    `request.parsed_payload`, so the api log middleware reads it after the
+    view instead of decoding and parsing the body again.
+    """
+    request = (parser_context or {}).get("request")
+    if request is not None:
+        getattr(request, "_request", request).parsed_payload = data
+    return data
 
 
 class CustomNestedParser(NestedMultiPartParser):
@@ -12,9 +26,36 @@ class CustomNestedParser(NestedMultiPartParser):
             stream=stream, media_type=media_type, parser_context=parser_context
         )
         if isinstance(data, DataAndFiles):
-            return DataAndFiles(
-                underscoreize(data.data, **api_settings.JSON_UNDERSCOREIZE),
-                underscoreize(data.files, **api_settings.JSON_UNDERSCOREIZE),
+            return remember_payload(
+                parser_context,
+                DataAndFiles(
+                    underscoreize(data.data, **api_settings.JSON_UNDERSCOREIZE),
+                    underscoreize(data.files, **api_settings.JSON_UNDERSCOREIZE),
+                ),
             )
 
-        return underscoreize(data, **self.json_underscoreize)
+        return remember_payload(
+            parser_context, underscoreize(data, **self.json_underscoreize)
+        )
+
+
+class CustomCamelCaseJSONParser(CamelCaseJSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        # `api_settings.PARSER_CLASS` decodes, underscoreize runs here with
+        # the shared key cache
+        data = super(CamelCaseJSONParser, self).parse(
+            stream, media_type=media_type, parser_context=parser_context
+        )
+        return remember_payload(
+            parser_context, underscoreize(data, **self.json_underscoreize)
+        )
+
+
+class CustomCamelCaseFormParser(CamelCaseFormParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        data = FormParser.parse(
+            self, stream, media_type=media_type, parser_context=parser_context
+        )
+        return remember_payload(
+            parser_context, underscoreize(data, **api_settings.JSON_UNDERSCOREIZE)
+        )
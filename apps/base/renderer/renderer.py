@@ -0,0 +1,123 @@
+import json
+
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from rest_framework.renderers import JSONRenderer
+
+from apps.base.libs.camel_case import camelize
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used without it
+    orjson = None
+
+ORJSON_OPTIONS = (
+    (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+)
+
+
+def escape_line_separators(content: bytes) -> bytes:
+    # same escaping as `JSONRenderer.render` (without `ensure_ascii`), for
+    # JSON embedded in scripts
+    if b"\xe2\x80" not in content:
+        return content
+    return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+        b"\xe2\x80\xa9", b"\\u2029"
+    )
+
+
+class FastCamelCaseJSONRenderer(CamelCaseJSONRenderer):
+    """
+    Drop-in `CamelCaseJSONRenderer`: one walk of the data camelizes the
+    keys (memoized, see `apps.base.libs.camel_case`) into plain dicts, and
+    orjson encodes the result when installed. Values orjson does not know
+    (lazy strings, `Decimal`, datetimes, ...) go through DRF's encoder, and
+    what orjson rejects (ints beyond 64 bits) through the stdlib encoder.
+
+    The JSON is equivalent to the parent's but not always byte-identical:
+    orjson writes some floats differently (`1e16` for `1e+16`). Indented
+    output is rendered by the parent's encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        data = camelize(data, allow_nan=not self.strict, **self.json_underscoreize)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            # skips the parent's camelize, done above
+            return JSONRenderer.render(
+                self, data, accepted_media_type, renderer_context
+            )
+        return self.encode(data)
+
+    def encode(self, data) -> bytes:
+        """
+        Unindented JSON of `data`, already camelized.
+        """
+        if orjson is not None and not self.ensure_ascii and self.compact:
+            try:
+                content = orjson.dumps(
+                    data, default=self.encoder_class().default, option=ORJSON_OPTIONS
+                )
+            except orjson.JSONEncodeError:
+                pass
+            else:
+                return escape_line_separators(content)
+
+        content = json.dumps(
+            data,
+            cls=self.encoder_class,
+            ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict,
+            separators=(",", ":") if self.compact else (", ", ": "),
+        )
+        return escape_line_separators(content.encode("utf-8"))
+
+
+class StreamingCamelCaseJSONRenderer(FastCamelCaseJSONRenderer):
+    """
+    `FastCamelCaseJSONRenderer` that renders a list response as it goes:
+    `render_stream()` writes the envelope, then camelizes and encodes the
+    items `chunk_size` at a time, so only one chunk of the page is held
+    as Python data and text at once. Each piece goes through `encode()`,
+    so the body matches what `render()` writes for the whole response.
+    """
+
+    def render_stream(self, envelope, items_key, items, chunk_size=100):
+        """
+        Yields the JSON of `envelope` as bytes, with the (lazy) iterable
+        `items` in place of `envelope[items_key]`.
+        """
+        item_separator = b"," if self.compact else b", "
+        key_separator = b":" if self.compact else b": "
+        options = dict(self.json_underscoreize, allow_nan=not self.strict)
+
+        # the envelope keys around the items go out with the first and
+        # last chunk
+        pending = [b"{"]
+        for position, (key, value) in enumerate(envelope.items()):
+            is_items = key == items_key
+            ((name, value),) = camelize(
+                {key: None if is_items else value}, **options
+            ).items()
+            if position:
+                pending.append(item_separator)
+            pending.append(self.encode(name) + key_separator)
+            if not is_items:
+                pending.append(self.encode(value))
+                continue
+
+            pending.append(b"[")
+            chunk = []
+            for item in items:
+                chunk.append(self.encode(camelize(item, **options)))
+                if len(chunk) == chunk_size:
+                    yield b"".join(pending) + item_separator.join(chunk)
+                    pending, chunk = [item_separator], []
+            if chunk:
+                pending.append(item_separator.join(chunk))
+            elif pending[0] == item_separator:
+                pending.pop(0)
+            pending.append(b"]")
+        pending.append(b"}")
+        yield b"".join(pending)
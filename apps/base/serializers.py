@@ -1,14 +1,27 @@
+import copy
+from collections import OrderedDict
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import models, transaction
+from django.utils.functional import cached_property
 from rest_framework import serializers
 
 User = get_user_model()
-from rest_framework.serializers import ListSerializer
+from rest_framework.serializers import (
+    LIST_SERIALIZER_KWARGS,
+    LIST_SERIALIZER_KWARGS_REMOVE,
+    ListSerializer,
+)
 from rest_framework.settings import api_settings
-from rest_framework.utils.serializer_helpers import ReturnDict
+from rest_framework.utils import model_meta
+from rest_framework.utils.serializer_helpers import BindingDict, ReturnDict
 
 from .exceptions import APIError
+from .fields import CompressedJSONField, LazyJSON
+from .libs import response_cache
+from .libs.user_agent import get_client_info
+from .models import AbstractBaseModel
 
 
 class ReadOnlyFields:
@@ -43,53 +56,330 @@ class ActionUserSerializer(serializers.ModelSerializer):
         fields = ["id", "username"]
 
 
-class BaseModelSerializer(serializers.ModelSerializer):
+ACTION_USER_FIELDS = ("created_by", "modified_by")
+
+
+def _action_user_map(context):
+    """
+    `{user id: ActionUserSerializer data or None}` shared by the serializers
+    of one request (kept on the Django request), or of one serializer tree
+    when there is no request.
+    """
+    request = context.get("request")
+    if request is None:
+        return context.setdefault("_action_users", {})
+    request = getattr(request, "_request", request)
+    if not hasattr(request, "action_users"):
+        request.action_users = {}
+    return request.action_users
+
+
+def resolve_action_users(context, user_ids):
+    """
+    Loads the users of `user_ids` missing from the map in one query.
+    """
+    users = _action_user_map(context)
+    missing = {
+        user_id
+        for user_id in user_ids
+        if user_id and user_id >= 1 and user_id not in users
+    }
+    if missing:
+        found = {
+            user.id: ActionUserSerializer(user).data
+            for user in User.objects.filter(id__in=missing)
+        }
+        for user_id in missing:
+            # None for deleted users, they are not looked up again
+            users[user_id] = found.get(user_id)
+    return users
+
+
+async def aresolve_action_users(context, user_ids):
+    """
+    `resolve_action_users` with the async ORM. Called by the async views
+    before serializing, the serializers then find every user in the map.
+    """
+    users = _action_user_map(context)
+    missing = {
+        user_id
+        for user_id in user_ids
+        if user_id and user_id >= 1 and user_id not in users
+    }
+    if missing:
+        found = {
+            user.id: ActionUserSerializer(user).data
+            async for user in User.objects.filter(id__in=missing)
+        }
+        for user_id in missing:
+            users[user_id] = found.get(user_id)
+    return users
+
+
+def format_errors(fields, all_errors):
+    """
+    Errors of a serializer with those of its nested list fields keyed by
+    item index (`{"items": {2: {"price": [...]}}}`), empty items left out.
+    """
+    formatted_errors = OrderedDict()
+    if not all_errors:
+        return formatted_errors
+
+    required_msg = "This field is required."
+
+    for field_name, field_errors in all_errors.items():
+        # Skip empty errors immediately
+        if not field_errors:
+            continue
+
+        # Handle non-list errors directly
+        if not isinstance(field_errors, list):
+            formatted_errors[field_name] = field_errors
+            continue
+
+        # Get field type once
+        field = fields.get(field_name)
+
+        # Handle non-ListSerializer fields directly
+        if not isinstance(field, ListSerializer):
+            formatted_errors[field_name] = field_errors
+            continue
+
+        # Handle required field error - most common case first
+        if len(field_errors) == 1 and field_errors[0] == required_msg:
+            formatted_errors[field_name] = field_errors
+            continue
+
+        indexed_errors = {
+            idx: (
+                error
+                if isinstance(error, dict)
+                else {"non_field_errors": [str(error).capitalize()]}
+            )
+            for idx, error in enumerate(field_errors)
+            if error
+        }
+
+        if indexed_errors:
+            formatted_errors[field_name] = indexed_errors
+
+    return formatted_errors
+
+
+class BaseModelListSerializer(ListSerializer):
+    """
+    Resolves `created_by`/`modified_by` of the whole list with one
+    `id__in` query before the child serializers run, and creates the
+    items of a list payload with `bulk_create`.
+    """
+
+    bulk_batch_size = 500
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        iterable = list(iterable)
+        self.prefetch_action_users(iterable)
+        return super().to_representation(iterable)
+
+    def prefetch_action_users(self, iterable):
+        fields = [name for name in ACTION_USER_FIELDS if name in self.child.fields]
+        if fields:
+            resolve_action_users(
+                self.context,
+                {getattr(item, name, None) for item in iterable for name in fields},
+            )
+
+    def create(self, validated_data):
+        """
+        Inserts all items with chunked `bulk_create`: no per-row `save()`,
+        savepoint or signal. The user and device stamps are computed once.
+        Falls back to one `create()` per item when that would skip code,
+        see `can_bulk_create`.
+        """
+        if not self.can_bulk_create(validated_data):
+            return super().create(validated_data)
+
+        child = self.child
+        ModelClass = child.Meta.model
+        stamps = {**child._assign_os_device({}), **child.get_create_stamps()}
+        instances = []
+        for attrs in validated_data:
+            attrs.pop("id", None)
+            instances.append(ModelClass(**{**attrs, **stamps}))
+        ModelClass._default_manager.bulk_create(
+            instances, batch_size=self.bulk_batch_size
+        )
+        # bulk_create sends no post_save
+        response_cache.invalidate(ModelClass)
+        return instances
+
+    def can_bulk_create(self, validated_data):
+        """
+        Only plain `BaseModelSerializer.create()` of a model without its own
+        `save()`, with flat data: dict/list values other than the value of
+        a plain model field (`JSONField`), i.e. nested writes and
+        many-to-many, need the child's `create()`.
+        """
+        child = self.child
+        if (
+            not isinstance(child, BaseModelSerializer)
+            or type(child).create is not BaseModelSerializer.create
+        ):
+            return False
+        ModelClass = child.Meta.model
+        if ModelClass.save not in (models.Model.save, AbstractBaseModel.save):
+            return False
+        plain_fields = model_meta.get_field_info(ModelClass).fields
+        return not any(
+            isinstance(value, (dict, list)) and name not in plain_fields
+            for attrs in validated_data
+            for name, value in attrs.items()
+        )
+
+    @property
+    def errors(self):
+        """
+        `{index: item errors}` for the items that failed, each formatted as
+        by `BaseModelSerializer.errors`.
+        """
+        errors = super().errors
+        if not isinstance(errors, list):
+            # not a list, too many items, ...
+            return errors
+        fields = self.child.fields
+        return ReturnDict(
+            {
+                index: format_errors(fields, item_errors)
+                for index, item_errors in enumerate(errors)
+                if item_errors
+            },
+            serializer=self,
+        )
+
+
+class ActionUserRepresentationMixin:
+    """
+    Represents `created_by`/`modified_by` ids as `ActionUserSerializer` data,
+    from the map filled by `BaseModelListSerializer` for lists and looked up
+    once per request and user otherwise.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # `BaseSerializer.many_init` with `BaseModelListSerializer` as the
+        # default `Meta.list_serializer_class`, `Meta` is left untouched
+        list_kwargs = {}
+        for key in LIST_SERIALIZER_KWARGS_REMOVE:
+            value = kwargs.pop(key, None)
+            if value is not None:
+                list_kwargs[key] = value
+        list_kwargs["child"] = cls(*args, **kwargs)
+        list_kwargs.update(
+            {
+                key: value
+                for key, value in kwargs.items()
+                if key in LIST_SERIALIZER_KWARGS
+            }
+        )
+        meta = getattr(cls, "Meta", None)
+        list_serializer_class = getattr(
+            meta, "list_serializer_class", BaseModelListSerializer
+        )
+        return list_serializer_class(*args, **list_kwargs)
+
+    def represent_action_users(self, instance, repr):
+        fields = [name for name in ACTION_USER_FIELDS if name in self.fields]
+        if not fields:
+            return repr
+        users = resolve_action_users(
+            self.context, [getattr(instance, name, None) for name in fields]
+        )
+        for name in fields:
+            user = users.get(getattr(instance, name, None))
+            if user is not None:
+                repr[name] = user
+        return repr
+
+
+class CompressedJSONSerializerField(serializers.JSONField):
+    # decompresses the `LazyJSON` of a `CompressedJSONField` when rendered
+    def to_representation(self, value):
+        if isinstance(value, LazyJSON):
+            value = value.value
+        return super().to_representation(value)
+
+
+class BaseModelSerializer(ActionUserRepresentationMixin, serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        CompressedJSONField: CompressedJSONSerializerField,
+    }
+
+    # Unbound fields of each class, built from model introspection once per
+    # process (one entry per serializer class, whatever the `?fields=` a
+    # client asks for); each instance binds deep copies of the fields it
+    # keeps after `include_fields`/`exclude_fields`.
+    # Set `cache_fields = False` when `get_fields()` depends on the
+    # context/instance (a `get_fields` override is never cached).
+    cache_fields = True
+    _field_prototypes = {}
+
     def __init__(self, *args, **kwargs):
-        exclude_fields = kwargs.pop("exclude_fields", [])
-        include_fields = kwargs.pop("include_fields", [])
+        self.exclude_fields = tuple(kwargs.pop("exclude_fields", None) or ())
+        self.include_fields = tuple(kwargs.pop("include_fields", None) or ())
         super().__init__(*args, **kwargs)
-        for field_name in exclude_fields:
-            self.fields.pop(field_name, None)
 
+    @cached_property
+    def fields(self):
+        fields = BindingDict(self)
+        for field_name, field in self.get_field_prototypes().items():
+            fields[field_name] = field
+        return fields
+
+    def get_field_prototypes(self):
+        """
+        Fresh, unbound fields after `include_fields`/`exclude_fields`.
+        """
+        cacheable = (
+            self.cache_fields
+            and type(self).get_fields is serializers.ModelSerializer.get_fields
+        )
+        prototypes = self._field_prototypes.get(type(self)) if cacheable else None
+        if prototypes is None:
+            prototypes = self.get_fields()
+            if not cacheable:
+                return self.select_fields(prototypes)
+            self._field_prototypes[type(self)] = prototypes
+        return {
+            name: copy.deepcopy(field)
+            for name, field in self.select_fields(prototypes).items()
+        }
+
+    def select_fields(self, fields):
+        fields = {
+            name: field
+            for name, field in fields.items()
+            if name not in self.exclude_fields
+        }
         # Include only specified fields
-        if include_fields:
-            new_fields = {
-                field_name: self.fields[field_name] for field_name in include_fields
+        if self.include_fields:
+            fields = {
+                field_name: fields[field_name] for field_name in self.include_fields
             }
-            self.fields = new_fields
+        return fields
 
     def _assign_os_device(self, attrs):
         request = self.context.get("request", None)
-        device_type = {
-            "mobile": request.user_agent.is_mobile,
-            "pc": request.user_agent.is_pc,
-            "tablet": request.user_agent.is_tablet,
-            "other": request.user_agent.is_tablet,
-        }
-        os_ = request.user_agent.os.family.lower()
-        os_type_ = os_.split()[0]
-        os_type = {
-            "windows": os_type_ == "windows",
-            "ios": os_type_ == "ios",
-            "android": os_type_ == "android",
-            "mac": os_type_ == "mac",
-            "linux": os_type_ == "linux",
-            "other": os_type_ == "other",
-        }
-
-        true_os = next((key for key, value in os_type.items() if value), "other")
-        true_device = next(
-            (key for key, value in device_type.items() if value), "other"
-        )
-
-        attrs["device_type"] = true_device
-        attrs["os_type"] = true_os
+        client_info = get_client_info(request)
+        attrs["device_type"] = client_info.device_type
+        attrs["os_type"] = client_info.os_type
         return attrs
 
-    @transaction.atomic
-    def create(self, validated_data):
+    def get_create_stamps(self):
+        """
+        `created_by`/`modified_by` of the requesting user for a new row.
+        """
         request_data = self.context.get("request")
-        validated_data.pop("id", None)
         if not request_data:
             raise serializers.ValidationError(
                 {
@@ -97,6 +387,7 @@ class BaseModelSerializer(serializers.ModelSerializer):
                     "while creating the data"
                 }
             )
+        stamps = {}
         if not settings.DISABLED_AUTHENTICATION:
             user_id = None
             try:
@@ -106,8 +397,14 @@ class BaseModelSerializer(serializers.ModelSerializer):
                     {"message": "Invalid request. Invalid user."}
                 )
             if user_id:
-                validated_data["created_by"] = user_id
-                validated_data["modified_by"] = user_id
+                stamps["created_by"] = user_id
+                stamps["modified_by"] = user_id
+        return stamps
+
+    @transaction.atomic
+    def create(self, validated_data):
+        validated_data.pop("id", None)
+        validated_data.update(self.get_create_stamps())
         return super().create(validated_data)
 
     @transaction.atomic
@@ -143,71 +440,11 @@ class BaseModelSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         repr = super().to_representation(instance)
 
-        if "created_by" in self.fields:
-            if instance.created_by:
-                if instance.created_by >= 1 and "created_by" in self.fields:
-                    repr["created_by"] = ActionUserSerializer(
-                        User.objects.get(id=instance.created_by)
-                    ).data
-        if "modified_by" in self.fields:
-            if instance.modified_by:
-                if instance.modified_by >= 1 and "modified_by" in self.fields:
-                    repr["modified_by"] = ActionUserSerializer(
-                        User.objects.get(id=instance.modified_by)
-                    ).data
-
-        return repr
+        return self.represent_action_users(instance, repr)
 
     @property
     def errors(self):
-        from collections import OrderedDict
-
-        formatted_errors = OrderedDict()
-
-        all_errors = super().errors
-        if not all_errors:
-            return ReturnDict(formatted_errors, serializer=self)
-
-        fields = self.fields  # caching fields
-        required_msg = "This field is required."
-
-        for field_name, field_errors in all_errors.items():
-            # Skip empty errors immediately
-            if not field_errors:
-                continue
-
-            # Handle non-list errors directly
-            if not isinstance(field_errors, list):
-                formatted_errors[field_name] = field_errors
-                continue
-
-            # Get field type once
-            field = fields.get(field_name)
-
-            # Handle non-ListSerializer fields directly
-            if not isinstance(field, ListSerializer):
-                formatted_errors[field_name] = field_errors
-                continue
-
-            # Handle required field error - most common case first
-            if len(field_errors) == 1 and field_errors[0] == required_msg:
-                formatted_errors[field_name] = field_errors
-                continue
-
-            indexed_errors = {
-                idx: (
-                    error
-                    if isinstance(error, dict)
-                    else {"non_field_errors": [str(error).capitalize()]}
-                )
-                for idx, error in enumerate(field_errors)
-                if error
-            }
-
-            if indexed_errors:
-                formatted_errors[field_name] = indexed_errors
-
-        return ReturnDict(formatted_errors, serializer=self)
+        return ReturnDict(format_errors(self.fields, super().errors), serializer=self)
 
     @property
     def exception_class(self):
@@ -280,7 +517,9 @@ class BaseModelSerializer(serializers.ModelSerializer):
             self.raise_exception(errors=self.empty_dict_of_errors)
 
 
-class AbstractBaseModelSerializer(serializers.ModelSerializer):
+class AbstractBaseModelSerializer(
+    ActionUserRepresentationMixin, serializers.ModelSerializer
+):
     """
     this base serializer sets the `created_by` and `modified_by` fields
     from the JWT token in the request.
@@ -300,15 +539,7 @@ class AbstractBaseModelSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         repr = super().to_representation(instance)
-        if instance.created_by >= 1 and "created_by" in self.fields:
-            repr["created_by"] = ActionUserSerializer(
-                User.objects.get(id=instance.created_by)
-            ).data
-        if instance.modified_by >= 1 and "modified_by" in self.fields:
-            repr["modified_by"] = ActionUserSerializer(
-                User.objects.get(id=instance.modified_by)
-            ).data
-        return repr
+        return self.represent_action_users(instance, repr)
 
     class Meta:
         abstract = True
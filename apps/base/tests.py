@@ -1,3 +1,603 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_save
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from djangorestframework_camel_case import util as camel_case_util
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from rest_framework import serializers
+from rest_framework.permissions import BasePermission
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.api_logs.models import APILog
+from apps.api_logs.serializers import ApiLogsListSerializer
+from apps.authentication.models.roles_permissions import CustomPermission, Roles
+from apps.base import fields
+from apps.base.libs import camel_case, counting, response_cache, search, user_agent
+from apps.base.libs.filter_plan import FILTER_TYPES, FilterError, FilterPlan
+from apps.base.renderer.renderer import (
+    FastCamelCaseJSONRenderer,
+    StreamingCamelCaseJSONRenderer,
+)
+from apps.base.models import CompressionDictionary
+from apps.base.serializers import BaseModelListSerializer, BaseModelSerializer
+from apps.base.views import (
+    AsyncCustomGenericListView,
+    CustomFilterOrderingSearchMixin,
+    CustomGenericListView,
+    CustomGenericRetrieveView,
+)
+
+
+def parity_cases():
+    return {
+        "nested": {"user_id": 1, "items_list": [{"inner_key": None}]},
+        "generator": {"items_list": ({"inner_key": i} for i in range(3))},
+        "dict values": {"items_list": {"a": {"inner_key": 0}}.values()},
+        "set": {"tag_ids": {1}},
+        "tuple": {"pair_value": ({"left_key": 1}, 2)},
+        "lazy": {gettext_lazy("lazy_key"): gettext_lazy("lazy value")},
+        "types": {
+            "price_value": Decimal("1.50"),
+            "created_at": datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc),
+            "public_id": uuid.UUID(int=1),
+        },
+        "floats": {"big_float": 1e16, "small_float": 1e-7, "plain_float": 0.1},
+        "big int": {"big_int": 2**70, "small_int": -(2**63)},
+        "non str keys": {1: "one", "two_key": {2: None}},
+        "line separators": {"text_value": "a\u2028b\u2029c é"},
+    }
+
+
+class FastCamelCaseJSONRendererTests(SimpleTestCase):
+    def test_renders_the_same_json_as_the_camel_case_renderer(self):
+        # generators are consumed, each renderer gets its own cases
+        expected = parity_cases()
+        for name, data in parity_cases().items():
+            with self.subTest(name):
+                current = CamelCaseJSONRenderer().render(expected[name])
+                fast = FastCamelCaseJSONRenderer().render(data)
+                self.assertEqual(json.loads(fast), json.loads(current))
+                self.assertNotIn("\u2028".encode(), fast)
+
+    def test_rejects_non_finite_floats(self):
+        for value in (float("nan"), float("inf")):
+            with self.subTest(value):
+                with self.assertRaises(ValueError):
+                    CamelCaseJSONRenderer().render({"value": value})
+                with self.assertRaises(ValueError):
+                    FastCamelCaseJSONRenderer().render({"value": value})
+
+    def test_indented_output(self):
+        data = {"user_id": 1}
+        self.assertEqual(
+            FastCamelCaseJSONRenderer().render(data, "application/json; indent=2"),
+            CamelCaseJSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+
+class StreamingCamelCaseJSONRendererTests(SimpleTestCase):
+    def envelope(self, items):
+        return {"success": True, "total_count": len(items), "data": items}
+
+    def test_stream_matches_render(self):
+        items = [
+            {"item_id": i, "unit_price": 1e16 + i, "ratio_value": 1e-7}
+            for i in range(7)
+        ]
+        renderer = StreamingCamelCaseJSONRenderer()
+        expected = renderer.render(self.envelope(items))
+        for chunk_size in (1, 3, 7, 100):
+            with self.subTest(chunk_size=chunk_size):
+                envelope = self.envelope(items)
+                chunks = list(
+                    renderer.render_stream(envelope, "data", iter(items), chunk_size)
+                )
+                self.assertEqual(b"".join(chunks), expected)
+
+    def test_empty_page(self):
+        renderer = StreamingCamelCaseJSONRenderer()
+        envelope = self.envelope([])
+        streamed = b"".join(renderer.render_stream(envelope, "data", iter([])))
+        self.assertEqual(streamed, renderer.render(envelope))
+
+
+class AsyncCustomGenericListViewTests(TestCase):
+    def view(self, **attrs):
+        attrs = {
+            "serializer_class": ApiLogsListSerializer,
+            "queryset": APILog.objects.all(),
+            "permission_classes": [],
+            **attrs,
+        }
+        return type("LogListView", (AsyncCustomGenericListView,), attrs)
+
+    async def test_lists_the_page(self):
+        await APILog.objects.abulk_create(
+            [APILog(url=f"/{index}", method="GET") for index in range(3)]
+        )
+        response = await self.view().as_view()(APIRequestFactory().get("/"))
+        self.assertEqual(response.status_code, 200)
+        urls = sorted(row["url"] for row in response.data["data"])
+        self.assertEqual(urls, ["/0", "/1", "/2"])
+
+    def test_rejects_the_sync_only_options(self):
+        for option in ("cache_response", "stream_response"):
+            with self.subTest(option):
+                with self.assertRaises(AssertionError):
+                    self.view(**{option: True}).as_view()
+
+
+@override_settings(RESPONSE_CACHE={"ENABLED": False})
+class CountStrategyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        APILog.objects.bulk_create(
+            [APILog(url=f"/{index}", method="GET") for index in range(5)]
+        )
+
+    def view(self, strategy):
+        return type(
+            "LogListView",
+            (CustomGenericListView,),
+            {
+                "serializer_class": ApiLogsListSerializer,
+                "queryset": APILog.objects.all(),
+                "permission_classes": [],
+                "count_strategy": strategy,
+            },
+        )
+
+    def get(self, strategy, **params):
+        response = self.view(strategy).as_view()(APIRequestFactory().get("/", params))
+        return response.status_code, response.data
+
+    def test_exact(self):
+        _, data = self.get(counting.EXACT, limit=2)
+        self.assertEqual(data["total_count"], 5)
+        self.assertEqual(data["total_pages"], 3)
+        self.assertTrue(data["count_is_exact"])
+        self.assertTrue(data["has_more"])
+
+        _, data = self.get(counting.EXACT, limit=2, page=3)
+        self.assertEqual(data["current_count"], 1)
+        self.assertFalse(data["has_more"])
+
+    def test_cached_counts_once_per_filter_signature(self):
+        _, data = self.get(counting.CACHED, limit=2)
+        self.assertEqual(data["total_count"], 5)
+        APILog.objects.create(url="/5", method="GET")
+        _, data = self.get(counting.CACHED, limit=2)
+        self.assertEqual(data["total_count"], 5)
+        self.assertTrue(data["count_is_exact"])
+
+    def test_estimate_of_an_unfiltered_list(self):
+        with mock.patch.object(counting, "estimated_count", return_value=1000):
+            _, data = self.get(counting.ESTIMATE, limit=2)
+            self.assertEqual(data["total_count"], 1000)
+            self.assertFalse(data["count_is_exact"])
+            # the estimate may be too high, pages past it are not rejected
+            status_code, data = self.get(counting.ESTIMATE, limit=2, page=600)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data["data"], [])
+
+    def test_estimate_falls_back_to_the_cached_count(self):
+        # no planner estimate outside Postgres
+        _, data = self.get(counting.ESTIMATE, limit=2)
+        self.assertEqual(data["total_count"], 5)
+        self.assertTrue(data["count_is_exact"])
+
+    def test_has_more(self):
+        _, data = self.get(counting.HAS_MORE, limit=2)
+        self.assertIsNone(data["total_count"])
+        self.assertIsNone(data["total_pages"])
+        self.assertFalse(data["count_is_exact"])
+        self.assertEqual(data["current_count"], 2)
+        self.assertTrue(data["has_more"])
+
+        _, data = self.get(counting.HAS_MORE, limit=2, page=3)
+        self.assertEqual(data["current_count"], 1)
+        self.assertFalse(data["has_more"])
+
+        status_code, _ = self.get(counting.HAS_MORE, page=0)
+        self.assertEqual(status_code, 404)
+
+
+class RoleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Roles
+        fields = ["id", "name"]
+
+
+class IsStaffObject(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_staff
+
+
+@override_settings(
+    RESPONSE_CACHE={"ENABLED": True, "ALLOW_LOCAL_MEMORY": True, "TIMEOUT": 60}
+)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.role = Roles.objects.create(name="first")
+        users = get_user_model().objects
+        self.user = users.create(email="user@example.com", username="user")
+        self.staff = users.create(
+            email="staff@example.com", username="staff", is_staff=True
+        )
+
+    def view(self, base=CustomGenericListView, **attrs):
+        attrs = {
+            "serializer_class": RoleSerializer,
+            "queryset": Roles.objects.all(),
+            "cache_response": True,
+            **attrs,
+        }
+        return type("RoleView", (base,), attrs)
+
+    def get(self, view, user=None, **kwargs):
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=user or self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = view.as_view()(request, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+        return response, len(queries)
+
+    def names(self, response):
+        return [row["name"] for row in json.loads(response.content)["data"]]
+
+    def test_hits_until_the_model_changes(self):
+        view = self.view()
+        changes = {
+            "save": lambda: Roles.objects.create(name="second"),
+            "soft delete": lambda: Roles.objects.get(name="second").delete(),
+            "queryset soft delete": lambda: Roles.objects.all().delete(),
+            "restore": lambda: Roles.all_objects.get(name="first").restore(),
+            "hard delete": lambda: self.role.delete(hard=True),
+        }
+        expected = {
+            "save": ["first", "second"],
+            "soft delete": ["first"],
+            "queryset soft delete": [],
+            "restore": ["first"],
+            "hard delete": [],
+        }
+        missed, _ = self.get(view)
+        for name, change in changes.items():
+            with self.subTest(name):
+                hit, queries = self.get(view)
+                self.assertEqual(queries, 0)
+                self.assertEqual(hit.content, missed.content)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                missed, queries = self.get(view)
+                self.assertGreater(queries, 0)
+                self.assertCountEqual(self.names(missed), expected[name])
+
+    def test_refuses_a_local_memory_cache(self):
+        with (
+            override_settings(RESPONSE_CACHE={"ENABLED": True}),
+            mock.patch.object(response_cache, "_warned_aliases", set()),
+            self.assertLogs(response_cache.logger, "WARNING"),
+        ):
+            enabled, _, _ = response_cache.get_response_cache_settings()
+        self.assertFalse(enabled)
+
+    def test_does_not_cache_objects_with_object_permissions(self):
+        view = self.view(
+            base=CustomGenericRetrieveView,
+            permission_classes=[IsStaffObject],
+            cache_scope="public",
+        )
+        response, _ = self.get(view, self.staff, pk=self.role.pk)
+        self.assertEqual(response.status_code, 200)
+        response, _ = self.get(view, self.user, pk=self.role.pk)
+        self.assertEqual(response.status_code, 403)
+
+
+class RoleWriteSerializer(BaseModelSerializer):
+    class Meta:
+        model = Roles
+        fields = ["id", "name", "remarks", "permissions"]
+
+
+class RoleCreateSerializer(RoleWriteSerializer):
+    created = []
+
+    def create(self, validated_data):
+        instance = super().create(validated_data)
+        self.created.append(instance)
+        return instance
+
+
+class BulkCreateTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            email="user@example.com", username="user"
+        )
+        request = APIRequestFactory().post("/")
+        force_authenticate(request, user=self.user)
+        self.request = Request(request)
+
+    def save(self, serializer_class, items):
+        serializer = serializer_class(
+            data=items, many=True, context={"request": self.request}
+        )
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as queries:
+            instances = serializer.save()
+        inserts = [
+            query for query in queries if query["sql"].startswith("INSERT INTO")
+        ]
+        return instances, len(inserts)
+
+    def test_inserts_flat_items_in_batches(self):
+        items = [{"name": f"role {index}"} for index in range(3)]
+        receiver = mock.Mock()
+        post_save.connect(receiver, sender=Roles)
+        self.addCleanup(post_save.disconnect, receiver, sender=Roles)
+        with mock.patch.object(BaseModelListSerializer, "bulk_batch_size", 2):
+            _, inserts = self.save(RoleWriteSerializer, items)
+        # no per-row save()
+        receiver.assert_not_called()
+        self.assertEqual(inserts, 2)
+        roles = Roles.objects.order_by("name")
+        self.assertEqual([role.name for role in roles], ["role 0", "role 1", "role 2"])
+        self.assertEqual({role.created_by for role in roles}, {self.user.id})
+
+    def test_falls_back_to_create_for_many_to_many(self):
+        permission = CustomPermission.objects.create(name="view", code_name="view")
+        items = [
+            {"name": f"role {index}", "permissions": [permission.pk]}
+            for index in range(2)
+        ]
+        instances, _ = self.save(RoleWriteSerializer, items)
+        for role in instances:
+            self.assertEqual(list(role.permissions.all()), [permission])
+
+    def test_falls_back_to_an_overridden_create(self):
+        items = [{"name": f"role {index}"} for index in range(2)]
+        with mock.patch.object(RoleCreateSerializer, "created", []) as created:
+            instances, inserts = self.save(RoleCreateSerializer, items)
+        self.assertEqual(created, instances)
+        self.assertEqual(inserts, 2)
+
+
+@override_settings(PAYLOAD_COMPRESSION={"CODEC": "zlib", "USE_DICTIONARY": True})
+class CompressedJSONFieldTests(TestCase):
+    def setUp(self):
+        fields.reset_dictionary_cache()
+        self.addCleanup(fields.reset_dictionary_cache)
+
+    def stored(self, log):
+        raw = APILog.objects.filter(pk=log.pk).values_list("body", flat=True).get()
+        # the stored bytes, `from_db_value` wraps them in a `LazyJSON`
+        return raw.raw
+
+    def test_round_trip(self):
+        body = {"user_name": "a", "amount": Decimal("1.50"), "ids": [1, 2]}
+        log = APILog.objects.create(url="/", method="POST", body=body)
+        self.assertEqual(fields.header_of(self.stored(log)), (fields.ZLIB, 0))
+
+        loaded = APILog.objects.get(pk=log.pk).body
+        self.assertIsInstance(loaded, fields.LazyJSON)
+        self.assertEqual(
+            loaded.value, {"user_name": "a", "amount": "1.50", "ids": [1, 2]}
+        )
+
+    def test_reads_uncompressed_json(self):
+        self.assertEqual(fields.decompress(b'{"a":1}'), b'{"a":1}')
+        self.assertEqual(fields.LazyJSON(b'{"a":1}').value, {"a": 1})
+
+    def test_records_the_dictionary_used(self):
+        dictionary = CompressionDictionary.objects.create(
+            label="api_logs.apilog", codec="zlib", data=b'"user_name":"method":'
+        )
+        log = APILog.objects.create(url="/", method="POST", body={"user_name": "a"})
+        self.assertEqual(
+            fields.header_of(self.stored(log)), (fields.ZLIB, dictionary.pk)
+        )
+        # a retrained dictionary does not break older rows
+        dictionary.active = False
+        dictionary.save()
+        fields.reset_dictionary_cache()
+        self.assertEqual(APILog.objects.get(pk=log.pk).body, {"user_name": "a"})
+
+
+class PostgresSearchFilterTests(TestCase):
+    def test_index_definitions_match_the_lookups(self):
+        definitions = search.search_index_definitions(
+            APILog, ["url", "$status_code", "@user_agent", "system_details__os"]
+        )
+        self.assertEqual(
+            definitions,
+            [
+                (
+                    "api_logs_apilog_url_trgm",
+                    search.TRIGRAM,
+                    'USING gin (UPPER("url"::text) gin_trgm_ops)',
+                ),
+                (
+                    "api_logs_apilog_status_code_trgm_re",
+                    search.TRIGRAM_REGEX,
+                    'USING gin (("status_code"::text) gin_trgm_ops)',
+                ),
+                (
+                    "api_logs_apilog_user_agent_tsv",
+                    search.TSVECTOR,
+                    "USING gin (to_tsvector('simple'::regconfig, "
+                    "COALESCE(\"user_agent\", '')))",
+                ),
+            ],
+        )
+
+    def test_token_search_falls_back_to_a_substring_search(self):
+        APILog.objects.create(url="/api/v1/auctions/", method="GET")
+        APILog.objects.create(url="/api/v1/users/", method="GET")
+        view = mock.Mock(search_fields=["@url"])
+        request = Request(APIRequestFactory().get("/", {"search": "auctions"}))
+        queryset = search.PostgresSearchFilter().filter_queryset(
+            request, APILog.objects.all(), view
+        )
+        self.assertEqual([log.url for log in queryset], ["/api/v1/auctions/"])
+
+    def test_make_search_migration(self):
+        out = StringIO()
+        with mock.patch(
+            "apps.base.management.commands.make_search_migration.MigrationLoader"
+        ) as loader_class:
+            loader = loader_class.return_value
+            loader.graph.leaf_nodes.return_value = [("api_logs", "0007_apilog")]
+            call_command(
+                "make_search_migration",
+                "apps.api_logs.views.APILogsListView",
+                "--dry-run",
+                stdout=out,
+            )
+        migration = out.getvalue()
+        self.assertIn('TABLE = "api_logs_apilog"', migration)
+        self.assertIn("'api_logs_apilog_url_trgm'", migration)
+        self.assertIn('("api_logs", "0007_apilog")', migration)
+        self.assertIn("atomic = False", migration)
+
+
+IPHONE = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
+)
+WINDOWS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+
+
+class ClientInfoTests(SimpleTestCase):
+    def test_classifies_device_and_os(self):
+        self.assertEqual(user_agent.classify_user_agent(IPHONE), ("mobile", "ios"))
+        self.assertEqual(user_agent.classify_user_agent(WINDOWS), ("pc", "windows"))
+        self.assertEqual(user_agent.classify_user_agent(""), ("other", "other"))
+
+    def test_classifies_once_per_request(self):
+        request = APIRequestFactory().get("/", HTTP_USER_AGENT=IPHONE)
+        with mock.patch.object(
+            user_agent,
+            "classify_user_agent",
+            wraps=user_agent.classify_user_agent,
+        ) as classify:
+            info = user_agent.get_client_info(request)
+            # the DRF request shares the Django request's result
+            self.assertIs(user_agent.get_client_info(Request(request)), info)
+        classify.assert_called_once_with(IPHONE)
+
+
+class KeyCacheTests(SimpleTestCase):
+    payload = {
+        "userName": "a",
+        "roleIds": [{"roleId": 1, "createdAt": None}, {"roleId": 2}],
+        "address2Line": "x",
+        "extraField": {"requestId": "r"},
+    }
+
+    def test_underscoreize_matches_upstream(self):
+        for options in (
+            {},
+            {"no_underscore_before_number": True},
+            {"ignore_fields": ["extraField"]},
+            {"ignore_keys": ["userName"]},
+        ):
+            with self.subTest(**options):
+                self.assertEqual(
+                    camel_case.underscoreize(self.payload, **options),
+                    camel_case_util.underscoreize(self.payload, **options),
+                )
+
+    def test_underscoreize_keeps_query_dicts(self):
+        data = QueryDict("userName=a&roleIds=1&roleIds=2")
+        result = camel_case.underscoreize(data)
+        self.assertIsInstance(result, QueryDict)
+        self.assertEqual(result.getlist("role_ids"), ["1", "2"])
+
+    def test_camelize_matches_upstream(self):
+        data = camel_case.underscoreize(self.payload)
+        self.assertEqual(camel_case.camelize(data), camel_case_util.camelize(data))
+
+    def test_repeated_keys_are_converted_once(self):
+        camel_case.underscore_key.cache_clear()
+        camel_case.underscoreize([{"roleId": index} for index in range(10)])
+        stats = camel_case.key_cache_stats()["underscoreize"]
+        self.assertEqual((stats["misses"], stats["hits"]), (1, 9))
+
+
+class FilterPlanTests(SimpleTestCase):
+    def plan(self, **options):
+        options = {
+            "filter_fields": [
+                ("created_at", "date"),
+                ("is_active", "boolean"),
+                ("name", "text"),
+                ("user_id", "id"),
+            ],
+            "filter_types": FILTER_TYPES,
+            "ordering_fields": ["name", "-name", "id", "-id"],
+            "ordering": "-created_at",
+            "backends": [],
+            **options,
+        }
+        return FilterPlan(**options)
+
+    def test_parses_the_parameters_sent(self):
+        params = QueryDict("created_at=2024-02-03&is_active=TRUE&user_id=7&other=1")
+        self.assertEqual(
+            self.plan().get_filter_kwargs(params),
+            {"created_at__date": date(2024, 2, 3), "is_active": True, "user_id": 7},
+        )
+
+    def test_rejects_malformed_values(self):
+        for query, message in (
+            ("user_id=x", "Invalid ID format for field: user_id"),
+            ("created_at=2024-2-3", "Invalid format for field: created_at"),
+        ):
+            with self.subTest(query):
+                with self.assertRaisesMessage(FilterError, message):
+                    self.plan().get_filter_kwargs(QueryDict(query))
+
+    def test_orders_by_whitelisted_terms_only(self):
+        plan = self.plan()
+        ordering = plan.get_ordering(QueryDict("ordering=-name,id"))
+        self.assertEqual(ordering, ("-name", "id"))
+        for query in ("", "ordering=password", "ordering=name,password"):
+            with self.subTest(query):
+                self.assertEqual(plan.get_ordering(QueryDict(query)), ("-created_at",))
+
+    def test_supports_the_deprecated_filter_logic(self):
+        class View(CustomFilterOrderingSearchMixin):
+            filter_backends = ()
+            filter_fields = [("name", "text"), ("user_id", "id")]
+            filter_logic = {
+                "text": lambda field, value: {f"{field}__iexact": value},
+                "id": lambda field, value: {f"{field}__in": [value]},
+            }
+
+        with self.assertWarns(DeprecationWarning):
+            plan = FilterPlan.for_view(View)
+        self.assertEqual(
+            plan.get_filter_kwargs(QueryDict("name=Ab&user_id=3")),
+            {"name__iexact": "Ab", "user_id__in": [3]},
+        )
@@ -5,6 +5,8 @@ from django.core.handlers.asgi import ASGIRequest
 from django.core.handlers.wsgi import WSGIRequest
 from rest_framework.response import Response
 
+from apps.base.libs.user_agent import get_client_info
+
 
 def hostname_from_request(request):
     # split on `:` to remove port
@@ -23,15 +25,83 @@ def is_valid_json(json_data_function, *args):
     return False
 
 
-def clean_response(response, include_tokens=False):
-    resp_data = (
-        json.loads(response.content.decode("utf-8"))
-        if response.content and is_valid_json(response.content.decode, "utf-8")
-        else {}
-    )
+TRUNCATED_MARKER = "...[truncated]"
+TOKEN_KEYS = ("access", "refresh")
+
+
+def _cap_structure(value, budget):
+    """
+    Copies `value` while spending `budget[0]` (roughly bytes of JSON).
+    Once the budget is spent, strings are cut and the remaining list items
+    and dict keys are replaced by a truncation marker.
+    """
+    if isinstance(value, dict):
+        result = {}
+        for index, (key, item) in enumerate(value.items()):
+            if budget[0] <= 0:
+                result["_truncated"] = f"{TRUNCATED_MARKER} {len(value) - index} keys"
+                break
+            budget[0] -= len(str(key)) + 4
+            result[key] = _cap_structure(item, budget)
+        return result
+    if isinstance(value, (list, tuple)):
+        result = []
+        for index, item in enumerate(value):
+            if budget[0] <= 0:
+                result.append(f"{TRUNCATED_MARKER} {len(value) - index} items")
+                break
+            result.append(_cap_structure(item, budget))
+        return result
+    if isinstance(value, str):
+        if len(value) > budget[0]:
+            value = value[: max(budget[0], 0)] + TRUNCATED_MARKER
+        budget[0] -= len(value) + 2
+        return value
+    # numbers, booleans, None, dates...
+    budget[0] -= 8
+    return value
+
+
+def _redact_keys(value, keys):
+    # `value` is already a copy made by `_cap_structure`
+    if isinstance(value, dict):
+        for key, item in value.items():
+            value[key] = "" if key in keys else _redact_keys(item, keys)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            value[index] = _redact_keys(item, keys)
+    return value
+
+
+def clean_response(response, include_tokens=False, max_bytes=None):
+    """
+    Captures a response for the api log without rendering or decoding it
+    again: the DRF `response.data` structure when there is one, otherwise the
+    rendered content as text. Both are capped at `API_LOG_RESPONSE_MAX_BYTES`.
+
+    `response.data` has the snake_case keys of the serializers, not the
+    camelCase ones the client received; the logged request body is
+    underscoreized the same way.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, "API_LOG_RESPONSE_MAX_BYTES", 64 * 1024)
+
+    data = getattr(response, "data", None)
+    if data is not None:
+        resp_data = _cap_structure(data, [max_bytes])
+    elif getattr(response, "streaming", False):
+        return {"_streaming": True}
+    else:
+        content = response.content
+        if len(content) > max_bytes:
+            resp_data = (
+                content[:max_bytes].decode("utf-8", errors="ignore") + TRUNCATED_MARKER
+            )
+        else:
+            resp_data = content.decode("utf-8", errors="replace")
+
     if include_tokens:
-        resp_data["access"] = ""
-        resp_data["refresh"] = ""
+        resp_data = _redact_keys(resp_data, TOKEN_KEYS)
     return resp_data
 
 
@@ -41,9 +111,13 @@ def log_request_response(
     body: dict,
     catch_error=False,
     server_error_logging=False,
+    capture_payload=True,
+    extra=None,
+    metrics=None,
 ) -> None:
-    allowed_methods = ["PATCH", "PUT", "POST", "DELETE"]
-    allowed_endpoints = ["/api/"]
+    log_policy = getattr(settings, "API_LOG_POLICY", {})
+    allowed_methods = log_policy.get("METHODS", ["PATCH", "PUT", "POST", "DELETE"])
+    allowed_endpoints = log_policy.get("PATH_PREFIXES", ["/api/"])
 
     if (
         request.method.casefold() in [method.casefold() for method in allowed_methods]
@@ -60,34 +134,11 @@ def log_request_response(
         except Exception as e:
             pass
 
-        device_type = {
-            "mobile": request.user_agent.is_mobile,
-            "pc": request.user_agent.is_pc,
-            "tablet": request.user_agent.is_tablet,
-            "other": request.user_agent.is_tablet,
-        }
-        os_ = request.user_agent.os.family.lower()
-        os_type_ = os_.split()[0]
-        os_type = {
-            "windows": os_type_ == "windows",
-            "ios": os_type_ == "ios",
-            "android": os_type_ == "android",
-            "mac": os_type_ == "mac",
-            "linux": os_type_ == "linux",
-            "other": os_type_ == "other",
-        }
-
-        true_os = next((key for key, value in os_type.items() if value), "other")
-        true_device = next(
-            (key for key, value in device_type.items() if value), "other"
-        )
+        # classified once per request, shared with the serializers
+        client_info = get_client_info(request)
 
-        from apps.api_logs.models import APILog
+        from apps.api_logs.writer import get_log_writer
 
-        try:
-            response.render()
-        except Exception as e:
-            pass
         include_tokens = "login" in str(request.get_full_path()).casefold()
 
         headers_data = dict(request.headers)
@@ -97,19 +148,26 @@ def log_request_response(
         except Exception as e:
             pass
 
-        server_error = json.loads(response.headers.get("server_error", "false").lower())
+        server_error = (
+            str(response.headers.get("server_error", "false")).lower() == "true"
+        )
         params = {
             "url": str(request.get_full_path()),
             "method": request.method,
             "ip": request.META.get("REMOTE_ADDR"),
             "user_agent": request.headers.get("user-agent"),
-            "body": body,
+            "body": body if capture_payload else {},
             "header": headers_data,
-            "response": clean_response(response, include_tokens=include_tokens),
+            "response": (
+                clean_response(response, include_tokens=include_tokens)
+                if capture_payload
+                else None
+            ),
             "user_id": request.user.id if request.user else 0,
-            "device_type": true_device,
-            "os_type": true_os,
+            "device_type": client_info.device_type,
+            "os_type": client_info.os_type,
             "status_code": 500 if server_error else response.status_code,
+            "extra_field": extra,
             # "status_code": (
             #     500
             #     if server_error_logging and request.method.lower() == "get"
@@ -117,6 +175,10 @@ def log_request_response(
             # ),
             # "created_by": request.user.id if request.user else 0,
         }
+        # route, latency and sizes measured by the api log middleware
+        params.update(metrics or {})
 
-        APILog.objects.create(**params)
+        # written in batches by the background writer, outside the
+        # request transaction
+        get_log_writer().enqueue(params)
         return
@@ -1,7 +1,4 @@
-from datetime import datetime
-
 from django.core.exceptions import ValidationError
-from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.generics import ListAPIView
@@ -10,6 +7,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
+from apps.base.libs.filter_plan import FILTER_TYPES, FilterError, FilterPlan
+
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = "limit"
@@ -49,13 +48,13 @@ class CustomFilterOrderingSearchMixin:
     ordering_fields = []
     ordering = "-created_at"  # Default ordering field
     filterset_fields = []
-    # must define filter fields as a list of tuples (field_name, field_type)
-    filter_logic = {
-        "date": lambda field, value: {f"{field}__date": value},
-        "boolean": lambda field, value: {field: value.lower() in ["true", "1"]},
-        "text": lambda field, value: {field: value},
-        "id": lambda field, value: {field: value},
-    }
+    # must define filter fields as a list of tuples (field_name, field_type),
+    # compiled once per class into a `FilterPlan`
+    filter_fields = []
+    # field_type: (lookup template, parser), extend for custom types. A
+    # `filter_logic` dict of `(field, value) -> filter kwargs` callables,
+    # the former extension point, still works but is deprecated.
+    filter_types = FILTER_TYPES
 
     def get_queryset(self):
         """
@@ -78,66 +77,27 @@ class CustomFilterOrderingSearchMixin:
         serializer_class = self.get_serializer_class()
         return serializer_class(*args, **kwargs)
 
+    def get_filter_plan(self):
+        return FilterPlan.for_view(type(self))
+
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        filter_params = {}
-        for field, field_type in self.filter_fields:
-            param_value = request.query_params.get(field)
-            """
-            logic : get all query params and check if they are in the filter_fields[] 
-            then proceed with each params validation and store it in filter_params dictionary 
-            and at last use that to apply filter to the queryset
-            """
-            if param_value is not None and field_type in self.filter_logic:
-                try:
-                    if field_type == "date":
-                        parsed_date = timezone.make_aware(
-                            datetime.strptime(param_value, "%Y-%m-%d")
-                        )
-                        filter_params.update(
-                            self.filter_logic[field_type](field, parsed_date)
-                        )
-                    elif field_type == "id":
-                        try:
-                            parsed_id = int(param_value)
-                        except ValueError:
-                            return self.custom_error_response(
-                                message=f"Invalid ID format for field: {field}",
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                            )
-                    else:
-                        filter_params.update(
-                            self.filter_logic[field_type](field, param_value)
-                        )
-                except ValueError:
-                    return self.custom_error_response(
-                        message=f"Invalid format filed: {field}",
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                    )
-            # applying filter to queryset
-            if filter_params:
-                queryset = queryset.filter(**filter_params)
-
-            # applying search
-            for backend in self.filter_backends:
-                queryset = backend().filter_queryset(request, queryset, self)
-
-            # applying ordering
-            ordering_params = request.query_params.get("ordering")
-
-            if not ordering_params:
-                ordering_params = self.ordering if self.ordering else None
-
-            if ordering_params and ordering_params in self.ordering_fields:
-                queryset = queryset.order_by(*ordering_params.split(","))
-
-            # applying pagination
-            paginator = self.pagination_class()
-            paginated_queryset = paginator.paginate_queryset(queryset, request)
-
-            # serialized data
-            serializer = self.get_serializer(paginated_queryset, many=True)
-            return paginator.get_paginated_response(data=serializer.data)
+        try:
+            queryset = self.get_filter_plan().apply(
+                self.get_queryset(), request, self
+            )
+        except FilterError as exc:
+            return self.custom_error_response(
+                message=exc.message,
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # applying pagination
+        paginator = self.pagination_class()
+        paginated_queryset = paginator.paginate_queryset(queryset, request)
+
+        # serialized data
+        serializer = self.get_serializer(paginated_queryset, many=True)
+        return paginator.get_paginated_response(data=serializer.data)
 
 
 class CustomAccessToken(AccessToken):
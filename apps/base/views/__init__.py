@@ -10,6 +10,13 @@ from ..views import (
     CustomPagination,
     CustomRefreshToken,
 )
+from .async_views import (
+    AsyncBaseModelViewSet,
+    AsyncCustomGenericCreateView,
+    AsyncCustomGenericListView,
+    AsyncCustomGenericRetrieveView,
+    AsyncCustomGenericUpdateView,
+)
 from .generic_views import (
     CustomGenericCreateView,
     CustomGenericListView,
@@ -24,6 +31,11 @@ from .generic_views import (
 )
 
 __all__ = [
+    "AsyncBaseModelViewSet",
+    "AsyncCustomGenericCreateView",
+    "AsyncCustomGenericListView",
+    "AsyncCustomGenericRetrieveView",
+    "AsyncCustomGenericUpdateView",
     "CustomGenericCreateView",
     "CustomGenericListView",
     "CustomGenericRetrieveView",
@@ -0,0 +1,231 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.http import Http404
+from rest_framework.response import Response
+
+from apps.base.serializers import ACTION_USER_FIELDS, aresolve_action_users
+from apps.base.views import BaseModelViewSet, CustomAPIResponse
+
+from .generic_views import (
+    CustomGenericCreateView,
+    CustomGenericListView,
+    CustomGenericRetrieveView,
+    CustomGenericUpdateView,
+)
+
+
+class AsyncViewMixin:
+    """
+    Runs a DRF view as a coroutine under ASGI, without a worker thread
+    held for the whole request.
+
+    Authentication, permissions and throttles (a user query for JWT, the
+    throttle cache) run in one `sync_to_async` call, async handlers are
+    awaited and sync ones (DRF's `options`, ...) run in a thread.
+    `ATOMIC_REQUESTS` cannot wrap a coroutine, the write handlers open
+    their own transaction.
+
+    This only frees the thread when every middleware is async capable: one
+    sync-only middleware makes Django run the chain, and so the view
+    through `async_to_sync`, in a thread again. `CamelCaseMiddleWare` and
+    `CustomErrorMiddleware` are; `ApiLog`, `RequestTimerMiddleware` and the
+    debug toolbar ones are not.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        view = super().as_view(*args, **initkwargs)
+        for alias in connections:
+            view = transaction.non_atomic_requests(using=alias)(view)
+        # viewsets do not go through Django's `View.as_view` marking
+        return markcoroutinefunction(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncGenericMixin(AsyncViewMixin):
+    """
+    Async counterparts of the `GenericAPIView` steps: `aget()` for the
+    object, `acount()` and async iteration for the page.
+
+    Serializers run in the event loop on the loaded rows: `created_by` /
+    `modified_by` users are fetched beforehand, other relations must be
+    loaded with `select_related` / `prefetch_related` in `get_queryset`
+    (a lazy query raises `SynchronousOnlyOperation`).
+
+    The async handlers replace `ResponseCacheMixin.get` and the sync
+    `list()`, so `cache_response` and `stream_response` are rejected.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        for option in ("cache_response", "stream_response"):
+            assert not initkwargs.get(option, getattr(cls, option, False)), (
+                "%s does not support `%s`, use the sync view."
+                % (cls.__name__, option)
+            )
+        return super().as_view(*args, **initkwargs)
+
+    async def afilter_queryset(self, queryset):
+        # django-filter validates model choice parameters with queries
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        if hasattr(self.paginator, "apaginate_queryset"):
+            return await self.paginator.apaginate_queryset(
+                queryset, self.request, view=self
+            )
+        return await sync_to_async(self.paginator.paginate_queryset)(
+            queryset, self.request, view=self
+        )
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        assert lookup_url_kwarg in self.kwargs, (
+            "Expected view %s to be called with a URL keyword argument "
+            'named "%s". Fix your URL conf, or set the `.lookup_field` '
+            "attribute on the view correctly."
+            % (self.__class__.__name__, lookup_url_kwarg)
+        )
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def aprepare_instances(self, instances):
+        """
+        Loads what the serializers would query lazily, the action users.
+        """
+        user_ids = set()
+        for instance in instances:
+            deferred = instance.get_deferred_fields()
+            user_ids.update(
+                getattr(instance, name, None)
+                for name in ACTION_USER_FIELDS
+                if name not in deferred
+            )
+        await aresolve_action_users(self.get_serializer_context(), user_ids)
+
+    async def aserialize_list(self, queryset):
+        """
+        `(data, paginated)` of the current page, or of the whole queryset
+        when the view is not paginated.
+        """
+        page = await self.apaginate_queryset(queryset)
+        rows = page if page is not None else [obj async for obj in queryset]
+        await self.aprepare_instances(rows)
+        return self.get_serializer(rows, many=True).data, page is not None
+
+
+class AsyncCustomGenericListView(AsyncGenericMixin, CustomGenericListView):
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        validators = await self.aget_list_validators(queryset)
+        not_modified = self.not_modified(validators)
+        if not_modified is not None:
+            return not_modified
+
+        data, paginated = await self.aserialize_list(queryset)
+        response = self.get_paginated_response(data) if paginated else Response(data)
+        return self.set_validators(response, validators)
+
+
+class AsyncCustomGenericRetrieveView(AsyncGenericMixin, CustomGenericRetrieveView):
+    async def get(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        validators = self.get_object_validators(instance)
+        not_modified = self.not_modified(validators)
+        if not_modified is not None:
+            return not_modified
+
+        await self.aprepare_instances([instance])
+        serializer = self.get_serializer(instance)
+        response = CustomAPIResponse.custom_success_response(
+            data=serializer.data, message="Data retrieved successfully."
+        )
+        return self.set_validators(response, validators)
+
+
+class AsyncCustomGenericCreateView(AsyncViewMixin, CustomGenericCreateView):
+    async def post(self, request, *args, **kwargs):
+        # DRF validation and saving are sync, one call in its transaction
+        return await sync_to_async(self.create)(request, *args, **kwargs)
+
+
+class AsyncCustomGenericUpdateView(AsyncViewMixin, CustomGenericUpdateView):
+    async def patch(self, request, *args, **kwargs):
+        return await sync_to_async(self.partial_update)(request, *args, **kwargs)
+
+
+class AsyncBaseModelViewSet(AsyncGenericMixin, BaseModelViewSet):
+    """
+    `BaseModelViewSet` with async `list` / `retrieve`; the writes run their
+    sync implementation in one thread and transaction.
+    """
+
+    async def list(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        data, paginated = await self.aserialize_list(queryset)
+        if paginated:
+            return self.get_paginated_response(data)
+        return self.custom_success_response(
+            data=data, message="List retrieved successfully!"
+        )
+
+    async def retrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        await self.aprepare_instances([instance])
+        serializer = self.get_serializer(instance)
+        return self.custom_success_response(
+            data=serializer.data, message="Retrieved successfully!"
+        )
+
+    async def create(self, request, *args, **kwargs):
+        return await self.run_write(BaseModelViewSet.create, request, *args, **kwargs)
+
+    async def update(self, request, *args, **kwargs):
+        return await self.run_write(BaseModelViewSet.update, request, *args, **kwargs)
+
+    async def partial_update(self, request, *args, **kwargs):
+        kwargs["partial"] = True
+        return await self.run_write(BaseModelViewSet.update, request, *args, **kwargs)
+
+    async def destroy(self, request, *args, **kwargs):
+        return await self.run_write(BaseModelViewSet.destroy, request, *args, **kwargs)
+
+    async def run_write(self, method, request, *args, **kwargs):
+        return await sync_to_async(transaction.atomic(method))(
+            self, request, *args, **kwargs
+        )
@@ -1,7 +1,12 @@
 import django_filters
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
 from rest_framework import filters, status
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import (
     CreateAPIView,
     ListAPIView,
@@ -9,9 +14,14 @@ from rest_framework.generics import (
     UpdateAPIView,
 )
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from apps.base.exceptions import APIError
+from apps.base.libs import conditional, counting, fieldsets, response_cache
+from apps.base.renderer.renderer import StreamingCamelCaseJSONRenderer
+from apps.base.serializers import BaseModelSerializer
 from apps.base.views import CustomAPIResponse
 
 
@@ -46,17 +56,140 @@ class CustomPagination(PageNumberPagination):
 
     page_query_param = "page"
 
+    # how `total_count` is computed, see `apps.base.libs.counting`;
+    # views can set their own `count_strategy` / `count_cache_timeout`
+    count_strategy = counting.EXACT
+    count_cache_timeout = 60
+
+    filtered = True
+
+    def django_paginator_class(self, object_list, per_page):
+        return counting.CountingPaginator(
+            object_list,
+            per_page,
+            strategy=self.count_strategy,
+            filtered=self.filtered,
+            cache_timeout=self.count_cache_timeout,
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.setup_counting(queryset, request, view) == counting.HAS_MORE:
+            return self.paginate_has_more(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        `paginate_queryset` with `acount()` and async iteration of the page,
+        for the async views.
+        """
+        if self.setup_counting(queryset, request, view) == counting.HAS_MORE:
+            return await self.apaginate_has_more(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        if self.count_strategy == counting.EXACT:
+            paginator.count = await queryset.acount()
+        else:
+            # estimates and the count cache go through sync APIs
+            await sync_to_async(lambda: paginator.count)()
+
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+    def setup_counting(self, queryset, request, view=None):
+        """
+        Takes the counting strategy of the view and tells whether the list is
+        filtered, returns the strategy.
+        """
+        self.count_strategy = getattr(view, "count_strategy", self.count_strategy)
+        self.count_cache_timeout = getattr(
+            view, "count_cache_timeout", self.count_cache_timeout
+        )
+        if self.count_strategy != counting.HAS_MORE and hasattr(view, "get_queryset"):
+            self.filtered = counting.is_filtered(queryset, view.get_queryset())
+        return self.count_strategy
+
+    def get_has_more_slice(self, request):
+        """
+        `(page number, page size, offset)` of the `has_more` strategy.
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        try:
+            number = int(request.query_params.get(self.page_query_param, 1))
+        except (TypeError, ValueError):
+            number = 0
+        if number < 1:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=request.query_params.get(self.page_query_param),
+                    message="Invalid page.",
+                )
+            )
+        return number, page_size, (number - 1) * page_size
+
+    def paginate_has_more(self, queryset, request, view=None):
+        """
+        No count at all: fetches `limit + 1` rows, the extra row only tells
+        whether there is a next page.
+        """
+        page_slice = self.get_has_more_slice(request)
+        if page_slice is None:
+            return None
+        number, page_size, offset = page_slice
+        rows = list(queryset[offset : offset + page_size + 1])
+        return self.set_has_more_page(queryset, request, rows, number, page_size)
+
+    async def apaginate_has_more(self, queryset, request, view=None):
+        page_slice = self.get_has_more_slice(request)
+        if page_slice is None:
+            return None
+        number, page_size, offset = page_slice
+        rows = [row async for row in queryset[offset : offset + page_size + 1]]
+        return self.set_has_more_page(queryset, request, rows, number, page_size)
+
+    def set_has_more_page(self, queryset, request, rows, number, page_size):
+        paginator = self.django_paginator_class(queryset, page_size)
+        self.page = counting.HasMorePage(
+            rows[:page_size], number, paginator, has_more=len(rows) > page_size
+        )
+        self.request = request
+        return list(self.page)
+
     def get_paginated_response(self, data):
+        has_more_mode = isinstance(self.page, counting.HasMorePage)
         return Response(
             {
                 "success": True,
                 "message": getattr(
                     self, "success_response_message", "Data retrieved successfully."
                 ),
-                "total_count": self.page.paginator.count,
+                "total_count": None if has_more_mode else self.page.paginator.count,
+                "count_is_exact": (
+                    False if has_more_mode else self.page.paginator.count_is_exact
+                ),
                 "current_count": len(data),
-                "total_pages": self.page.paginator.num_pages,
+                "total_pages": (
+                    None if has_more_mode else self.page.paginator.num_pages
+                ),
                 "current_page": self.page.number,
+                "has_more": self.page.has_next(),
                 "next": self.get_next_link(),
                 "previous": self.get_previous_link(),
                 "data": data,
@@ -92,29 +225,308 @@ class FilteringOrderingPaginationMixin:
     pagination_class = CustomPagination
 
 
-class CustomGenericListView(FilteringOrderingPaginationMixin, ListAPIView):
+class SparseFieldsetMixin:
+    """
+    `?fields=a,b` renders only these serializer fields, `?omit=a,b` all but
+    these. The selection is passed to the serializer as `include_fields` /
+    `exclude_fields` and the queryset only loads the columns it needs.
+    Unknown names are rejected. Only for `BaseModelSerializer` serializers.
+    """
+
+    fields_query_param = "fields"
+    omit_query_param = "omit"
+    # loaded whatever the selection, `updated_at` for the conditional GET
+    always_loaded_fields = (conditional.UPDATED_AT,)
+
+    def get_sparse_fieldset(self):
+        """
+        `(include_fields, exclude_fields, selected, omitted)` for the request,
+        None when it does not ask for a subset.
+        """
+        if hasattr(self, "_sparse_fieldset"):
+            return self._sparse_fieldset
+
+        self._sparse_fieldset = None
+        serializer_class = self.get_serializer_class()
+        params = self.request.query_params
+        requested = fieldsets.parse_field_names(
+            self.fields_query_param and params.get(self.fields_query_param)
+        )
+        omit = fieldsets.parse_field_names(
+            self.omit_query_param and params.get(self.omit_query_param)
+        )
+        if not (requested or omit) or not issubclass(
+            serializer_class, BaseModelSerializer
+        ):
+            return None
+
+        available = serializer_class(context=self.get_serializer_context()).fields
+        errors = {}
+        for param, names in (
+            (self.fields_query_param, requested),
+            (self.omit_query_param, omit),
+        ):
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                errors[param] = [f"Unknown field(s): {', '.join(unknown)}."]
+        if errors:
+            raise APIError(errors)
+
+        if requested:
+            include_fields = tuple(name for name in requested if name not in omit)
+            if not include_fields:
+                raise APIError({self.fields_query_param: ["No field left to show."]})
+            exclude_fields = ()
+        else:
+            include_fields, exclude_fields = (), omit
+
+        selected = {
+            name: field
+            for name, field in available.items()
+            if (name in include_fields if include_fields else name not in omit)
+        }
+        omitted = {
+            name: field for name, field in available.items() if name not in selected
+        }
+        self._sparse_fieldset = (include_fields, exclude_fields, selected, omitted)
+        return self._sparse_fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_sparse_fieldset()
+        if fieldset:
+            kwargs.setdefault("include_fields", fieldset[0])
+            kwargs.setdefault("exclude_fields", fieldset[1])
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_sparse_fieldset()
+        if fieldset:
+            include_fields, _, selected, omitted = fieldset
+            queryset = fieldsets.restrict_queryset(
+                queryset,
+                selected,
+                omitted,
+                only=bool(include_fields),
+                keep=self.always_loaded_fields,
+            )
+        return queryset
+
+
+class ConditionalGetMixin:
+    """
+    Opt-in (`conditional_get = True`) `ETag` / `Last-Modified` validators
+    for GET responses and a 304 before any serialization when the client's
+    copy is current. An object is validated by its `updated_at`, a list by
+    `MAX(updated_at)` and the row count of the filtered queryset, one more
+    aggregate per request. Lists are only validated when the pagination
+    counts exactly anyway (`count_strategy = counting.EXACT`), not on the
+    strategies that avoid a COUNT(*). Models without `updated_at` are
+    served as usual.
+    """
+
+    conditional_get = False
+
+    def get_object_validators(self, instance):
+        """
+        `(etag, last_modified)` of `instance`, None when not available.
+        """
+        updated_at = getattr(instance, conditional.UPDATED_AT, None)
+        if not self.conditional_get or updated_at is None:
+            return None
+        etag = conditional.make_etag(
+            self.request, instance._meta.label_lower, instance.pk, updated_at
+        )
+        return etag, updated_at
+
+    def get_list_validators(self, queryset):
+        """
+        `(etag, None)` of the filtered `queryset`. No `Last-Modified`: a
+        deletion leaves `MAX(updated_at)` as it was, only the ETag (with the
+        count) sees it.
+        """
+        if not self.has_list_validators(queryset):
+            return None
+        return self.list_validators(queryset, *conditional.list_fingerprint(queryset))
+
+    async def aget_list_validators(self, queryset):
+        if not self.has_list_validators(queryset):
+            return None
+        fingerprint = await conditional.alist_fingerprint(queryset)
+        return self.list_validators(queryset, *fingerprint)
+
+    def has_list_validators(self, queryset):
+        return (
+            self.conditional_get
+            and conditional.has_updated_at(queryset.model)
+            and self.counts_exactly()
+        )
+
+    def counts_exactly(self):
+        if self.paginator is None:
+            return True
+        strategy = getattr(
+            self, "count_strategy", getattr(self.paginator, "count_strategy", None)
+        )
+        return strategy == counting.EXACT
+
+    def list_validators(self, queryset, last_modified, count):
+        etag = conditional.make_etag(
+            self.request, queryset.model._meta.label_lower, last_modified, count
+        )
+        return etag, None
+
+    def not_modified(self, validators):
+        if validators is None:
+            return None
+        return conditional.not_modified_response(self.request, *validators)
+
+    def set_validators(self, response, validators):
+        if validators is None:
+            return response
+        return conditional.set_validators(response, *validators)
+
+
+class ResponseCacheMixin:
+    """
+    Opt-in cache of rendered GET responses (`cache_response = True`).
+
+    Entries are keyed by path, query parameters, media type and user scope
+    (`cache_scope = "public"` shares them between users), and tagged with
+    the models they read: the queryset model plus `cache_tags`. Any save or
+    delete of a tagged model makes them unreachable once committed, see
+    `apps.base.libs.response_cache`. List in `cache_tags` the other models
+    the serializer reads (nested and related data).
+
+    A hit skips `get_object()` and its `check_object_permissions`, so the
+    object of a view with object-level permissions is never cached.
+    """
+
+    cache_response = False
+    cache_timeout = None  # `RESPONSE_CACHE["TIMEOUT"]` when None
+    cache_scope = "user"
+    cache_tags = ()
+
+    def get_cache_tags(self):
+        models = [self.get_queryset().model, *self.cache_tags]
+        return [response_cache.tag_of(model) for model in models]
+
+    def has_object_permissions(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return lookup_url_kwarg in self.kwargs and any(
+            type(permission).has_object_permission
+            is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def get(self, request, *args, **kwargs):
+        enabled, cache, timeout = response_cache.get_response_cache_settings()
+        if not (self.cache_response and enabled) or self.has_object_permissions():
+            return super().get(request, *args, **kwargs)
+
+        key = response_cache.response_cache_key(
+            request, self.get_cache_tags(), self.cache_scope, cache
+        )
+        entry = cache.get(key)
+        if entry is not None:
+            return response_cache.cached_response(request, entry)
+
+        response = super().get(request, *args, **kwargs)
+        # streamed responses are not rendered, so not stored
+        if response.status_code == 200 and not response.streaming:
+            timeout = timeout if self.cache_timeout is None else self.cache_timeout
+            response.add_post_render_callback(
+                lambda rendered: response_cache.store_response(
+                    cache, key, timeout, rendered
+                )
+            )
+        return response
+
+
+class CustomGenericListView(
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    SparseFieldsetMixin,
+    FilteringOrderingPaginationMixin,
+    ListAPIView,
+):
     request_action = "list"
+    # camelCase JSON pages are sent as a `StreamingHttpResponse`: the items
+    # are serialized, camelized and encoded `stream_chunk_size` at a time
+    # while the client reads, instead of building the whole body first
+    stream_response = False
+    stream_chunk_size = 100
 
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = self.get_list_validators(queryset)
+        not_modified = self.not_modified(validators)
+        if not_modified is not None:
+            return not_modified
+
+        page = self.paginate_queryset(queryset)
+        if page is not None and self.can_stream():
+            response = self.stream_page(page)
+        elif page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        return self.set_validators(response, validators)
+
+    def can_stream(self):
+        renderer = getattr(self.request, "accepted_renderer", None)
+        return (
+            self.stream_response
+            and isinstance(renderer, CamelCaseJSONRenderer)
+            and "indent" not in getattr(self.request, "accepted_media_type", "")
+        )
+
+    def stream_page(self, page):
+        envelope = self.get_paginated_response(page)
+        items_key = next(key for key, value in envelope.data.items() if value is page)
+        serializer = self.get_serializer(page, many=True)
+        if hasattr(serializer, "prefetch_action_users"):
+            serializer.prefetch_action_users(page)
+
+        renderer = StreamingCamelCaseJSONRenderer()
+        return StreamingHttpResponse(
+            renderer.render_stream(
+                envelope.data,
+                items_key,
+                (serializer.child.to_representation(obj) for obj in page),
+                chunk_size=self.stream_chunk_size,
+            ),
+            status=envelope.status_code,
+            content_type=renderer.media_type,
+        )
 
 
 class CustomErrorMessage:
 
-    def _get_message(self, data):
+    def _get_message(self, data, index=None):
+        # `index` of the failed item of a list payload
+        prefix = "Failed." if index is None else f"Failed. Item {index}:"
         for field, errors in data.items():
             if isinstance(errors, list):
                 for error in errors:
-                    return f"Failed. {str(error).capitalize()}"
+                    return f"{prefix} {str(error).capitalize()}"
             elif isinstance(errors, str):
-                return f"Failed. {errors.capitalize()}"
+                return f"{prefix} {errors.capitalize()}"
         return None
 
 
 class CustomGenericCreateView(CreateAPIView, CustomErrorMessage):
+    # a list payload creates all its items with one `bulk_create` per
+    # `BaseModelListSerializer.bulk_batch_size` rows, off unless enabled
+    allow_bulk_create = False
+    max_bulk_create = 10000
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
+        if self.allow_bulk_create and isinstance(request.data, list):
+            return self.bulk_create(request, *args, **kwargs)
         serializer = self.get_serializer(data=request.data)
 
         if not serializer.is_valid():
@@ -134,6 +546,36 @@ class CustomGenericCreateView(CreateAPIView, CustomErrorMessage):
             status_code=status.HTTP_201_CREATED,
         )
 
+    def bulk_create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=self.max_bulk_create,
+        )
+        if not serializer.is_valid():
+            errors = serializer.errors
+            index, item_errors = next(iter(errors.items()))
+            if isinstance(item_errors, dict):
+                # `{index: item errors}`, message from the first failed item
+                message = self._get_message(data=item_errors, index=index)
+            else:
+                message = self._get_message(data=errors)
+            if message:
+                return CustomAPIResponse.custom_error_response(
+                    errors=errors, message=message
+                )
+            return CustomAPIResponse.custom_error_response(
+                errors=errors,
+            )
+        self.perform_create(serializer)
+        return CustomAPIResponse.custom_success_response(
+            data=serializer.data,
+            message="Data created successfully.",
+            detail={"count": len(serializer.instance)},
+            status_code=status.HTTP_201_CREATED,
+        )
+
 
 class CustomGenericUpdateView(UpdateAPIView, CustomErrorMessage):
     http_method_names = ["patch"]  # only allows PATCH
@@ -160,11 +602,19 @@ class CustomGenericUpdateView(UpdateAPIView, CustomErrorMessage):
         )
 
 
-class CustomGenericRetrieveView(RetrieveAPIView):
+class CustomGenericRetrieveView(
+    ResponseCacheMixin, ConditionalGetMixin, SparseFieldsetMixin, RetrieveAPIView
+):
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        validators = self.get_object_validators(instance)
+        not_modified = self.not_modified(validators)
+        if not_modified is not None:
+            return not_modified
+
         serializer = self.get_serializer(instance)
-        return CustomAPIResponse.custom_success_response(
+        response = CustomAPIResponse.custom_success_response(
             data=serializer.data, message="Data retrieved successfully."
         )
+        return self.set_validators(response, validators)
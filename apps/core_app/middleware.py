@@ -2,27 +2,41 @@ import json
 import sys
 import traceback
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.http import HttpResponse, JsonResponse
-from djangorestframework_camel_case.util import camelize
+from djangorestframework_camel_case.settings import api_settings
 from rest_framework import status
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from apps.api_logs.errors import capture_exception
 from apps.base.exceptions import BASE_EXCEPTIONS
+from apps.base.libs.camel_case import camelize, underscoreize
 from apps.base.utils import is_valid_json, log_request_response
 
 
 class CustomErrorMiddleware:
+    # async capable, so an async view under ASGI is not run in a thread;
+    # Django calls `process_exception` synchronously either way
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         response = self.get_response(request)
         return response
 
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
     def process_exception(self, request, exception):
         self.exception = exception
         self.is_api_request = request.path.startswith("/api/")
@@ -41,6 +55,9 @@ class CustomErrorMiddleware:
             ):
                 message = self.get_exception_message(exception)
                 if isinstance(message, dict):
+                    capture_exception(
+                        request, exception, status.HTTP_400_BAD_REQUEST
+                    )
                     message = self.camelize_dict(message)
                     response = Response(message, status=status.HTTP_400_BAD_REQUEST)
                     response.accepted_renderer = JSONRenderer()
@@ -56,11 +73,16 @@ class CustomErrorMiddleware:
             # message = self.camelize_dict(message)
             return self.create_error_response(request, message)
 
+        # unhandled, Django answers with a 500
+        capture_exception(request, exception, status.HTTP_500_INTERNAL_SERVER_ERROR)
         return None
 
     def create_error_response(
         self, request, message, status_code=status.HTTP_400_BAD_REQUEST
     ):
+        # one aggregated, rate limited row per error fingerprint
+        capture_exception(request, self.exception, status_code)
+
         traceback_details = self.get_traceback_details()
         response_data = {
             "message": message,
@@ -187,21 +209,33 @@ class CustomErrorMiddleware:
         return {"traceback": list(reversed(traceback_info))}
 
     def camelize_dict(self, data):
-        """Utility method to camelize dictionary keys."""
-        if isinstance(data, dict):
-            # Process the dictionary: recursively camelize its keys
-            return camelize(
-                {
-                    k: self.camelize_dict(v) if isinstance(v, (dict, list)) else v
-                    for k, v in data.items()
-                }
-            )
-        elif isinstance(data, list):
-            # If it's a list, recursively process each item
-            return [self.camelize_dict(item) for item in data]
-        else:
-            # Base case: return the value as-is (it's neither a dict nor a list)
-            return data
+        """Utility method to camelize dictionary keys (recursively)."""
+        return camelize(data)
+
+
+class CamelCaseMiddleWare:
+    """
+    `djangorestframework_camel_case.middleware.CamelCaseMiddleWare` with
+    the shared key cache of `apps.base.libs.camel_case`. Async capable.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.GET = underscoreize(request.GET, **api_settings.JSON_UNDERSCOREIZE)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.GET = underscoreize(request.GET, **api_settings.JSON_UNDERSCOREIZE)
+        return await self.get_response(request)
 
 
 class NonHtmlDebugToolbarMiddleware:
@@ -216,6 +250,7 @@ class NonHtmlDebugToolbarMiddleware:
             if (
                 request.GET.get("format", "") == "json"
                 and response["Content-Type"] == "application/json"
+                and not response.streaming
             ):
                 # content = json.dumps(sort_json(json.loads(response.content)), indent=2)
                 content = json.dumps(
@@ -233,12 +268,25 @@ from django.http import HttpResponse
 from django.utils.timezone import now
 
 
+def get_elapsed_ms(request, default_start=None):
+    """
+    Milliseconds since RequestTimerMiddleware saw the request.
+    Falls back to `default_start` when the timer middleware is not enabled.
+    """
+    start_time = getattr(request, "timer_start", default_start)
+    if start_time is None:
+        return 0.0
+    return (time.perf_counter() - start_time) * 1000
+
+
 class RequestTimerMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         start_time = time.perf_counter()  # Record start time
+        # shared with the inner middlewares, e.g. the api log policy
+        request.timer_start = start_time
 
         # Call the next middleware or view
         response = self.get_response(request)
@@ -1,3 +1,45 @@
-from django.test import TestCase
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
 
-# Create your tests here.
+from apps.api_logs.models import ErrorLog
+from apps.base.exceptions import BaseException
+from apps.core_app.middleware import CamelCaseMiddleWare, CustomErrorMiddleware
+
+
+class AsyncCapableMiddlewareTests(SimpleTestCase):
+    def test_runs_in_the_mode_of_the_chain(self):
+        def get_response(request):
+            return HttpResponse(",".join(request.GET))
+
+        async def aget_response(request):
+            return get_response(request)
+
+        for middleware in (CamelCaseMiddleWare, CustomErrorMiddleware):
+            with self.subTest(middleware.__name__):
+                self.assertFalse(iscoroutinefunction(middleware(get_response)))
+                self.assertTrue(iscoroutinefunction(middleware(aget_response)))
+
+    async def test_underscoreizes_the_query_string_in_async_mode(self):
+        async def get_response(request):
+            return HttpResponse(",".join(request.GET))
+
+        request = RequestFactory().get("/?pageSize=1&createdAt=2")
+        response = await CamelCaseMiddleWare(get_response)(request)
+        self.assertEqual(response.content, b"page_size,created_at")
+
+
+class CustomErrorMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_records_api_errors_with_a_message_dict(self):
+        middleware = CustomErrorMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get("/api/v1/items")
+        exception = BaseException({"item_id": "Not found."})
+
+        response = middleware.process_exception(request, exception)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ErrorLog.objects.get().exception_class, "BaseException")
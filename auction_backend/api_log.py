@@ -0,0 +1,108 @@
+from decouple import config
+
+from .conf import BASE_DIR
+
+# Where `apps.base.utils.log_request_response` sends records:
+# "writer" - batched `bulk_create` from a background thread
+# "spool"  - NDJSON segment files, loaded by `manage.py ingest_api_logs`
+API_LOG_SINK = config("API_LOG_SINK", default="writer")
+
+# Buffered writer used by `apps.base.utils.log_request_response`.
+# Records are queued in memory and flushed with `bulk_create` from a
+# background thread every BATCH_SIZE records or FLUSH_INTERVAL_MS.
+API_LOG_WRITER = {
+    "BATCH_SIZE": config("API_LOG_BATCH_SIZE", cast=int, default=200),
+    "FLUSH_INTERVAL_MS": config("API_LOG_FLUSH_INTERVAL_MS", cast=int, default=1000),
+    # upper bound of records held in memory
+    "MAX_QUEUE_SIZE": config("API_LOG_MAX_QUEUE_SIZE", cast=int, default=10000),
+    # "drop": discard new records when the queue is full
+    # "block": wait up to BLOCK_TIMEOUT_MS for room, then drop
+    "OVERFLOW_POLICY": config("API_LOG_OVERFLOW_POLICY", default="drop"),
+    "BLOCK_TIMEOUT_MS": config("API_LOG_BLOCK_TIMEOUT_MS", cast=int, default=50),
+}
+
+# Append-only segment files used when API_LOG_SINK = "spool".
+API_LOG_SPOOL = {
+    "DIR": config("API_LOG_SPOOL_DIR", default=str(BASE_DIR / "api_log_spool")),
+    # a segment is sealed once it reaches either limit
+    "MAX_SEGMENT_BYTES": config(
+        "API_LOG_MAX_SEGMENT_BYTES", cast=int, default=64 * 1024 * 1024
+    ),
+    "MAX_SEGMENT_AGE_S": config("API_LOG_MAX_SEGMENT_AGE_S", cast=int, default=60),
+    # fsync after this many records or this many milliseconds
+    "FSYNC_EVERY": config("API_LOG_FSYNC_EVERY", cast=int, default=100),
+    "FSYNC_INTERVAL_MS": config("API_LOG_FSYNC_INTERVAL_MS", cast=int, default=1000),
+}
+
+# Range partitions of the api log table on `created_at`,
+# maintained by `manage.py manage_log_partitions`.
+API_LOG_PARTITIONS = {
+    "INTERVAL": config("API_LOG_PARTITION_INTERVAL", default="month"),  # or "day"
+    # future partitions created ahead of time
+    "PREMAKE": config("API_LOG_PARTITION_PREMAKE", cast=int, default=3),
+    # past partitions kept, older ones are detached and dropped (0 keeps all)
+    "RETENTION": config("API_LOG_PARTITION_RETENTION", cast=int, default=12),
+    "DETACH_ONLY": config("API_LOG_PARTITION_DETACH_ONLY", cast=bool, default=False),
+}
+
+# Which requests the `ApiLog` middleware writes, see `apps.api_logs.policy`.
+# The tier and route rate are decided before the view runs; 5xx and slow
+# requests are always kept, everything else is sampled.
+API_LOG_POLICY = {
+    "METHODS": ["PATCH", "PUT", "POST", "DELETE"],
+    "PATH_PREFIXES": ["/api/"],
+    # "full": headers, body and response; "headers": headers only; "off"
+    "DEFAULT_TIER": "full",
+    "STATUS_SAMPLE_RATES": {
+        "2xx": config("API_LOG_SAMPLE_RATE_2XX", cast=float, default=0.01),
+        "3xx": config("API_LOG_SAMPLE_RATE_3XX", cast=float, default=0.01),
+        "4xx": config("API_LOG_SAMPLE_RATE_4XX", cast=float, default=1.0),
+    },
+    "DEFAULT_SAMPLE_RATE": 1.0,
+    # latency measured by RequestTimerMiddleware
+    "SLOW_REQUEST_MS": config("API_LOG_SLOW_REQUEST_MS", cast=float, default=1000),
+    # first match wins, e.g.
+    # {"path": r"^/api/v1/auth/", "methods": ["POST"], "tier": "headers"},
+    # {"path": r"^/api/v1/uploads/", "tier": "full", "sample_rate": 0.1},
+    "RULES": [],
+}
+
+# Cap of a captured response, larger ones are cut with a truncation marker.
+API_LOG_RESPONSE_MAX_BYTES = config(
+    "API_LOG_RESPONSE_MAX_BYTES", cast=int, default=64 * 1024
+)
+
+# Per route, method and minute statistics (`api_logs.EndpointStatMinute`),
+# counted by the `ApiLog` middleware for every request under PATH_PREFIXES
+# and merged into the table every FLUSH_INTERVAL_MS.
+API_LOG_ROLLUP = {
+    "ENABLED": config("API_LOG_ROLLUP_ENABLED", cast=bool, default=True),
+    "FLUSH_INTERVAL_MS": config(
+        "API_LOG_ROLLUP_FLUSH_INTERVAL_MS", cast=int, default=10000
+    ),
+}
+
+# Aggregated error capture, see `apps.api_logs.errors.capture_exception`.
+API_ERROR_LOG = {
+    # a fingerprint is written at most once per interval, the occurrences
+    # in between are counted in the cache (per process with the local memory
+    # cache, shared with redis)
+    "WRITE_INTERVAL_S": config(
+        "API_ERROR_LOG_WRITE_INTERVAL_S", cast=int, default=10
+    ),
+    # sample payloads kept per fingerprint
+    "SAMPLE_SIZE": config("API_ERROR_LOG_SAMPLE_SIZE", cast=int, default=10),
+    # project frames that are part of the fingerprint
+    "APP_FRAMES": config("API_ERROR_LOG_APP_FRAMES", cast=int, default=3),
+}
+
+# `apps.base.fields.CompressedJSONField` (APILog payload columns).
+# Existing jsonb columns: `manage.py recompress_payloads api_logs.APILog
+# --convert`, then `train_compression_dictionary api_logs.APILog` and
+# `recompress_payloads api_logs.APILog` again to apply the dictionary.
+PAYLOAD_COMPRESSION = {
+    # "zstd" needs the optional zstandard package, falls back to "zlib"
+    "CODEC": config("PAYLOAD_COMPRESSION_CODEC", default="zstd"),
+    "LEVEL": config("PAYLOAD_COMPRESSION_LEVEL", cast=int, default=3),
+    "USE_DICTIONARY": config("PAYLOAD_COMPRESSION_DICTIONARY", cast=bool, default=True),
+}
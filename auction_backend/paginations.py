@@ -1,10 +1,17 @@
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import (
+    CursorPagination,
     LimitOffsetPagination,
     PageNumberPagination,
     _positive_int,
 )
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomLimitOffsetPagination(LimitOffsetPagination):
@@ -145,3 +152,185 @@ class CustomPagePagination(PageNumberPagination):
         Here in our case, data will be in `data` key.
         """
         return data["data"]
+
+
+class CustomKeysetPagination(CursorPagination):
+    """
+    Keyset (seek) pagination on the view ordering, `-created_at` by default,
+    with the primary key as tie-breaker. Each page is fetched with
+    `WHERE (created_at, id) < (last row) LIMIT n`, so deep pages cost the
+    same as the first one and no COUNT(*) is run.
+
+    Cursors are signed, so clients can not forge positions.
+    The `?ordering=` param is honoured; a cursor from another ordering is
+    rejected. Nullable keys are supported: NULLs sort where the database
+    puts them (last ascending on PostgreSQL, first on SQLite/MySQL) and
+    the seek condition follows.
+    """
+
+    page_size = 50
+    max_page_size = 50
+    page_size_query_param = "limit"
+    ordering = "-created_at"
+    cursor_salt = "auction_backend.paginations.CustomKeysetPagination"
+
+    NEXT = "n"
+    PREVIOUS = "p"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.keyset = self.get_keyset(queryset, view)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip("-")) for name in self.keyset
+        ]
+        self.nulls_largest = connections[queryset.db].features.nulls_order_largest
+        direction, values = self.decode_cursor(request) or (self.NEXT, None)
+
+        queryset = queryset.order_by(*self.keyset)
+        if values is not None:
+            queryset = queryset.filter(
+                self.seek_filter(values, backwards=direction == self.PREVIOUS)
+            )
+        if direction == self.PREVIOUS:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+
+        if direction == self.PREVIOUS:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = values is not None, has_more
+
+        self.page = rows
+        return rows
+
+    def get_keyset(self, queryset, view):
+        ordering = list(queryset.query.order_by)
+        if not ordering or not all(isinstance(name, str) for name in ordering):
+            ordering = list(self.get_ordering(self.request, queryset, view))
+
+        pk_name = queryset.model._meta.pk.name
+        ordering = [
+            name.replace("pk", pk_name) if name.lstrip("-") == "pk" else name
+            for name in ordering
+        ]
+        if pk_name not in {name.lstrip("-") for name in ordering}:
+            # same direction as the leading key, so one btree index serves it
+            ordering.append(f"-{pk_name}" if ordering[0].startswith("-") else pk_name)
+        return ordering
+
+    def seek_filter(self, values, backwards=False):
+        """
+        `(a, b) > (x, y)` expanded to `a > x OR (a = x AND b > y)`,
+        per key direction. A NULL sorts above every value when the
+        database orders NULLs largest, below otherwise.
+        """
+        condition = Q()
+        equal = Q()
+        for name, field, value in zip(self.keyset, self.fields, values):
+            descending = name.startswith("-") != backwards
+            # whether the rows after the cursor have greater values
+            greater = not descending
+            if value is None:
+                beyond = None
+                if greater != self.nulls_largest:
+                    beyond = Q(**{f"{field.name}__isnull": False})
+                is_equal = Q(**{f"{field.name}__isnull": True})
+            else:
+                lookup = "lt" if descending else "gt"
+                beyond = Q(**{f"{field.name}__{lookup}": value})
+                if field.null and greater == self.nulls_largest:
+                    beyond |= Q(**{f"{field.name}__isnull": True})
+                is_equal = Q(**{field.name: value})
+            if beyond is not None:
+                condition |= equal & beyond
+            equal &= is_equal
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = signing.loads(encoded, salt=self.cursor_salt)
+            if cursor["o"] != self.keyset or cursor["d"] not in (
+                self.NEXT,
+                self.PREVIOUS,
+            ):
+                raise ValueError
+            values = [
+                None if value is None else field.to_python(value)
+                for field, value in zip(self.fields, cursor["v"])
+            ]
+        except (
+            signing.BadSignature,
+            KeyError,
+            TypeError,
+            ValueError,
+            ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor["d"], values
+
+    def encode_cursor(self, direction, instance):
+        # NULL as None, `value_to_string` gives "" for it
+        values = [
+            (
+                None
+                if field.value_from_object(instance) is None
+                else field.value_to_string(instance)
+            )
+            for field in self.fields
+        ]
+        token = signing.dumps(
+            {"d": direction, "v": values, "o": self.keyset}, salt=self.cursor_salt
+        )
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.NEXT, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.PREVIOUS, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "success": True,
+                "message": "Data retrieved successfully.",
+                "current_count": len(data),
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "data": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "success": {"type": "boolean", "example": True},
+                "message": {"type": "string"},
+                "current_count": {"type": "integer", "example": 50},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "data": schema,
+            },
+        }
+
+    def get_results(self, data):
+        return data["data"]
@@ -26,19 +26,19 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_RENDERER_CLASSES": (
         (
-            "djangorestframework_camel_case.render.CamelCaseJSONRenderer",
+            "apps.base.renderer.renderer.FastCamelCaseJSONRenderer",
             "djangorestframework_camel_case.render.CamelCaseBrowsableAPIRenderer",
         )
         if DEBUG
         else (
-            "djangorestframework_camel_case.render.CamelCaseJSONRenderer",
+            "apps.base.renderer.renderer.FastCamelCaseJSONRenderer",
             "rest_framework.renderers.JSONRenderer",
         )
     ),
     "DEFAULT_PARSER_CLASSES": (
         "apps.base.parser.parser.CustomNestedParser",
-        "djangorestframework_camel_case.parser.CamelCaseFormParser",
-        "djangorestframework_camel_case.parser.CamelCaseJSONParser",
+        "apps.base.parser.parser.CustomCamelCaseFormParser",
+        "apps.base.parser.parser.CustomCamelCaseJSONParser",
     ),
     "DEFAULT_THROTTLE_CLASSES": [
         # "rest_framework.throttling.ScopedRateThrottle",
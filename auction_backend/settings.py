@@ -43,7 +43,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_user_agents.middleware.UserAgentMiddleware",
-    "djangorestframework_camel_case.middleware.CamelCaseMiddleWare",
+    "apps.core_app.middleware.CamelCaseMiddleWare",
     "apps.core_app.middleware.CustomErrorMiddleware",
     # "apps.api_logs.middleware.ApiLog",
 ]
@@ -163,4 +163,20 @@ if DEBUG and not SERVER_ENV:
 #     }
 # }
 
+# Opt-in response cache of the generic list/retrieve views
+# (`cache_response = True`), see `apps.base.libs.response_cache`.
+# The default local memory cache is per process: invalidations made by one
+# worker are not seen by the others, so the response cache stays off on it
+# unless ALLOW_LOCAL_MEMORY is set (a single process). Use a shared cache
+# (redis above) when running several.
+RESPONSE_CACHE = {
+    "ENABLED": config("RESPONSE_CACHE_ENABLED", cast=bool, default=True),
+    "ALIAS": config("RESPONSE_CACHE_ALIAS", default="default"),
+    "ALLOW_LOCAL_MEMORY": config(
+        "RESPONSE_CACHE_ALLOW_LOCAL_MEMORY", cast=bool, default=False
+    ),
+    # seconds, views can set their own `cache_timeout`
+    "TIMEOUT": config("RESPONSE_CACHE_TIMEOUT", cast=int, default=60),
+}
+
 CORS_ALLOW_ALL_ORIGINS = True
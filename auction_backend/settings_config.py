@@ -117,6 +117,7 @@ except Exception:
     pass
 
 
+from .api_log import *
 from .rest import *
 from .spectacular import *
 